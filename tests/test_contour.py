@@ -0,0 +1,143 @@
+#    Copyright (C) 2014 Jeremy S. Sanders
+#    Email: Jeremy Sanders <jeremy@jeremysanders.net>
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+##############################################################################
+
+"""Tests of tracing contours and placing their labels.
+
+Run from the source directory with
+python -m unittest discover -s tests -p 'test_*.py'
+"""
+
+from __future__ import division
+import unittest
+
+import numpy as N
+
+import unittestsetup
+from veusz.widgets import contour
+
+class FakeCntr(object):
+    """Stand-in for the contour tracer, returning a line at each
+    level and recording the levels traced."""
+
+    made = []
+
+    def __init__(self, xpts, ypts, data, mask):
+        self.traced = []
+        FakeCntr.made.append(self)
+
+    def trace(self, level1, level2=None):
+        self.traced.append( (level1,) if level2 is None else
+                            (level1, level2) )
+        if level2 is None:
+            return [N.array([[level1, 0.], [level1, N.nan], [level1, 1.]])]
+        return [N.array([[level1, level2]]), N.array([[level2, level1]])]
+
+class TraceContoursTest(unittest.TestCase):
+    """Check contours are traced in order with one tracer."""
+
+    def setUp(self):
+        FakeCntr.made = []
+
+    def testOrder(self):
+        tasks = [(float(i),) for i in range(4)] + [(1., 2.), (2., 3.)]
+        z = N.zeros((2, 2))
+        results = contour.traceContours(FakeCntr, z, z, z, z, tasks)
+
+        self.assertEqual(len(FakeCntr.made), 1)
+        self.assertEqual(FakeCntr.made[0].traced, tasks)
+        self.assertEqual(len(results), len(tasks))
+        for task, polys in zip(tasks, results):
+            if len(task) == 1:
+                self.assertEqual(len(polys), 1)
+                # non-finite points are removed
+                self.assertEqual(polys[0].tolist(),
+                                 [[task[0], 0.], [task[0], 1.]])
+            else:
+                self.assertEqual(polys[0].tolist(), [list(task)])
+
+    def testSaddles(self):
+        """Output on a field full of saddle points is the same as
+        tracing each level in turn with one tracer."""
+
+        from veusz.helpers._nc_cntr import Cntr
+
+        ypts, xpts = N.mgrid[0:40, 0:40].astype(N.float64)
+        data = N.sin(xpts*0.8) * N.sin(ypts*0.8)
+        data[::3, ::3] = N.nan
+        mask = N.logical_not(N.isfinite(data))
+
+        levels = list(N.linspace(-0.9, 0.9, 7))
+        tasks = ( [(l,) for l in levels] +
+                  list(zip(levels[:-1], levels[1:])) +
+                  [(l,) for l in N.linspace(-0.95, 0.95, 5)] )
+
+        c = Cntr(xpts, ypts, data, mask)
+        expected = [contour.finitePoly(c.trace(*t)) for t in tasks]
+        results = contour.traceContours(Cntr, xpts, ypts, data, mask, tasks)
+
+        self.assertEqual(len(results), len(expected))
+        for polys, exppolys in zip(results, expected):
+            self.assertEqual([p.tolist() for p in polys],
+                             [p.tolist() for p in exppolys])
+
+class PlaceLabelsTest(unittest.TestCase):
+    """Check contour labels are placed without overlapping."""
+
+    def curve(self, x1, y1, x2, y2, npts=101):
+        x = N.linspace(x1, x2, npts)
+        y = N.linspace(y1, y2, npts)
+        return (x, y, None)
+
+    def testMiddle(self):
+        placed = contour.placeContourLabels(
+            [[self.curve(0, 0, 200, 0)]], [(20., 10., 8.)])
+        self.assertEqual(len(placed[0]), 1)
+        x, y, rect = placed[0][0]
+        self.assertEqual((x, y), (100., 0.))
+        self.assertEqual(rect, (90., -5., 110., 5.))
+
+    def testShortCurve(self):
+        """Curves too short for the label are not labelled."""
+        placed = contour.placeContourLabels(
+            [[self.curve(0, 0, 20, 5)]], [(20., 10., 8.)])
+        self.assertEqual(placed, [[]])
+
+    def testAvoidOverlap(self):
+        """A second curve over the first uses a quarter point."""
+        placed = contour.placeContourLabels(
+            [[self.curve(0, 0, 200, 0)], [self.curve(0, 2, 200, 2)]],
+            [(20., 10., 8.), (20., 10., 8.)])
+        self.assertEqual(placed[1][0][:2], (50., 2.))
+
+        # all candidate positions taken
+        placed = contour.placeContourLabels(
+            [[self.curve(0, 0, 200, 0)]]*4, [(20., 10., 8.)]*4)
+        self.assertEqual([len(p) for p in placed], [1, 1, 1, 0])
+
+    def testNeighbouringCell(self):
+        """Overlaps are found with labels in neighbouring cells."""
+        placed = contour.placeContourLabels(
+            [[self.curve(0, 38, 200, 38)], [self.curve(0, 42, 200, 42)]],
+            [(20., 10., 8.), (20., 10., 8.)])
+        x1, y1, r1 = placed[0][0]
+        x2, y2, r2 = placed[1][0]
+        self.assertNotEqual(x1, x2)
+        self.assertTrue(r1[2] <= r2[0] or r2[2] <= r1[0])
+
+if __name__ == '__main__':
+    unittest.main()
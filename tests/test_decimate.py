@@ -0,0 +1,344 @@
+#    Copyright (C) 2014 Jeremy S. Sanders
+#    Email: Jeremy Sanders <jeremy@jeremysanders.net>
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+##############################################################################
+
+"""Tests of reducing the number of points plotted.
+
+Run from the source directory with
+python -m unittest discover -s tests -p 'test_*.py'
+"""
+
+from __future__ import division
+import unittest
+
+import numpy as N
+
+import unittestsetup
+import veusz.qtall as qt4
+import veusz.utils as utils
+import veusz.document as document
+from veusz.compat import crange
+
+class DecimateLineTest(unittest.TestCase):
+    """Check decimated lines keep the extremes in each column."""
+
+    def setUp(self):
+        rand = N.random.RandomState(42)
+        self.x = N.sort(rand.uniform(0, 200, 20000))
+        self.y = rand.normal(50, 15, 20000)
+
+    def testFewPoints(self):
+        self.assertTrue(utils.decimateLineIndices(
+            N.arange(5.), N.arange(5.)) is None)
+        # one point per column cannot be reduced
+        x = N.arange(100.)
+        self.assertTrue(utils.decimateLineIndices(x, x) is None)
+
+    def testExtremesKept(self):
+        idx = utils.decimateLineIndices(self.x, self.y)
+        self.assertTrue(len(idx) < 200*4+1)
+        self.assertTrue(N.all(N.diff(idx) > 0))
+        self.assertEqual(idx[0], 0)
+        self.assertEqual(idx[-1], len(self.x)-1)
+
+        cols = N.floor(self.x)
+        for c in (0, 57, 199):
+            incol = N.nonzero(cols == c)[0]
+            kept = idx[cols[idx] == c]
+            self.assertEqual(self.y[kept].min(), self.y[incol].min())
+            self.assertEqual(self.y[kept].max(), self.y[incol].max())
+            self.assertTrue(incol[0] in kept)
+            self.assertTrue(incol[-1] in kept)
+
+    def testPixelSize(self):
+        # larger pixels keep fewer points
+        idx1 = utils.decimateLineIndices(self.x, self.y)
+        idx2 = utils.decimateLineIndices(self.x, self.y, pixsize=4.)
+        self.assertTrue(len(idx2) < len(idx1))
+
+    def testNaN(self):
+        y = self.y.copy()
+        y[100:200] = N.nan
+        idx = utils.decimateLineIndices(self.x, y)
+        cols = N.floor(self.x)
+        c = cols[150]
+        incol = (cols == c) & N.isfinite(y)
+        self.assertEqual(N.nanmax(y[idx[cols[idx] == c]]), y[incol].max())
+
+
+class LODPyramidTest(unittest.TestCase):
+    """Check the multi-resolution summary of lines."""
+
+    def setUp(self):
+        rand = N.random.RandomState(42)
+        self.vals = rand.normal(size=200000).cumsum()
+
+    def assertSameLevels(self, pyr1, pyr2):
+        self.assertEqual(len(pyr1.levels), len(pyr2.levels))
+        for l1, l2 in zip(pyr1.levels, pyr2.levels):
+            self.assertEqual(l1[:2], l2[:2])
+            self.assertTrue(N.all(l1[2] == l2[2]))
+            self.assertTrue(N.all(l1[3] == l2[3]))
+
+    def testExtremesKept(self):
+        pyr = utils.LODPyramid(self.vals)
+        self.assertTrue(len(pyr.levels) > 1)
+        for start, end in ((0, 200000), (12345, 123456), (1000, 1500)):
+            idx = pyr.getIndices(start, end, 300)
+            self.assertTrue(len(idx) < 4000)
+            self.assertEqual(idx[0], start)
+            self.assertEqual(idx[-1], end-1)
+            self.assertTrue(N.all(N.diff(idx) > 0))
+            self.assertEqual(self.vals[idx].min(), self.vals[start:end].min())
+            self.assertEqual(self.vals[idx].max(), self.vals[start:end].max())
+
+    def testAppend(self):
+        """Updating for appended values gives the same pyramid."""
+        pyr = utils.LODPyramid(self.vals[:1000])
+        for end in range(1000, 200001, 9999):
+            pyr.update(self.vals[:end])
+        pyr.update(self.vals)
+        self.assertSameLevels(pyr, utils.LODPyramid(self.vals))
+
+    def testDropped(self):
+        """Values dropped from the start, as for a ring buffer."""
+        pyr = utils.LODPyramid(self.vals[:100000])
+        for end in range(100001, 200001, 7777):
+            start = end - 100000
+            pyr.update(self.vals[start:end], dropped=start-pyr.offset)
+            vals = self.vals[start:end]
+            idx = pyr.getIndices(0, 100000, 300)
+            self.assertEqual(vals[idx].min(), vals.min())
+            self.assertEqual(vals[idx].max(), vals.max())
+            self.assertEqual(idx[-1], 99999)
+
+    def testShrink(self):
+        """Values removed from the end recalculate the pyramid."""
+        pyr = utils.LODPyramid(self.vals)
+        pyr.update(self.vals[:150000])
+        self.assertSameLevels(pyr, utils.LODPyramid(self.vals[:150000]))
+
+    def testColumns(self):
+        """Columns of unevenly spaced values keep their extremes."""
+        pyr = utils.LODPyramid(self.vals)
+        x = N.linspace(0, 1, len(self.vals))**4
+        bounds = N.searchsorted(x, N.linspace(0, 1, 301))
+        idx = pyr.getColumnIndices(bounds)
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if end > start:
+                kept = idx[(idx >= start) & (idx < end)]
+                self.assertEqual(kept[0], start)
+                self.assertEqual(kept[-1], end-1)
+                self.assertEqual(
+                    self.vals[kept].min(), self.vals[start:end].min())
+                self.assertEqual(
+                    self.vals[kept].max(), self.vals[start:end].max())
+
+    def testAppendable(self):
+        """The pyramid of an appendable dataset is kept up to date."""
+        for capacity in (None, 100000):
+            ds = document.DatasetAppendable(capacity=capacity)
+            ds.append(self.vals[:50000])
+            pyr = ds.getLODPyramid()
+            for i in crange(50000, 200000, 30000):
+                ds.append(self.vals[i:i+30000])
+                self.assertTrue(ds.getLODPyramid() is pyr)
+                self.assertEqual(ds.validCount(), len(ds.data))
+                self.assertTrue(ds.isSorted() is False)
+            idx = pyr.getIndices(0, len(ds.data), 300)
+            self.assertEqual(ds.data[idx].min(), ds.data.min())
+            self.assertEqual(ds.data[idx].max(), ds.data.max())
+
+
+class ImagePyramidTest(unittest.TestCase):
+    """Check reduced resolution images."""
+
+    def testMean(self):
+        data = N.arange(25, dtype=N.float64).reshape(5, 5)
+        data[0, 0] = N.nan
+        pyr = utils.ImagePyramid(data, method='mean')
+        self.assertEqual(pyr.maxlevel, 3)
+        self.assertTrue(pyr.getLevel(0) is data)
+        lev1 = pyr.getLevel(1)
+        self.assertEqual(lev1.shape, (3, 3))
+        # nan is ignored, odd rows and columns combined alone
+        self.assertEqual(lev1[0, 0], (1+5+6)/3)
+        self.assertEqual(lev1[2, 2], 24)
+        self.assertEqual(pyr.getLevel(2)[0, 0], N.nanmean(data[:4, :4]))
+        self.assertEqual(pyr.getLevel(10).shape, (1, 1))
+
+    def testLevelShape(self):
+        data = N.zeros((37, 23))
+        pyr = utils.ImagePyramid(data)
+        for level in range(pyr.maxlevel+2):
+            self.assertEqual(pyr.levelShape(level),
+                             pyr.getLevel(level).shape)
+        # the level is not made to find its shape
+        pyr = utils.ImagePyramid(data)
+        self.assertEqual(pyr.levelShape(2), (10, 6))
+        self.assertEqual(pyr.nbytes(), 0)
+
+    def testMaxInteger(self):
+        data = N.arange(-20, 16, dtype=N.int16).reshape(6, 6)
+        pyr = utils.ImagePyramid(data, method='max')
+        lev2 = pyr.getLevel(2)
+        self.assertEqual(lev2.dtype, N.int16)
+        self.assertEqual(lev2.tolist(), [[1, 3], [13, 15]])
+
+    def testLevelsCached(self):
+        data = N.ones((64, 64))
+        pyr = utils.ImagePyramid(data)
+        self.assertEqual(pyr.nbytes(), 0)
+        lev3 = pyr.getLevel(3)
+        # only the requested level is made
+        self.assertEqual(pyr.nbytes(), lev3.nbytes)
+        self.assertTrue(pyr.getLevel(3) is lev3)
+
+    def testSameAsRepeated(self):
+        """Reducing in one step matches repeated halving for max."""
+        data = N.random.RandomState(1).rand(37, 23)
+        data[3:9, 2:5] = N.nan
+        reduce = utils.decimate._reduceImage
+        once = reduce(data, 'max', factor=4, chunk=3)
+        twice = reduce(reduce(data, 'max'), 'max')
+        self.assertTrue(N.array_equal(once, twice))
+
+
+class DecimateSettingsTest(unittest.TestCase):
+    """Check plot lines are only decimated when the output is not
+    changed by it."""
+
+    def setUp(self):
+        self.doc = document.Document()
+        self.ifc = ifc = document.CommandInterface(self.doc)
+        ifc.Add('page', name='page1')
+        ifc.To('page1')
+        ifc.Add('graph', name='graph1')
+        ifc.To('graph1')
+        ifc.Add('xy', name='xy1')
+        ifc.To('xy1')
+        self.xy = self.doc.resolveFullWidgetPath('/page1/graph1/xy1')
+
+    def pixelSize(self, device, sizefn=None):
+        """Get decimation pixel size painting to device."""
+        if sizefn is None:
+            sizefn = self.xy._decimatePixelSize
+        painter = document.DirectPainter(device)
+        helper = document.PaintHelper((100, 100), directpaint=painter)
+        painter.save()
+        p = helper.painter(self.xy, (0, 0, 100, 100))
+        size = sizefn(p)
+        painter.restore()
+        painter.end()
+        return size
+
+    def bitmapPixelSize(self):
+        img = qt4.QImage(100, 100, qt4.QImage.Format_ARGB32)
+        return self.pixelSize(img)
+
+    def testBitmap(self):
+        self.assertEqual(self.bitmapPixelSize(), 1.)
+
+    def testVector(self):
+        self.assertTrue(self.pixelSize(qt4.QPicture()) is None)
+
+    def testDashed(self):
+        self.ifc.Set('PlotLine/style', 'dashed')
+        self.assertTrue(self.bitmapPixelSize() is None)
+
+    def testThick(self):
+        self.ifc.Set('PlotLine/width', '3pt')
+        self.assertTrue(self.bitmapPixelSize() is None)
+
+    def testFill(self):
+        self.ifc.Set('FillBelow/hide', False)
+        self.assertTrue(self.bitmapPixelSize() is None)
+
+    def testDisabled(self):
+        self.ifc.Set('PlotLine/decimate', False)
+        self.assertTrue(self.bitmapPixelSize() is None)
+
+    def testCullMarkers(self):
+        """Markers are only culled for bitmap output."""
+        cullres = utils.points._cullResolution
+        img = qt4.QImage(100, 100, qt4.QImage.Format_ARGB32)
+        self.assertEqual(self.pixelSize(img, cullres), 0.25)
+        self.assertTrue(self.pixelSize(qt4.QPicture(), cullres) is None)
+
+    def canDrawLOD(self, device=None):
+        if device is None:
+            device = qt4.QImage(100, 100, qt4.QImage.Format_ARGB32)
+        xv = document.Dataset(data=N.arange(100.))
+        yv = document.Dataset(data=N.sin(N.arange(100.)))
+        self.xy.lodminpoints = 10
+        self.ifc.Set('marker', 'none')
+        return self.pixelSize(device, lambda painter: self.xy._canDrawLOD(
+            painter, xv, yv, None, None, None))
+
+    def testLOD(self):
+        self.assertTrue(self.canDrawLOD())
+
+    def testLODFill(self):
+        self.ifc.Set('FillAbove/hide', False)
+        self.assertFalse(self.canDrawLOD())
+
+    def testLODNotDecimated(self):
+        """Summary is only used where the line could be decimated."""
+        self.assertFalse(self.canDrawLOD(qt4.QPicture()))
+        self.ifc.Set('PlotLine/style', 'dashed')
+        self.assertFalse(self.canDrawLOD())
+
+    def useDensity(self, scalepoints=None, colorpoints=None):
+        ds = document.Dataset(data=N.arange(100.))
+        self.ifc.Set('densityThreshold', 10)
+        return self.xy._useDensity(ds, ds, scalepoints, colorpoints)
+
+    def testDensity(self):
+        # existing documents are not plotted differently by default
+        self.assertFalse(self.useDensity())
+        self.ifc.Set('densityMode', 'auto')
+        self.assertTrue(self.useDensity())
+
+    def testDensityNoMarker(self):
+        self.ifc.Set('marker', 'none')
+        self.assertFalse(self.useDensity())
+        self.ifc.Set('densityMode', 'on')
+        self.assertFalse(self.useDensity())
+
+    def testDensityScaled(self):
+        ds = document.Dataset(data=N.arange(100.))
+        self.ifc.Set('densityMode', 'auto')
+        self.assertFalse(self.useDensity(scalepoints=ds))
+        self.assertFalse(self.useDensity(colorpoints=ds))
+        self.ifc.Set('MarkerFill/hide', True)
+        self.assertTrue(self.useDensity(colorpoints=ds))
+
+    def testDensityDevicePixels(self):
+        """Density is binned in device pixels, not plotter units."""
+        img = qt4.QImage(20, 20, qt4.QImage.Format_ARGB32)
+        painter = qt4.QPainter(img)
+        painter.scale(2, 2)
+        density = self.xy._addDensity(
+            painter, None, N.array([1.2, 1.7]), N.array([1.2, 1.7]),
+            qt4.QRectF(0, 0, 10, 10))
+        painter.end()
+        self.assertEqual(len(density), 20*20)
+        self.assertEqual(N.count_nonzero(density), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
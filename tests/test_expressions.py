@@ -0,0 +1,171 @@
+#    Copyright (C) 2014 Jeremy S. Sanders
+#    Email: Jeremy Sanders <jeremy@jeremysanders.net>
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+##############################################################################
+
+"""Tests of reevaluation of expressions when datasets change.
+
+Run from the source directory with
+python -m unittest discover -s tests -p 'test_*.py'
+"""
+
+from __future__ import division
+import unittest
+
+import numpy as N
+
+import unittestsetup
+import veusz.document as document
+
+class ExpressionDependencyTest(unittest.TestCase):
+    """Check expression datasets notice changes to their inputs."""
+
+    def setUp(self):
+        self.doc = document.Document()
+
+    def setData(self, name, vals):
+        self.doc.setData(name, document.Dataset(data=vals))
+
+    def addExpr(self, name, expr):
+        self.doc.setData(name, document.DatasetExpression(data=expr))
+
+    def assertValues(self, vals, expected):
+        self.assertEqual(list(vals), list(expected))
+
+    def testModify(self):
+        self.setData('a', [1, 2, 3])
+        self.addExpr('e', 'a*2')
+        self.assertValues(self.doc.data['e'].data, [2, 4, 6])
+        self.setData('a', [5, 6])
+        self.assertValues(self.doc.data['e'].data, [10, 12])
+
+    def testDelete(self):
+        self.setData('a', [1, 2, 3])
+        self.setData('b', [4, 5, 6])
+        self.addExpr('e', 'a+b')
+        self.assertValues(self.doc.data['e'].data, [5, 7, 9])
+        self.doc.deleteDataset('b')
+        self.assertValues(self.doc.data['e'].data, [])
+
+    def testRenameOntoDeleted(self):
+        # both datasets had the same change count before rename
+        self.setData('a', [1, 2, 3])
+        self.setData('b', [4, 5, 6])
+        self.addExpr('e', 'b*2')
+        self.assertValues(self.doc.data['e'].data, [8, 10, 12])
+        self.doc.deleteData('b')
+        self.doc.renameDataset('a', 'b')
+        self.assertValues(self.doc.data['e'].data, [2, 4, 6])
+
+    def testRenameAway(self):
+        self.setData('a', [1, 2, 3])
+        self.addExpr('e', 'a*2')
+        self.assertValues(self.doc.data['e'].data, [2, 4, 6])
+        self.doc.renameDataset('a', 'c')
+        self.assertValues(self.doc.data['e'].data, [])
+
+    def testSelfReference(self):
+        self.addExpr('e', 'e+1')
+        self.assertValues(self.doc.data['e'].data, [])
+        self.assertFalse(self.doc.data['e'].evaluating)
+
+    def setCustoms(self, customs):
+        self.doc.applyOperation(document.OperationSetCustom(customs))
+
+    def testCustomChange(self):
+        self.setData('a', [1, 2, 3])
+        self.addExpr('e', 'a*k')
+        self.setCustoms([('constant', 'k', '2')])
+        self.assertValues(self.doc.data['e'].data, [2, 4, 6])
+        self.setCustoms([('constant', 'k', '3')])
+        self.assertValues(self.doc.data['e'].data, [3, 6, 9])
+
+class ExpressionCacheTest(unittest.TestCase):
+    """Check cached results of expressions are not stale."""
+
+    def setUp(self):
+        self.doc = document.Document()
+
+    def setData(self, name, vals):
+        self.doc.setData(name, document.Dataset(data=vals))
+
+    def evalValues(self, expr):
+        return list(self.doc.evalDatasetExpression(expr).data)
+
+    def testCached(self):
+        self.setData('a', [1, 2, 3])
+        self.assertEqual(self.evalValues('a+1'), [2, 3, 4])
+        self.assertEqual(self.doc.exprcache.hits, 0)
+        self.assertEqual(self.evalValues('a+1'), [2, 3, 4])
+        self.assertEqual(self.doc.exprcache.hits, 1)
+
+    def testModify(self):
+        self.setData('a', [1, 2, 3])
+        self.assertEqual(self.evalValues('a+1'), [2, 3, 4])
+        self.setData('a', [5])
+        self.assertEqual(self.evalValues('a+1'), [6])
+
+    def testRenameOntoDeleted(self):
+        self.setData('a', [1, 2, 3])
+        self.setData('b', [4, 5, 6])
+        self.assertEqual(self.evalValues('b+1'), [5, 6, 7])
+        self.doc.deleteData('b')
+        self.doc.renameDataset('a', 'b')
+        self.assertEqual(self.evalValues('b+1'), [2, 3, 4])
+
+    def testDatasetNotCached(self):
+        # plain dataset names are looked up, not kept in the cache
+        self.setData('a', [1, 2, 3])
+        self.assertEqual(self.evalValues('a'), [1, 2, 3])
+        self.setData('a', [4])
+        self.assertEqual(self.evalValues('a'), [4])
+        self.assertEqual(len(self.doc.exprcache), 0)
+
+class CompactTypeTest(unittest.TestCase):
+    """Check datasets keeping compact types work in expressions."""
+
+    def setUp(self):
+        self.doc = document.Document()
+
+    def testStored(self):
+        vals = N.array([100, 200], dtype=N.uint8)
+        self.assertEqual(document.Dataset(data=vals).data.dtype, N.float64)
+        ds = document.Dataset(data=vals, keepdtype=True)
+        self.assertEqual(ds.data.dtype, N.uint8)
+
+    def testArithmetic(self):
+        self.doc.setData('i', document.Dataset(
+            data=N.array([100, 200], dtype=N.uint8), keepdtype=True))
+        self.doc.setData('j', document.Dataset(
+            data=N.array([30000, -30000], dtype=N.int16), keepdtype=True))
+
+        self.assertEqual(
+            list(self.doc.evalDatasetExpression('i*1000').data),
+            [100000, 200000])
+        self.assertEqual(
+            list(self.doc.evalDatasetExpression('i-128').data), [-28, 72])
+        self.assertEqual(
+            list(self.doc.evalDatasetExpression('j*2').data),
+            [60000, -60000])
+
+    def testExpressionDataset(self):
+        self.doc.setData('i', document.Dataset(
+            data=N.array([250, 255], dtype=N.uint8), keepdtype=True))
+        self.doc.setData('e', document.DatasetExpression(data='i+10'))
+        self.assertEqual(list(self.doc.data['e'].data), [260, 265])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,250 @@
+#    Copyright (C) 2014 Jeremy S. Sanders
+#    Email: Jeremy Sanders <jeremy@jeremysanders.net>
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+##############################################################################
+
+"""Tests of importing numpy files by memory mapping them and of
+appending captured data.
+
+Run from the source directory with
+python -m unittest discover -s tests -p 'test_*.py'
+"""
+
+from __future__ import division
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as N
+
+import unittestsetup
+from veusz.compat import cexec, CStringIO
+import veusz.document as document
+
+def runDocumentText(text):
+    """Make a document by running the saved document text."""
+    doc = document.Document()
+    ifc = document.CommandInterface(doc)
+    for cmd in ( document.CommandInterface.safe_commands +
+                 document.CommandInterface.unsafe_commands ):
+        doc.eval_context[cmd] = getattr(ifc, cmd)
+    cexec(text, doc.eval_context)
+    return doc
+
+class MemmapImportTest(unittest.TestCase):
+    """Check mapped files give the same values as the files, and are
+    mapped again when a saved document is loaded."""
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.doc = document.Document()
+        self.ifc = document.CommandInterface(self.doc)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def filename(self, name):
+        return os.path.join(self.tempdir, name)
+
+    def checkMapped(self, doc, name, expected):
+        ds = doc.data[name]
+        self.assertTrue(document.isMemoryMapped(ds.data))
+        self.assertEqual(ds.data.dtype, expected.dtype)
+        self.assertTrue(N.all(ds.data == expected))
+        self.assertFalse(ds.editable())
+
+    def roundTrip(self):
+        """Save document and load it again."""
+        f = CStringIO()
+        self.doc.saveToFile(f)
+        return runDocumentText(f.getvalue())
+
+    def testNpy(self):
+        vals = N.arange(1000, dtype=N.int16) * 3
+        N.save(self.filename('a.npy'), vals)
+        self.ifc.ImportFilePlugin(
+            'Numpy NPY import', self.filename('a.npy'), name='a',
+            errorsin2d=True, mmap=True, linked=True)
+        self.checkMapped(self.doc, 'a', vals)
+        self.checkMapped(self.roundTrip(), 'a', vals)
+
+    def testNpy2D(self):
+        vals = N.arange(200, dtype=N.float32).reshape(10, 20)
+        N.save(self.filename('b.npy'), vals)
+        self.ifc.ImportFilePlugin(
+            'Numpy NPY import', self.filename('b.npy'), name='b',
+            errorsin2d=True, mmap=True, linked=True)
+        self.checkMapped(self.doc, 'b', vals)
+        self.checkMapped(self.roundTrip(), 'b', vals)
+
+    def testNpz(self):
+        x = N.linspace(0, 1, 50)
+        y = N.arange(50, dtype=N.uint8)
+        N.savez(self.filename('c.npz'), x=x, y=y)
+        self.ifc.ImportFilePlugin(
+            'Numpy NPZ import', self.filename('c.npz'),
+            errorsin2d=True, mmap=True, linked=True)
+        self.checkMapped(self.doc, 'x', x)
+        self.checkMapped(self.doc, 'y', y)
+        doc = self.roundTrip()
+        self.checkMapped(doc, 'x', x)
+        self.checkMapped(doc, 'y', y)
+
+    def testNpzCompressed(self):
+        # compressed arrays cannot be mapped, so are read
+        x = N.arange(20.)
+        N.savez_compressed(self.filename('d.npz'), x=x)
+        self.ifc.ImportFilePlugin(
+            'Numpy NPZ import', self.filename('d.npz'), errorsin2d=True,
+            mmap=True)
+        ds = self.doc.data['x']
+        self.assertFalse(document.isMemoryMapped(ds.data))
+        self.assertTrue(N.all(ds.data == x))
+
+    def testBinary(self):
+        vals = N.arange(100, dtype='>u2')
+        with open(self.filename('e.bin'), 'wb') as f:
+            f.write(b'head')
+            vals.tofile(f)
+        self.ifc.ImportFilePlugin(
+            'Binary import', self.filename('e.bin'), name='e',
+            datatype='uint16', endian='big', offset=4, length=-1,
+            mmap=True, linked=True)
+        self.checkMapped(self.doc, 'e', vals)
+        self.checkMapped(self.roundTrip(), 'e', vals)
+
+    def testBinaryExpression(self):
+        # big endian values should not overflow in expressions
+        vals = N.array([1000, 60000], dtype='>u2')
+        with open(self.filename('g.bin'), 'wb') as f:
+            vals.tofile(f)
+        self.ifc.ImportFilePlugin(
+            'Binary import', self.filename('g.bin'), name='g',
+            datatype='uint16', endian='big', length=-1,
+            mmap=True, linked=True)
+        self.assertEqual(self.doc.data['g'].data.dtype, vals.dtype)
+        self.assertEqual(
+            list(self.doc.evalDatasetExpression('g*2').data),
+            [2000, 120000])
+
+    def testCopyReadsData(self):
+        vals = N.arange(10, dtype=N.int32)
+        N.save(self.filename('f.npy'), vals)
+        self.ifc.ImportFilePlugin(
+            'Numpy NPY import', self.filename('f.npy'), name='f',
+            errorsin2d=True, mmap=True)
+        copy = self.doc.data['f'].returnCopy()
+        self.assertFalse(document.isMemoryMapped(copy.data))
+        self.assertTrue(N.all(copy.data == vals))
+
+class AppendableTest(unittest.TestCase):
+    """Check appending to datasets, with and without a ring buffer."""
+
+    def testAppend(self):
+        ds = document.DatasetAppendable(serr=True)
+        vals = N.arange(1000.)
+        for i in range(0, 1000, 70):
+            ds.append(vals[i:i+70], serr=vals[i:i+70]*0.1)
+        self.assertTrue(N.all(ds.data == vals))
+        self.assertTrue(N.all(ds.serr == vals*0.1))
+        self.assertEqual(ds.numappended, 1000)
+        self.assertEqual(ds.memoryUsage(), sum(
+            [b.nbytes for b in ds._bufs.values()]))
+
+    def testTail(self):
+        ds = document.DatasetAppendable(capacity=100)
+        vals = N.arange(1000.)
+        ds.append(vals[:30])
+        self.assertEqual(ds.getRange(), (0., 29.))
+        for i in range(30, 1000, 45):
+            ds.append(vals[i:i+45])
+            self.assertTrue(N.all(ds.data == vals[:i+45][-100:]))
+            self.assertEqual(ds.getRange(), (ds.data[0], ds.data[-1]))
+        # more values than the capacity at once
+        ds.append(N.arange(250.))
+        self.assertTrue(N.all(ds.data == N.arange(150., 250.)))
+        self.assertEqual(ds.numappended, 1250)
+        # buffers are twice the capacity
+        self.assertEqual(ds.memoryUsage(), 200*8)
+
+    def testStats(self):
+        ds = document.DatasetAppendable(capacity=10)
+        ds.append([1., N.nan, 3.])
+        self.assertEqual(ds.validCount(), 2)
+        self.assertFalse(ds.isSorted())
+        ds.append(N.arange(4., 13.))
+        self.assertEqual(ds.validCount(), 10)
+        self.assertTrue(ds.isSorted())
+        ds.append([0.])
+        self.assertFalse(ds.isSorted())
+
+class CaptureAppendTest(unittest.TestCase):
+    """Check captured data are appended to the document and removed
+    from the reader."""
+
+    def read(self, text):
+        self.reader.readData(document.StringStream(text))
+
+    def capture(self, tail=None):
+        doc = document.Document()
+        self.reader = document.SimpleRead('x,+- y')
+        self.reader.tail = tail
+        self.read('1 0.1 10\n2 0.2 20\n')
+        op = document.OperationDataCaptureSet(self.reader, appendable=True)
+        op.do(doc)
+        for i in range(3, 300):
+            self.read('%i %g %i\n' % (i, i*0.1, i*10))
+            self.assertTrue(op.append(doc))
+            self.assertEqual(len(self.reader.datasets['x\0D']), 0)
+        self.assertEqual(self.reader.getDatasetCounts(), {'x': 299, 'y': 299})
+        return doc, op
+
+    def checkFinal(self, doc, op, tail):
+        """Check values set at the end of the capture."""
+        op.undo(doc)
+        document.OperationDataCaptureSet(self.reader).do(doc)
+        x = N.arange(1., 300.)[-tail:]
+        self.assertTrue(N.all(doc.data['x'].data == x))
+        self.assertTrue(N.allclose(doc.data['x'].serr, x*0.1))
+        self.assertTrue(N.all(doc.data['y'].data == x*10))
+
+    def testAppend(self):
+        doc, op = self.capture()
+        self.assertTrue(N.all(doc.data['x'].data == N.arange(1., 300.)))
+        self.checkFinal(doc, op, 299)
+
+    def testTail(self):
+        doc, op = self.capture(tail=50)
+        self.assertTrue(N.all(doc.data['y'].data == N.arange(250., 300.)*10))
+        self.assertTrue(sum([len(c) for c in
+                             self.reader.trimmed['x\0D'][1]]) < 100)
+        self.checkFinal(doc, op, 50)
+
+    def testRedo(self):
+        """Datasets can be set again after values are removed."""
+        doc, op = self.capture(tail=50)
+        op.undo(doc)
+        op = document.OperationDataCaptureSet(self.reader, appendable=True)
+        op.do(doc)
+        self.assertTrue(N.all(doc.data['x'].data == N.arange(250., 300.)))
+        self.read('300 30 3000\n')
+        self.assertTrue(op.append(doc))
+        self.assertEqual(doc.data['x'].data[-1], 300.)
+        self.assertEqual(len(doc.data['x'].data), 50)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+#    Copyright (C) 2014 Jeremy S. Sanders
+#    Email: Jeremy Sanders <jeremy@jeremysanders.net>
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+##############################################################################
+
+"""Tests of finding the widget drawn at a point on a painted page.
+
+Run from the source directory with
+python -m unittest discover -s tests -p 'test_*.py'
+"""
+
+from __future__ import division
+import unittest
+
+import unittestsetup
+import veusz.document as document
+
+class IdentifyWidgetTest(unittest.TestCase):
+    """Check widgets are found near the edges of the index cells."""
+
+    def setUp(self):
+        self.doc = document.Document()
+        ifc = document.CommandInterface(self.doc)
+        ifc.Add('page', name='page1')
+        ifc.To('page1')
+        ifc.Add('rect', name='rect1', xPos=0.5, yPos=0.5,
+                width=0.2, height=0.2)
+        self.rect = self.doc.resolveFullWidgetPath('/page1/rect1')
+
+        self.helper = document.PaintHelper((400, 400))
+        self.doc.paintTo(self.helper, 0)
+        state = [s for (w, l), s in self.helper.states.items()
+                 if w is self.rect][0]
+        self.bounds = state.record.boundingRect()
+
+    def testEdge(self):
+        b = self.bounds
+        self.assertTrue(self.helper.identifyWidgetAtPoint(
+            b.left(), b.center().y()) is self.rect)
+        self.assertTrue(self.helper.identifyWidgetAtPoint(
+            b.center().x(), b.center().y()) is None)
+
+    def testNextCell(self):
+        """Point in the next cell to the drawing, but within reach."""
+        b = self.bounds
+        self.helper.indexcellsize = b.left() + b.width() + 1
+        x = b.left() + b.width() + 2
+        y = b.center().y()
+        self.assertTrue(self.helper.identifyWidgetAtPoint(x, y) is self.rect)
+        self.assertTrue(self.helper.identifyWidgetAtPoint(x+10, y) is None)
+
+if __name__ == '__main__':
+    unittest.main()
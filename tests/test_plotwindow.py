@@ -0,0 +1,69 @@
+#    Copyright (C) 2014 Jeremy S. Sanders
+#    Email: Jeremy Sanders <jeremy@jeremysanders.net>
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+##############################################################################
+
+"""Tests of zooming the plot window.
+
+Run from the source directory with
+python -m unittest discover -s tests -p 'test_*.py'
+"""
+
+from __future__ import division
+import unittest
+
+import unittestsetup
+import veusz.document as document
+import veusz.windows.plotwindow as plotwindow
+
+class ZoomTest(unittest.TestCase):
+    """Check zooming to fit the page while a zoom preview is shown."""
+
+    def setUp(self):
+        self.doc = document.Document()
+        ifc = document.CommandInterface(self.doc)
+        ifc.Add('page', name='page1')
+        self.win = plotwindow.PlotWindow(self.doc, None)
+        self.win.setTimeout(0)
+        # render in this thread
+        self.win.rendercontrol.updateNumberThreads(num=0)
+        self.win.resize(300, 200)
+        self.win.checkPlotUpdate()
+
+    def tearDown(self):
+        self.win.rendercontrol.exitThreads()
+
+    def checkPending(self, zoomfn):
+        """Zooming gives the same result with a zoom pending."""
+        zoomfn()
+        expected = self.win.zoomfactor
+        self.win.setZoomFactor(3.)
+        self.assertTrue(self.win.zoomtimer.isActive())
+        self.assertEqual(self.win.painthelper.scaling, 1.)
+        zoomfn()
+        self.assertAlmostEqual(self.win.zoomfactor, expected)
+
+    def testZoomWidth(self):
+        self.checkPending(self.win.slotViewZoomWidth)
+
+    def testZoomHeight(self):
+        self.checkPending(self.win.slotViewZoomHeight)
+
+    def testZoomPage(self):
+        self.checkPending(self.win.slotViewZoomPage)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+#    Copyright (C) 2014 Jeremy S. Sanders
+#    Email: Jeremy Sanders <jeremy@jeremysanders.net>
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+##############################################################################
+
+"""Tests of helper routines in veusz.utils.
+
+Run from the source directory with
+python -m unittest discover -s tests -p 'test_*.py'
+"""
+
+from __future__ import division
+import unittest
+
+import numpy as N
+
+import unittestsetup
+import veusz.utils as utils
+
+class LRUCacheTest(unittest.TestCase):
+    """Check least recently used items are removed."""
+
+    def testEvictOldest(self):
+        c = utils.LRUCache(3)
+        for k in 'abc':
+            c.set(k, k.upper())
+        c.set('d', 'D')
+        self.assertTrue('a' not in c)
+        self.assertEqual(len(c), 3)
+        self.assertEqual(c.totalsize, 3)
+
+    def testGetRefreshes(self):
+        c = utils.LRUCache(3)
+        for k in 'abc':
+            c.set(k, k.upper())
+        self.assertEqual(c.get('a'), 'A')
+        c.set('d', 'D')
+        self.assertTrue('a' in c)
+        self.assertTrue('b' not in c)
+
+    def testSizes(self):
+        c = utils.LRUCache(10)
+        c.set('a', 1, size=4)
+        c.set('b', 2, size=4)
+        c.set('a', 3, size=2)
+        self.assertEqual(c.totalsize, 6)
+        c.set('c', 4, size=6)
+        self.assertEqual(sorted(c.items), ['a', 'c'])
+        # too large to store
+        c.set('d', 5, size=11)
+        self.assertTrue('d' not in c)
+        c.setMaxSize(6)
+        self.assertEqual(list(c.items), ['c'])
+        c.pop('c')
+        self.assertEqual(c.totalsize, 0)
+
+    def testHits(self):
+        c = utils.LRUCache(10)
+        c.set('a', None)
+        self.assertEqual(c.get('a', 'missing'), None)
+        self.assertEqual(c.get('b', 'missing'), 'missing')
+        self.assertEqual((c.hits, c.misses), (1, 1))
+
+class ColorMapLUTTest(unittest.TestCase):
+    """Check integer images coloured by lookup table get the same
+    colours as floating point values coloured by interpolation."""
+
+    def compare(self, ints, cmapname, scaling, minval, maxval):
+        colormap = utils.colormap
+        cmap = N.array(utils.defaultcolormaps[cmapname], dtype=N.intc)
+        lut = colormap._integerColorLUT(
+            cmap, scaling, ints.dtype, minval, maxval)
+        interp = colormap._colorsForFracs(
+            colormap.applyScaling(
+                ints.astype(N.float64), scaling, minval, maxval),
+            cmap)
+        self.assertEqual(lut[ints].tolist(), interp.tolist())
+
+    def testUInt8(self):
+        vals = N.arange(256, dtype=N.uint8)
+        for scaling in ('linear', 'sqrt', 'log', 'squared'):
+            self.compare(vals, 'heat', scaling, 10, 200)
+        self.compare(vals, 'spectrum2', 'linear', 3, 250)
+        self.compare(vals, 'grey-step5', 'linear', 0, 255)
+        self.compare(vals, 'spectrum-step', 'sqrt', 20, 100)
+
+    def testUInt16(self):
+        vals = N.arange(0, 65536, 97, dtype=N.uint16)
+        self.compare(vals, 'heat', 'linear', 0, 65535)
+        self.compare(vals, 'heat', 'log', 100, 40000)
+
+class CullMarkersTest(unittest.TestCase):
+    """Check only markers drawn over by later ones are removed."""
+
+    def testCoincident(self):
+        x = N.array([1., 5., 1., 3., 5.])
+        y = N.array([2., 2., 2., 4., 2.])
+        idx = utils.cullMarkerIndices(x, y)
+        self.assertEqual(list(idx), [2, 3, 4])
+
+    def testNoneRemoved(self):
+        x = N.arange(10.)
+        self.assertTrue(utils.cullMarkerIndices(x, x) is None)
+        self.assertTrue(
+            utils.cullMarkerIndices(x, x*0., resolution=0.25) is None)
+
+    def testResolution(self):
+        x = N.array([0.1, 0.2, 0.3, 0.6])
+        y = N.zeros(4)
+        self.assertEqual(list(utils.cullMarkerIndices(x, y)), [3])
+        self.assertEqual(
+            list(utils.cullMarkerIndices(x, y, resolution=0.25)), [1, 2, 3])
+
+    def testExact(self):
+        # vector output only removes markers at exactly the same place
+        x = N.array([0.1, 0.2, 0.1, 1e10, N.nan, 1e10])
+        y = N.array([0., 0., 0., 1e10, 0., 1e10])
+        self.assertEqual(
+            list(utils.cullMarkerIndices(x, y, resolution=None)), [1, 2, 5])
+        self.assertTrue(
+            utils.cullMarkerIndices(x[:2], y[:2], resolution=None) is None)
+
+    def testInvalid(self):
+        x = N.array([1., N.nan, 1., N.inf])
+        y = N.array([1., 1., 1., 1.])
+        self.assertEqual(list(utils.cullMarkerIndices(x, y)), [2])
+
+    def testLargeRange(self):
+        x = N.array([0., 1e10, 0.])
+        y = N.array([0., 1e10, 0.])
+        self.assertTrue(utils.cullMarkerIndices(x, y) is None)
+
+if __name__ == '__main__':
+    unittest.main()
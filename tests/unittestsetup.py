@@ -0,0 +1,37 @@
+#    Copyright (C) 2014 Jeremy S. Sanders
+#    Email: Jeremy Sanders <jeremy@jeremysanders.net>
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+##############################################################################
+
+"""Setup common to the unit tests, which need a Qt application and
+the widget types registered to make documents."""
+
+import os.path
+
+# use the resource files in the source directory, if not installed
+os.environ.setdefault(
+    'VEUSZ_RESOURCE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import veusz.qtall as qt4
+import veusz.setting as setting
+# required to register widget types
+import veusz.widgets
+
+app = qt4.QApplication.instance() or qt4.QApplication([])
+
+# expressions in tests only use numpy
+setting.transient_settings['unsafe_mode'] = False
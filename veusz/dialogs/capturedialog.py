@@ -295,13 +295,18 @@ class CapturingDialog(VeuszDialog):
     def slotUpdateTimer(self):
         """Called to update document while data is being captured."""
 
+        # add newly read data to the existing datasets if possible
+        if ( self.updateoperation and
+             self.updateoperation.append(self.document) ):
+            return
+
         # undo any previous update
         if self.updateoperation:
             self.updateoperation.undo(self.document)
 
         # create new one
         self.updateoperation = document.OperationDataCaptureSet(
-            self.simpleread)
+            self.simpleread, appendable=True)
 
         # apply it (bypass history here - urgh)
         self.updateoperation.do(self.document)
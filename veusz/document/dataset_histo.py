@@ -209,7 +209,6 @@ class DatasetHistoBins(Dataset):
         self.generator = generator
         self.document = document
         self.linked = None
-        self._invalidpoints = None
         self.changeset = -1
 
     def getData(self):
@@ -219,6 +218,10 @@ class DatasetHistoBins(Dataset):
             self.changeset = self.generator.document.changeset
         return self.datacache
 
+    def dependencyState(self):
+        """Histogram is updated whenever the document changes."""
+        return self.generator.document.changeset
+
     def saveToFile(self, fileobj, name):
         """Save dataset (counterpart does this)."""
         pass
@@ -242,7 +245,6 @@ class DatasetHistoValues(Dataset):
         self.generator = generator
         self.document = document
         self.linked = None
-        self._invalidpoints = None
         self.changeset = -1
 
     def getData(self):
@@ -252,6 +254,10 @@ class DatasetHistoValues(Dataset):
             self.changeset = self.generator.document.changeset
         return self.datacache
 
+    def dependencyState(self):
+        """Histogram is updated whenever the document changes."""
+        return self.generator.document.changeset
+
     def saveToFile(self, fileobj, name):
         """Save dataset and its counterpart to a file."""
         self.generator.saveToFile(fileobj)
@@ -24,7 +24,7 @@ import re
 
 import numpy as N
 
-from ..compat import czip, crange, citems, cbasestr, cstr, crepr
+from ..compat import czip, crange, citems, cvalues, cbasestr, cstr, crepr
 from .. import qtall as qt4
 from .. import utils
 from .. import setting
@@ -33,17 +33,28 @@ def _(text, disambiguation=None, context="Datasets"):
     """Translate text."""
     return qt4.QCoreApplication.translate(context, text, disambiguation)
 
-def convertNumpy(a, dims=1):
+# numpy types which can be stored without converting to double
+# precision if a dataset is created with keepdtype set
+compact_dtypes = frozenset([
+        N.dtype(t) for t in ('float32', 'int8', 'int16', 'int32',
+                             'uint8', 'uint16', 'uint32') ])
+
+def convertNumpy(a, dims=1, keepdtype=False):
     """Convert to a numpy double if possible.
 
     dims is number of dimensions to check for
+    if keepdtype is set, arrays with a type in compact_dtypes are
+    kept in their type, to save memory
     """
     if a is None:
         # leave as None
         return None
     elif isinstance(a, N.ndarray):
         # make conversion if numpy type is not correct
-        if a.dtype != N.float64:
+        if keepdtype and a.dtype.newbyteorder('=') in compact_dtypes:
+            if not a.dtype.isnative:
+                a = a.astype(a.dtype.newbyteorder('='))
+        elif a.dtype != N.float64:
             a = a.astype(N.float64)
     else:
         # convert to numpy array
@@ -53,6 +64,11 @@ def convertNumpy(a, dims=1):
         raise ValueError("Only %i-dimensional arrays or lists allowed" % dims)
     return a
 
+def isMemoryMapped(a):
+    """Is a a numpy array backed by a memory-mapped file?"""
+    return ( isinstance(a, N.memmap) and
+             getattr(a, 'filename', None) is not None )
+
 def convertNumpyAbs(a):
     """Convert to numpy 64 bit positive values, if possible."""
     if a is None:
@@ -162,6 +178,10 @@ class DatasetBase(object):
         # tags applied to dataset
         self.tags = set()
 
+        # statistics calculated from the values (see _cachedStat)
+        self._stats = {}
+        self._statsstate = None
+
     def saveLinksToSavedDoc(self, fileobj, savedlinks, relpath=None):
         '''Save the link to the saved document, if this dataset is linked.
 
@@ -269,6 +289,78 @@ class DatasetBase(object):
         """Is the dataset editable?"""
         return True
 
+    def invalidateCache(self):
+        """Remove values cached from the data, such as statistics.
+        This should be called if the values are modified."""
+        self._stats.clear()
+
+    def _cachedStat(self, name, calcfn):
+        """Return the statistic name, calling calcfn to calculate it
+        if it has not been cached.
+
+        The cache is also cleared if the dependency state changes,
+        so derived datasets are handled correctly.
+        """
+        state = self.dependencyState()
+        if state != self._statsstate:
+            self._stats.clear()
+            self._statsstate = state
+        try:
+            return self._stats[name]
+        except KeyError:
+            val = self._stats[name] = calcfn()
+            return val
+
+    def memoryUsage(self, mapped=False):
+        """Return the approximate number of bytes used by the values.
+
+        Memory-mapped arrays are not counted, unless mapped is set, in
+        which case only they are counted.
+        """
+        total = 0
+        for col in (self.columns or ('data',)):
+            val = getattr(self, col)
+            if isinstance(val, N.ndarray):
+                if isMemoryMapped(val) == mapped:
+                    total += val.nbytes
+            elif val is not None and not mapped:
+                total += sum([len(x) for x in val])
+        return total
+
+    def userMemory(self):
+        """Return text describing memory used by dataset for user."""
+
+        def fmtsize(size):
+            if size < 1024*1024:
+                return _('%.1f kB') % (size/1024)
+            else:
+                return _('%.1f MB') % (size/(1024*1024))
+
+        text = fmtsize(self.memoryUsage())
+        dtype = getattr(self.data, 'dtype', None)
+        if dtype is not None:
+            text += ' (%s)' % dtype.name
+        text = _('Memory: %s') % text
+
+        mapped = self.memoryUsage(mapped=True)
+        if mapped:
+            text += '\n' + _('Mapped from file: %s') % fmtsize(mapped)
+        return text
+
+    def dependencyState(self):
+        """Return a value which changes if the values of the dataset
+        change without its document datachangeset being updated.
+
+        Datasets holding their own values return None. Datasets
+        calculated from the rest of the document should override this.
+        """
+        return None
+
+    def dependencies(self):
+        """Return a tuple of the set of dataset names and the set of
+        custom definition names which this dataset reads."""
+        return set(), set()
+
 class Dataset2D(DatasetBase):
     '''Represents a two-dimensional dataset.'''
 
@@ -281,12 +373,13 @@ class Dataset2D(DatasetBase):
     # the dataset is recreated if its data changes
     isstable = True
 
-    def __init__(self, data, xrange=None, yrange=None):
+    def __init__(self, data, xrange=None, yrange=None, keepdtype=False):
         '''Create a two dimensional dataset based on data.
 
         data: 2d numpy of imaging data
         xrange: a tuple of (start, end) coordinates for x
         yrange: a tuple of (start, end) coordinates for y
+        keepdtype: keep compact numpy types instead of converting to double
         '''
 
         DatasetBase.__init__(self)
@@ -294,7 +387,7 @@ class Dataset2D(DatasetBase):
         # we don't want these set if a inheriting class uses properties instead
         if not hasattr(self, 'data'):
             try:
-                self.data = convertNumpy(data, dims=2)
+                self.data = convertNumpy(data, dims=2, keepdtype=keepdtype)
                 self.xrange = (0, self.data.shape[1])
                 self.yrange = (0, self.data.shape[0])
 
@@ -319,6 +412,33 @@ class Dataset2D(DatasetBase):
     def getDataRanges(self):
         return self.xrange, self.yrange
 
+    def finiteMask(self):
+        """Return a numpy bool array of which values are finite."""
+        return self._cachedStat('finite', lambda: N.isfinite(self.data))
+
+    def validCount(self):
+        """Return number of finite values."""
+        return self._cachedStat(
+            'validcount', lambda: int(self.finiteMask().sum()))
+
+    def getValueRange(self):
+        """Return (minimum, maximum) of the finite values, or
+        (nan, nan) if there are none."""
+        def calc():
+            if self.validCount() == 0:
+                return (N.nan, N.nan)
+            valid = self.data[self.finiteMask()]
+            return (float(valid.min()), float(valid.max()))
+        return self._cachedStat('valuerange', calc)
+
+    def getImagePyramid(self, method='mean'):
+        """Return reduced resolution versions of the values, combined
+        by method ('mean' or 'max'), for plotting images quickly (a
+        utils.ImagePyramid)."""
+        return self._cachedStat(
+            'imagepyramid_' + method,
+            lambda: utils.ImagePyramid(self.data, method=method))
+
     def saveToFile(self, fileobj, name):
         """Write the 2d dataset to the file given."""
 
@@ -365,7 +485,36 @@ class Dataset2D(DatasetBase):
         return text
 
     def returnCopy(self):
-        return Dataset2D( N.array(self.data), self.xrange, self.yrange)
+        return Dataset2D( N.array(self.data), self.xrange, self.yrange,
+                          keepdtype=True )
+
+class Dataset2DMemmap(Dataset2D):
+    """A 2D dataset with data in a memory-mapped file.
+
+    The data are not copied or converted to double precision. The
+    file is mapped read-only, so the dataset cannot be edited.
+    """
+
+    dstype = _('2D mapped')
+
+    def __init__(self, data, xrange=None, yrange=None):
+        DatasetBase.__init__(self)
+
+        if data.ndim != 2:
+            raise DatasetException('Data are not two dimensional')
+
+        self.data = data
+        self.xrange = xrange or (0, data.shape[1])
+        self.yrange = yrange or (0, data.shape[0])
+
+    def editable(self):
+        """Is the dataset editable?"""
+        return False
+
+    def returnCopy(self):
+        """Return version of dataset in memory with no linking."""
+        return Dataset2D( N.array(self.data), self.xrange, self.yrange,
+                          keepdtype=True )
 
 def dsPreviewHelper(d):
     """Get preview of numpy data d."""
@@ -400,17 +549,19 @@ class Dataset(DatasetBase):
     isstable = True
 
     def __init__(self, data = None, serr = None, nerr = None, perr = None,
-                 linked = None):
+                 linked = None, keepdtype = False):
         '''Initialise dataset with the sets of values given.
 
         The values can be given as numpy 1d arrays or lists of numbers
         linked optionally specifies a LinkedFile to link the dataset to
+        keepdtype keeps data with compact numpy types (see
+        compact_dtypes) in their type, rather than converting to double
         '''
         
         DatasetBase.__init__(self, linked=linked)
 
         # convert data to numpy arrays
-        data = convertNumpy(data)
+        data = convertNumpy(data, keepdtype=keepdtype)
         serr = convertNumpyAbs(serr)
         perr = convertNumpyAbs(perr)
         nerr = convertNumpyNegAbs(nerr)
@@ -422,8 +573,6 @@ class Dataset(DatasetBase):
                 raise DatasetException('Lengths of error data do not match data')
 
         # finally assign data
-        self._invalidpoints = None
-
         try:
             if not hasattr(self, 'data'):
                 self.data = data
@@ -460,16 +609,34 @@ class Dataset(DatasetBase):
 
     def invalidDataPoints(self):
         """Return a numpy bool detailing which datapoints are invalid."""
-        if self._invalidpoints is None:
-            # recalculate valid points
-            self._invalidpoints = N.logical_not(N.isfinite(self.data))
+        def calc():
+            invalid = N.logical_not(N.isfinite(self.data))
             for error in self.serr, self.perr, self.nerr:
                 if error is not None:
-                    self._invalidpoints = N.logical_or(self._invalidpoints,
-                                                       N.logical_not(N.isfinite(error)))
+                    invalid = N.logical_or(invalid,
+                                           N.logical_not(N.isfinite(error)))
+            return invalid
+        return self._cachedStat('invalid', calc)
+
+    def validCount(self):
+        """Return number of valid datapoints (including errors)."""
+        return self._cachedStat(
+            'validcount',
+            lambda: len(self.data) - int(self.invalidDataPoints().sum()))
+
+    def isSorted(self):
+        """Are the values in increasing order?"""
+        def calc():
+            d = self.data
+            return len(d) < 2 or bool(N.all(d[1:] >= d[:-1]))
+        return self._cachedStat('sorted', calc)
+
+    def getLODPyramid(self):
+        """Return multi-resolution minimum and maximum summary of the
+        values for plotting lines quickly (a utils.LODPyramid)."""
+        return self._cachedStat(
+            'lodpyramid', lambda: utils.LODPyramid(self.data))
 
-        return self._invalidpoints
-    
     def hasErrors(self):
         '''Whether errors on dataset'''
         return (self.serr is not None or self.nerr is not None or
@@ -479,8 +646,9 @@ class Dataset(DatasetBase):
         '''Get range of coordinates for each point in the form
         (minima, maxima).'''
 
-        minvals = self.data.copy()
-        maxvals = self.data.copy()
+        # this also converts any compact types to double
+        minvals = N.array(self.data, dtype=N.float64)
+        maxvals = minvals.copy()
 
         if self.serr is not None:
             minvals -= self.serr
@@ -495,13 +663,31 @@ class Dataset(DatasetBase):
         return ( minvals[N.isfinite(minvals)],
                  maxvals[N.isfinite(maxvals)] )
 
-    def getRange(self):
-        '''Get total range of coordinates. Returns None if empty.'''
-        minvals, maxvals = self.getPointRanges()
-        if len(minvals) > 0 and len(maxvals) > 0:
-            return ( minvals.min(), maxvals.max() )
+    def getRange(self, errors=True):
+        '''Get total range of coordinates. Returns None if empty.
+
+        If errors is False, the error bars are not included.
+        The range is cached until the dataset is modified.
+        '''
+        def calcwitherrs():
+            minvals, maxvals = self.getPointRanges()
+            if len(minvals) > 0 and len(maxvals) > 0:
+                return ( float(minvals.min()), float(maxvals.max()) )
+            else:
+                return None
+
+        def calcnoerrs():
+            data = self.data
+            valid = data[N.isfinite(data)]
+            if len(valid) > 0:
+                return ( float(valid.min()), float(valid.max()) )
+            else:
+                return None
+
+        if errors and self.hasErrors():
+            return self._cachedStat('rangeerrs', calcwitherrs)
         else:
-            return None
+            return self._cachedStat('range', calcnoerrs)
 
     def empty(self):
         '''Is the data defined?'''
@@ -512,7 +698,7 @@ class Dataset(DatasetBase):
 
         thetype == data | serr | perr | nerr
         """
-        self._invalidpoints = None
+        self.invalidateCache()
         if thetype in self.columns:
             setattr(self, thetype, vals)
         else:
@@ -575,7 +761,8 @@ class Dataset(DatasetBase):
             if coldata is not None:
                 retn[col] = coldata[row:row+numrows]
                 setattr(self, col, N.delete( coldata, N.s_[row:row+numrows] ))
-        
+
+        self.invalidateCache()
         self.document.modifiedData(self)
         return retn
 
@@ -592,6 +779,7 @@ class Dataset(DatasetBase):
                 newdata = N.insert(coldata, [row]*numrows, data)
                 setattr(self, col, newdata)
 
+        self.invalidateCache()
         self.document.modifiedData(self)
 
     def returnCopy(self):
@@ -599,7 +787,219 @@ class Dataset(DatasetBase):
         return Dataset(data = _copyOrNone(self.data),
                        serr = _copyOrNone(self.serr),
                        perr = _copyOrNone(self.perr),
-                       nerr = _copyOrNone(self.nerr))
+                       nerr = _copyOrNone(self.nerr),
+                       keepdtype = True)
+
+class Dataset1DMemmap(Dataset):
+    """A 1D dataset with data in a memory-mapped file.
+
+    The data are not copied or converted to double precision, so only
+    the parts of the file which are used are read into memory. Any
+    error bars are held in memory. The file is mapped read-only, so
+    the dataset cannot be edited.
+    """
+
+    dstype = _('1D mapped')
+
+    def __init__(self, data=None, serr=None, nerr=None, perr=None,
+                 linked=None):
+        DatasetBase.__init__(self, linked=linked)
+
+        if data.ndim != 1:
+            raise DatasetException('Data are not one dimensional')
+
+        serr = convertNumpyAbs(serr)
+        perr = convertNumpyAbs(perr)
+        nerr = convertNumpyNegAbs(nerr)
+        for x in (serr, nerr, perr):
+            if x is not None and x.shape != data.shape:
+                raise DatasetException('Lengths of error data do not match data')
+
+        self.data = data
+        self.serr = serr
+        self.perr = perr
+        self.nerr = nerr
+
+    def editable(self):
+        """Is the dataset editable?"""
+        return False
+
+    def deleteRows(self, row, numrows):
+        pass
+
+    def insertRows(self, row, numrows, rowdata):
+        pass
+
+    def returnCopy(self):
+        """Return version of dataset in memory with no linking."""
+        return Dataset(data = _copyOrNone(self.data),
+                       serr = _copyOrNone(self.serr),
+                       perr = _copyOrNone(self.perr),
+                       nerr = _copyOrNone(self.nerr),
+                       keepdtype = True)
+
+class DatasetAppendable(Dataset):
+    """A 1D dataset which values can be appended to quickly, for
+    capturing data.
+
+    Values are held in a buffer which grows by doubling, so appending
+    takes amortized constant time. If capacity is set, only the last
+    capacity values are kept (a ring buffer). The buffer is twice the
+    capacity, so the values are always contiguous.
+    """
+
+    dstype = _('1D appendable')
+
+    def __init__(self, capacity=None, serr=False, nerr=False, perr=False,
+                 linked=None):
+        """Make an empty dataset.
+
+        capacity: maximum number of values to keep, or None for no limit
+        serr, nerr, perr: whether the dataset has these error columns
+        """
+
+        DatasetBase.__init__(self, linked=linked)
+
+        self.capacity = capacity
+        size = 64 if capacity is None else 2*capacity
+        self._bufs = {'data': N.zeros(size)}
+        for col, has in (('serr', serr), ('nerr', nerr), ('perr', perr)):
+            if has:
+                self._bufs[col] = N.zeros(size)
+        self._start = self._end = 0
+        # total number of values ever appended
+        self.numappended = 0
+
+    def _getCol(self, col):
+        buf = self._bufs.get(col)
+        if buf is None:
+            return None
+        return buf[self._start:self._end]
+
+    data = property(lambda self: self._getCol('data'))
+    serr = property(lambda self: self._getCol('serr'))
+    nerr = property(lambda self: self._getCol('nerr'))
+    perr = property(lambda self: self._getCol('perr'))
+
+    def _makeRoom(self, num):
+        """Make sure there is space in the buffers for num values."""
+
+        size = len(self._bufs['data'])
+        if self._end + num <= size:
+            return
+
+        keep = self._end - self._start
+        if self.capacity is not None:
+            # drop values which will be pushed out of the ring
+            keep = min(keep, self.capacity - num)
+        else:
+            size = max(size, 2*(keep + num))
+
+        for col, buf in citems(self._bufs):
+            newbuf = buf if len(buf) == size else N.zeros(size)
+            newbuf[:keep] = buf[self._end-keep:self._end]
+            self._bufs[col] = newbuf
+        self._start, self._end = 0, keep
+
+    def append(self, data, serr=None, nerr=None, perr=None):
+        """Append values (and errors, if the dataset has them) to the
+        dataset.
+
+        Cached statistics are updated from the new values only where
+        possible. Document.appendedData should be called afterwards.
+        """
+
+        data = N.array(data, dtype=N.float64).ravel()
+        num = len(data)
+        if num == 0:
+            return
+        cols = {'data': data, 'serr': convertNumpyAbs(serr),
+                'nerr': convertNumpyNegAbs(nerr),
+                'perr': convertNumpyAbs(perr)}
+        for col, vals in citems(cols):
+            if col in self._bufs and (vals is None or len(vals) != num):
+                # missing errors are treated as invalid values
+                cols[col] = N.repeat(N.nan, num)
+
+        # remove values which would be immediately pushed out of the ring
+        if self.capacity is not None and num > self.capacity:
+            for col in self._bufs:
+                cols[col] = cols[col][num-self.capacity:]
+        numkeep = len(cols['data'])
+
+        # dataset of the new values, for statistics
+        newds = Dataset(**dict([(col, cols[col]) for col in self._bufs]))
+        oldlen = self._end - self._start
+        dropped = 0
+        if self.capacity is not None:
+            dropped = max(oldlen + numkeep - self.capacity, 0)
+        # count valid values pushed out before they are overwritten
+        droppedvalid = None
+        if dropped and 'validcount' in self._stats:
+            droppedvalid = Dataset(**dict(
+                [(col, self._getCol(col)[:dropped])
+                 for col in self._bufs])).validCount()
+        lastval = self.data[-1] if oldlen > dropped else None
+
+        self._makeRoom(numkeep)
+        for col, buf in citems(self._bufs):
+            buf[self._end:self._end+numkeep] = cols[col]
+        self._end += numkeep
+        if self.capacity is not None:
+            self._start = max(self._start, self._end - self.capacity)
+        self.numappended += num
+
+        self._updateStats(newds, dropped, droppedvalid, lastval)
+
+    def _updateStats(self, newds, dropped, droppedvalid, lastval):
+        """Update cached statistics given dataset of the new values,
+        the number of values dropped from the start and the number of
+        those which were valid."""
+
+        stats = self._stats
+        for name in list(stats):
+            if name == 'lodpyramid':
+                stats[name].update(self.data, dropped=dropped)
+            elif name == 'validcount':
+                stats[name] += newds.validCount() - (droppedvalid or 0)
+            elif name == 'sorted' and (stats[name] or not dropped):
+                # dropping values from the start cannot unsort values
+                stats[name] = (
+                    stats[name] and newds.isSorted() and
+                    (lastval is None or newds.data[0] >= lastval) )
+            elif dropped:
+                # values have been removed, so cannot update
+                del stats[name]
+            elif name in ('range', 'rangeerrs'):
+                old = stats[name]
+                new = newds.getRange(errors=name == 'rangeerrs')
+                if old is not None and new is not None:
+                    stats[name] = (min(old[0], new[0]), max(old[1], new[1]))
+                elif new is not None:
+                    stats[name] = new
+            else:
+                del stats[name]
+
+    def memoryUsage(self, mapped=False):
+        """Return the number of bytes used by the buffers, including
+        the space kept for appending."""
+        if mapped:
+            return 0
+        return sum([buf.nbytes for buf in cvalues(self._bufs)])
+
+    def __getitem__(self, key):
+        """Return a dataset based on this dataset."""
+        return Dataset(**self._getItemHelper(key))
+
+    def editable(self):
+        """Is the dataset editable?"""
+        return False
+
+    def deleteRows(self, row, numrows):
+        pass
+
+    def insertRows(self, row, numrows, rowdata):
+        pass
 
 class DatasetDateTime(Dataset):
     """Dataset holding dates and times."""
@@ -792,17 +1192,67 @@ def _substituteDatasets(datasets, expression, thispart):
 
     return ''.join(bits), dslist
 
+def _expressionNames(expression):
+    """Return the set of names in expression which could refer to
+    datasets or custom definitions.
+
+    This includes names which are not currently datasets, so that
+    the expression can be reevaluated if they are later created.
+    """
+
+    names = set()
+    for bit in dataexpr_split_re.split(expression):
+        if dataexpr_quote_re.match(bit):
+            bit = bit[1:-1]
+        if not bit:
+            continue
+        names.add(bit)
+
+        bitbits = bit.split('_')
+        if len(bitbits) > 1 and bitbits[-1] in dataexpr_columns:
+            names.add('_'.join(bitbits[:-1]))
+    return names
+
+def _namesDependencyState(doc, names):
+    """Return the state of the datasets and customs which the names
+    given could refer to.
+
+    This is the change set of each dataset (and its own dependency
+    state) and the change sets of any custom definitions used.
+    """
+
+    dsstate = []
+    for name in sorted(names):
+        ds = doc.data.get(name)
+        if ds is not None:
+            dsstate.append( (name, doc.datachangesets.get(name),
+                             ds.dependencyState()) )
+
+    customstate = doc.customsState(doc.customDependencies(names))
+    return (tuple(dsstate), customstate)
+
+def expressionDependencyState(doc, expression):
+    """Return a value which changes if the result of evaluating the
+    dataset expression given could change."""
+    return _namesDependencyState(doc, _expressionNames(expression))
+
 def _evaluateDataset(datasets, dsname, dspart):
     """Return the dataset given.
 
     dsname is the name of the dataset
     dspart is the part to get (e.g. data, serr)
+
+    Compact numpy types are converted to double precision, so that
+    arithmetic in expressions does not overflow.
     """
     if dspart in dataexpr_columns:
         val = getattr(datasets[dsname], dspart)
         if val is None:
             raise DatasetExpressionException(
                 _("Dataset '%s' does not have part '%s'") % (dsname, dspart))
+        if ( isinstance(val, N.ndarray) and
+             val.dtype.newbyteorder('=') in compact_dtypes ):
+            val = val.astype(N.float64)
         return val
     else:
         raise DatasetExpressionException(
@@ -965,11 +1415,52 @@ class DatasetExpression(Dataset):
 
         self.docchangeset = -1
         self.evaluated = {}
+        self.evaluatedok = True
+        # set while evaluating, to avoid infinite recursion
+        self.evaluating = False
+
+        # state of inputs when last evaluated (see dependencyState)
+        self.lastdepstate = None
+        # set while working out dependency state, to catch loops
+        self.incheckstate = False
+        # datasets and customs read during last evaluation
+        self.dsdeps = set()
+        self.customdeps = set()
 
     def editable(self):
         """Is the dataset editable?"""
         return False
 
+    def _exprNames(self):
+        """Get names used in the expressions which could be datasets
+        or custom definitions."""
+        names = set()
+        for part in self.columns:
+            expr = self.expr[part]
+            if expr is not None and expr.strip() != '':
+                names |= _expressionNames(expr)
+        return names
+
+    def dependencyState(self):
+        """Return state of the inputs of the expressions.
+        The dataset needs reevaluating only when this changes."""
+
+        if self.incheckstate:
+            # expression refers to itself
+            return None
+
+        self.incheckstate = True
+        try:
+            return _namesDependencyState(self.document, self._exprNames())
+        finally:
+            self.incheckstate = False
+
+    def dependencies(self):
+        """Return set of dataset names and set of custom names read
+        by the expressions."""
+        self.updateEvaluation()
+        return set(self.dsdeps), set(self.customdeps)
+
     def evaluateDataset(self, dsname, dspart):
         """Return the dataset given.
         
@@ -984,7 +1475,10 @@ class DatasetExpression(Dataset):
         Returns True if succeeded
         """
         # replace dataset names with calls
-        newexpr = _substituteDatasets(self.document.data, expr, part)[0]
+        newexpr, dslist = _substituteDatasets(self.document.data, expr, part)
+        self.dsdeps.update(dslist)
+        self.customdeps.update(
+            self.document.customDependencies(_expressionNames(expr)) )
 
         comp = self.document.compileCheckedExpression(newexpr, origexpr=expr)
         if comp is None:
@@ -1043,22 +1537,38 @@ class DatasetExpression(Dataset):
 
         Returns False if problem with any evaluation
         """
+        changeset = self.document.changeset
+        if self.docchangeset != changeset and not self.evaluating:
+            self.evaluating = True
+            try:
+                # only reevaluate if the datasets or customs read changed
+                depstate = self.dependencyState()
+                if depstate != self.lastdepstate or not self.evaluated:
+                    self.lastdepstate = depstate
+                    self._evaluateAll()
+            finally:
+                self.evaluating = False
+            # the values are only marked as current once evaluated
+            self.docchangeset = changeset
+
+        return self.evaluatedok
+
+    def _evaluateAll(self):
+        """Evaluate all the parts of the dataset."""
+
+        # zero out previous values
+        for part in self.columns:
+            self.evaluated[part] = None
+        self.dsdeps = set()
+        self.customdeps = set()
+
+        # update all parts
         ok = True
-        if self.docchangeset != self.document.changeset:
-            # avoid infinite recursion!
-            self.docchangeset = self.document.changeset
-
-            # zero out previous values
-            for part in self.columns:
-                self.evaluated[part] = None
-
-            # update all parts
-            for part in self.columns:
-                expr = self.expr[part]
-                if expr is not None and expr.strip() != '':
-                    ok = ok and self._evaluatePart(expr, part)
-
-        return ok
+        for part in self.columns:
+            expr = self.expr[part]
+            if expr is not None and expr.strip() != '':
+                ok = ok and self._evaluatePart(expr, part)
+        self.evaluatedok = ok
 
     def _propValues(self, part):
         """Check whether expressions need reevaluating,
@@ -1265,6 +1775,10 @@ class Dataset2DXYZExpression(Dataset2D):
         """Is the dataset editable?"""
         return False
 
+    def dependencyState(self):
+        """Values may change whenever the document changes."""
+        return self.document.changeset
+
     def evaluateDataset(self, dsname, dspart):
         """Return the dataset given.
         
@@ -1391,6 +1905,10 @@ class Dataset2DExpression(Dataset2D):
     def editable(self):
         """Is the dataset editable?"""
         return False
+
+    def dependencyState(self):
+        """Values may change whenever the document changes."""
+        return self.document.changeset
         
     @property
     def data(self):
@@ -1467,6 +1985,10 @@ class Dataset2DXYFunc(Dataset2D):
         """Is the dataset editable?"""
         return False
 
+    def dependencyState(self):
+        """Values may change whenever the document changes."""
+        return self.document.changeset
+
     @property
     def data(self):
         """Return data, or empty array if error."""
@@ -1557,6 +2079,10 @@ class _DatasetPlugin(object):
         """Can relationship be unlinked?"""
         return True
 
+    def dependencyState(self):
+        """Plugin is updated whenever the document changes."""
+        return self.document.changeset
+
     def deleteRows(self, row, numrows):
         pass
 
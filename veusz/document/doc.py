@@ -110,6 +110,10 @@ class Document( qt4.QObject ):
         # default document locale
         self.locale = qt4.QLocale()
 
+        # results of evaluating dataset expressions
+        self.exprcache = utils.LRUCache(
+            setting.settingdb['cache_expr_MB']*1024*1024)
+
         self.clearHistory()
         self.wipe()
 
@@ -121,6 +125,11 @@ class Document( qt4.QObject ):
         # type is constant or function
         # we use this format to preserve evaluation order
         self.customs = []
+
+        # change tracking of custom definitions
+        self.customdefns = dict()       # definition of each defined name
+        self.customchangesets = dict()  # each name has an associated change set
+
         self.updateEvalContext()
 
         # copy default colormaps
@@ -134,6 +143,7 @@ class Document( qt4.QObject ):
     def wipe(self):
         """Wipe out any stored data."""
         self.data = {}
+        self.exprcache.clear()
         self.basewidget = widgetfactory.thefactory.makeWidget(
             'document', None, None)
         self.basewidget.document = self
@@ -291,9 +301,7 @@ class Document( qt4.QObject ):
         dataset.document = self
         
         # update the change tracking
-        cs = self.datachangesets.get(name, 0)
-        self.datachangesets[name] = cs + 1
-        self.datachangeset += 1
+        self._dataChanged(name)
         self.setModified()
     
     def deleteData(self, name):
@@ -302,16 +310,34 @@ class Document( qt4.QObject ):
             del self.data[name]
             
             # don't remove the changeset tracker, in case this action is later undone
-            self.datachangesets[name] += 1
-            self.datachangeset += 1
+            self._dataChanged(name)
             self.setModified()
 
+    def _dataChanged(self, name):
+        """Record that the dataset with the name given changed.
+
+        The change set given to the name is unique over all names, so
+        a dataset renamed or replaced never has an earlier state.
+        """
+        self.datachangeset += 1
+        self.datachangesets[name] = self.datachangeset
+
     def modifiedData(self, dataset):
         """The named dataset was modified"""
+        dataset.invalidateCache()
         for name, ds in citems(self.data):
             if ds is dataset:
-                self.datachangesets[name] += 1
-                self.datachangeset += 1
+                self._dataChanged(name)
+                self.setModified()
+
+    def appendedData(self, dataset):
+        """Values were appended to the dataset given (a
+        DatasetAppendable). The dataset keeps its cached values, which
+        it updated for the appended values.
+        """
+        for name, ds in citems(self.data):
+            if ds is dataset:
+                self._dataChanged(name)
                 self.setModified()
 
     def getLinkedFiles(self, filenames=None):
@@ -360,6 +386,7 @@ class Document( qt4.QObject ):
     def deleteDataset(self, name):
         """Remove the selected dataset."""
         del self.data[name]
+        self._dataChanged(name)
         self.setModified()
 
     def renameDataset(self, oldname, newname):
@@ -367,8 +394,9 @@ class Document( qt4.QObject ):
         d = self.data[oldname]
         del self.data[oldname]
         self.data[newname] = d
-        # transfer change set to new name
-        self.datachangesets[newname] = self.datachangesets[oldname]
+        # both names now refer to different data
+        self._dataChanged(oldname)
+        self._dataChanged(newname)
 
         self.setModified()
 
@@ -855,6 +883,77 @@ class Document( qt4.QObject ):
             else:
                 raise ValueError('Invalid custom type')
 
+        self._updateCustomChangesets()
+
+    def _customDefinitions(self):
+        """Return a dict mapping names defined in the evaluation context
+        by the customs to their definitions."""
+
+        defns = {}
+        for ctype, name, val in self.customs:
+            name = name.strip()
+            if ctype == 'constant':
+                defns[name] = (ctype, name, val)
+            elif ctype == 'function':
+                m = function_re.match(name)
+                if m:
+                    defns[m.group(1)] = (ctype, name, val)
+            elif ctype == 'import':
+                for symbol in identifier_split_re.findall(val):
+                    defns[symbol] = (ctype, name, val)
+        return defns
+
+    def _updateCustomChangesets(self):
+        """Increase change sets of custom names whose definition changed."""
+
+        defns = self._customDefinitions()
+        for name in set(defns) | set(self.customdefns):
+            if defns.get(name) != self.customdefns.get(name):
+                cs = self.customchangesets.get(name, 0)
+                self.customchangesets[name] = cs + 1
+        self.customdefns = defns
+
+    def customDependencies(self, names):
+        """Return set of custom names used by the names given.
+
+        This includes customs used indirectly by the definitions of
+        other customs.
+        """
+
+        found = set()
+        todo = [n for n in names if n in self.customdefns]
+        while todo:
+            name = todo.pop()
+            if name in found:
+                continue
+            found.add(name)
+            val = self.customdefns[name][2]
+            for ident in identifier_split_re.findall(val):
+                if ident in self.customdefns and ident not in found:
+                    todo.append(ident)
+        return found
+
+    def customsState(self, names):
+        """Return a tuple representing the state of the custom names
+        given, which changes if any of their definitions change."""
+        return tuple(sorted(
+            [ (n, self.customchangesets.get(n)) for n in names ]))
+
+    def datasetDependencies(self):
+        """Return the dependency graph of the datasets.
+
+        This is a dict mapping dataset names to tuples of the set of
+        dataset names and the set of custom names each reads. Datasets
+        which read nothing are not included.
+        """
+
+        graph = {}
+        for name, ds in citems(self.data):
+            dsdeps, customdeps = ds.dependencies()
+            if dsdeps or customdeps:
+                graph[name] = (dsdeps, customdeps)
+        return graph
+
     def customDict(self):
         """Return a dictionary mapping custom names to (idx, type, value)."""
         retn = {}
@@ -863,24 +962,36 @@ class Document( qt4.QObject ):
         return retn
 
     def evalDatasetExpression(self, expr, part='data', datatype='numeric',
-                              dimensions=1,
-                              _cache={}, _cache_changeset=[None]):
+                              dimensions=1):
         """Return dataset after evaluating a dataset expression.
         part is 'data', 'serr', 'perr' or 'nerr' - these are the
         dataset parts which are evaluated by the expression
 
+        Results are cached in exprcache, keyed on the expression and
+        the state of the datasets and customs it reads.
+
         None is returned on error
         """
 
-        key = (expr, part, datatype, dimensions)
-        if _cache_changeset[0] != self.changeset:
-            _cache_changeset[0] = self.changeset
-            _cache.clear()
-        elif key in _cache:
-            return _cache[key]
-
-        _cache[key] = ds = datasets.evalDatasetExpression(
+        # existing datasets are returned directly, so are not cached
+        # (otherwise replaced datasets would be kept alive)
+        if expr in self.data:
+            return datasets.evalDatasetExpression(
+                self, expr, part=part, datatype=datatype,
+                dimensions=dimensions)
+
+        key = ( expr, part, datatype, dimensions,
+                datasets.expressionDependencyState(self, expr) )
+        # use self as a marker, as None is a valid cached result
+        ds = self.exprcache.get(key, self)
+        if ds is not self:
+            return ds
+
+        ds = datasets.evalDatasetExpression(
             self, expr, part=part, datatype=datatype, dimensions=dimensions)
+
+        size = 0 if ds is None else ds.memoryUsage()
+        self.exprcache.set(key, ds, size=size)
         return ds
 
     def valsToDataset(self, vals, datatype, dimensions):
@@ -1119,11 +1119,21 @@ class OperationDataImportPlugin(OperationDataImportBase):
         names = []
         for d in results:
             if isinstance(d, plugins.Dataset1D):
-                ds = datasets.Dataset(data=d.data, serr=d.serr, perr=d.perr,
-                                      nerr=d.nerr)
+                if datasets.isMemoryMapped(d.data):
+                    ds = datasets.Dataset1DMemmap(
+                        data=d.data, serr=d.serr, perr=d.perr, nerr=d.nerr)
+                else:
+                    ds = datasets.Dataset(
+                        data=d.data, serr=d.serr, perr=d.perr, nerr=d.nerr,
+                        keepdtype=True)
             elif isinstance(d, plugins.Dataset2D):
-                ds = datasets.Dataset2D(data=d.data, xrange=d.rangex,
-                                        yrange=d.rangey)
+                if datasets.isMemoryMapped(d.data):
+                    ds = datasets.Dataset2DMemmap(
+                        d.data, xrange=d.rangex, yrange=d.rangey)
+                else:
+                    ds = datasets.Dataset2D(
+                        data=d.data, xrange=d.rangex, yrange=d.rangey,
+                        keepdtype=True)
             elif isinstance(d, plugins.DatasetText):
                 ds = datasets.DatasetText(data=d.data)
             elif isinstance(d, plugins.DatasetDateTime):
@@ -1164,9 +1174,13 @@ class OperationDataCaptureSet(object):
 
     descr = _('data capture')
 
-    def __init__(self, simplereadobject):
-        """Takes a simpleread object containing the data to be set."""
+    def __init__(self, simplereadobject, appendable=False):
+        """Takes a simpleread object containing the data to be set.
+
+        If appendable is set, the datasets can be updated with newly
+        read data using append()."""
         self.simplereadobject = simplereadobject
+        self.appendable = appendable
 
     def do(self, document):
         """Set the data in the document."""
@@ -1174,7 +1188,8 @@ class OperationDataCaptureSet(object):
         databackup = dict(document.data)
         
         # set the data to the document and keep a list of what's changed
-        self.nameschanged = self.simplereadobject.setInDocument(document)
+        self.nameschanged = self.simplereadobject.setInDocument(
+            document, appendable=self.appendable)
 
         # keep a copy of datasets which have changed from backup
         self.olddata = {}
@@ -1193,6 +1208,17 @@ class OperationDataCaptureSet(object):
                 # or delete datasets that weren't there before
                 document.deleteData(name)
 
+    def append(self, document):
+        """Append data read since do() was called to the datasets.
+
+        Returns False if this was not possible (e.g. new datasets were
+        read), in which case the operation should be undone and redone.
+        """
+        if not self.appendable:
+            return False
+        names = self.simplereadobject.appendInDocument(document)
+        return names is not None and names == self.nameschanged
+
 class OperationDataTag(object):
     """Add a tag to a list of datasets."""
 
@@ -1286,6 +1312,9 @@ class OperationDatasetSetVal(object):
         """Set the value."""
         ds = document.data[self.datasetname]
         datacol = getattr(ds, self.columnname)
+        if datacol.dtype != N.float64:
+            # compact types cannot hold all values
+            datacol = datacol.astype(N.float64)
         self.oldval = datacol[self.row]
         datacol[self.row] = self.val
         ds.changeValues(self.columnname, datacol)
@@ -1312,6 +1341,9 @@ class OperationDatasetSetVal2D(object):
     def do(self, document):
         """Set the value."""
         ds = document.data[self.datasetname]
+        if ds.data.dtype != N.float64:
+            # compact types cannot hold all values
+            ds.data = ds.data.astype(N.float64)
         self.oldval = ds.data[self.row, self.col]
         ds.data[self.row, self.col] = self.val
         document.modifiedData(ds)
@@ -20,6 +20,7 @@
 """
 
 from __future__ import division
+from ..compat import crange
 from .. import qtall as qt4
 from .. import setting
 
@@ -30,18 +31,32 @@ except ImportError:
     def RecordPaintDevice(width, height, dpix, dpiy):
         return qt4.QPicture()
 
+# approximate memory used by each item drawn in a recorded layer
+_layeritembytes = 64
+
+def _recordSize(record):
+    """Estimate memory used by a recorded layer, in bytes."""
+    try:
+        return max(record.drawItemCount(), 1) * _layeritembytes
+    except AttributeError:
+        # QPicture fallback
+        return max(record.size(), 1)
+
 class DrawState(object):
     """Each widget plotted has a recorded state in this object."""
 
-    def __init__(self, widget, bounds, clip, helper):
+    def __init__(self, widget, bounds, clip, helper, record=None):
         """Initialise state for widget.
         bounds: tuple of (x1, y1, x2, y2)
-        clip: if clipping should be done, another tuple."""
+        clip: if clipping should be done, another tuple.
+        record: previously recorded output to use, if set"""
 
         self.widget = widget
-        self.record = RecordPaintDevice(
-            helper.pagesize[0], helper.pagesize[1],
-            helper.dpi[0], helper.dpi[1])
+        if record is None:
+            record = RecordPaintDevice(
+                helper.pagesize[0], helper.pagesize[1],
+                helper.dpi[0], helper.dpi[1])
+        self.record = record
         self.bounds = bounds
         self.clip = clip
 
@@ -83,7 +98,7 @@ class PaintHelper(object):
     """
 
     def __init__(self, pagesize, scaling=1., dpi=(100, 100),
-                 directpaint=None):
+                 directpaint=None, layercache=None):
         """Initialise using page size (tuple of pixelw, pixelh).
 
         If directpaint is set to a painter, use this directly rather
@@ -91,6 +106,10 @@ class PaintHelper(object):
         case the painter must be a DirectPainter object, and
         save()/restore() must be placed around doing the rendering to
         the painter.
+
+        layercache is an optional utils.LRUCache in which the layers
+        recorded for widgets are kept between PaintHelpers, so that
+        unchanged widgets do not have to be drawn again.
         """
 
         self.dpi = dpi
@@ -108,12 +127,26 @@ class PaintHelper(object):
         # whether to directly render to a painter or make new layers
         self.directpaint = directpaint
 
+        # whether the output is a bitmap (recorded layers are only
+        # shown on the screen)
+        if directpaint is None:
+            self.raster = True
+        else:
+            self.raster = isinstance(
+                directpaint.device(), (qt4.QImage, qt4.QPixmap))
+
+        # cache of recorded layers (not used if painting directly)
+        self.layercache = layercache if directpaint is None else None
+
         # state for root widget
         self.rootstate = None
 
         # keep track of last widget being plotted
         self.widgetstack = []
 
+        # grid of states by drawn area, made when first needed
+        self.stateindex = None
+
     @property
     def maxsize(self):
         """Return maximum page dimension (using PaintHelper's DPI)."""
@@ -137,18 +170,7 @@ class PaintHelper(object):
         layer: layer to plot widget, or None to get next automatically
         """
 
-        # automatically add a layer if not given
-        if layer is None:
-            layer = 0
-            while (widget, layer) in self.states:
-                layer += 1
-
-        s = self.states[(widget, layer)] = DrawState(widget, bounds, clip, self)
-
-        if self.widgetstack:
-            self.states[(self.widgetstack[-1], 0)].children.append(s)
-        else:
-            self.rootstate = s
+        s = self._addState(widget, bounds, clip, layer)
 
         if self.directpaint is None:
             # save to multiple recorded layers
@@ -165,12 +187,67 @@ class PaintHelper(object):
         p.pagesize = self.pagesize
         p.maxsize = max(*self.pagesize)
         p.dpi = self.dpi[1]
+        p.raster = self.raster
 
         if clip is not None:
             p.setClipRect(clip)
 
         return p
 
+    def _addState(self, widget, bounds, clip, layer, record=None):
+        """Add a new DrawState for the widget."""
+
+        # automatically add a layer if not given
+        if layer is None:
+            layer = 0
+            while (widget, layer) in self.states:
+                layer += 1
+
+        s = self.states[(widget, layer)] = DrawState(
+            widget, bounds, clip, self, record=record)
+        self.stateindex = None
+
+        if self.widgetstack:
+            self.states[(self.widgetstack[-1], 0)].children.append(s)
+        else:
+            self.rootstate = s
+        return s
+
+    def _layerKey(self, key, bounds, clip):
+        """Key for layer cache, including the page properties."""
+        if clip is not None:
+            clip = (clip.left(), clip.top(), clip.width(), clip.height())
+        return (key, tuple(bounds), clip, self.pagesize, tuple(self.dpi),
+                self.scaling)
+
+    def useCachedLayer(self, widget, bounds, clip, key):
+        """If a layer for the widget with the key given is in the layer
+        cache, use it for the widget instead of drawing and return True.
+
+        key should change if anything the widget draws changes.
+        """
+        if self.layercache is None:
+            return False
+        entry = self.layercache.get(self._layerKey(key, bounds, clip))
+        if entry is None:
+            return False
+
+        record, cgis = entry
+        s = self._addState(widget, bounds, clip, None, record=record)
+        s.cgis = cgis
+        return True
+
+    def cacheLayer(self, widget, bounds, clip, key):
+        """Keep the layer drawn for the widget in the layer cache."""
+        if self.layercache is None:
+            return
+        s = self.states.get((widget, 0))
+        if ( s is not None and not s.children and
+             (widget, 1) not in self.states ):
+            self.layercache.set(self._layerKey(key, bounds, clip),
+                                (s.record, s.cgis),
+                                size=_recordSize(s.record))
+
     def setControlGraph(self, widget, cgis):
         """Records the control graph list for the widget given."""
         self.states[(widget,0)].cgis = cgis
@@ -198,31 +275,66 @@ class PaintHelper(object):
             #print '  '*indent, child.widget
             self._renderState(child, painter, indent=indent+1)
 
+    # size of cells in grid of drawn areas of states
+    indexcellsize = 64
+
+    def _buildStateIndex(self):
+        """Make a grid of cells on the page, listing the states which
+        have drawn in each cell as (drawing order, state, rect)."""
+
+        index = {}
+        cs = self.indexcellsize
+        order = 0
+        stack = [self.rootstate] if self.rootstate is not None else []
+        while stack:
+            state = stack.pop(0)
+            # QPicture returns a QRect here
+            r = qt4.QRectF(state.record.boundingRect())
+            if not r.isEmpty():
+                for cx in crange( int(r.left()//cs), int(r.right()//cs)+1 ):
+                    for cy in crange( int(r.top()//cs),
+                                      int(r.bottom()//cs)+1 ):
+                        index.setdefault((cx, cy), []).append(
+                            (order, state, r) )
+            order += 1
+            stack = state.children + stack
+        return index
+
     def identifyWidgetAtPoint(self, x, y, antialias=True):
         """What widget has drawn at the point x,y?
 
         Returns the widget drawn last on the point, or None if it is
         an empty part of the page.
-        root is the root widget to recurse from
         if antialias is true, do test for antialiased drawing
+
+        Only the states with drawing near the point are checked, most
+        recently drawn first.
         """
-        
+
+        if self.stateindex is None:
+            self.stateindex = self._buildStateIndex()
+
         # make a small image filled with a specific color
         box = 3
         specialcolor = qt4.QColor(254, 255, 254)
         origpix = qt4.QPixmap(2*box+1, 2*box+1)
         origpix.fill(specialcolor)
         origimg = origpix.toImage()
-        # store most recent widget here
-        lastwidget = [None]
-        
-        def rendernextstate(state):
-            """Recursively draw painter.
-
-            Checks whether drawing a widgetchanges the small image
-            around the point given.
-            """
-
+        boxrect = qt4.QRectF(x-box, y-box, box*2+1, box*2+1)
+
+        # states from all the cells the box overlaps, without duplicates
+        cs = self.indexcellsize
+        found = {}
+        for cx in crange( int(boxrect.left()//cs),
+                          int(boxrect.right()//cs)+1 ):
+            for cy in crange( int(boxrect.top()//cs),
+                              int(boxrect.bottom()//cs)+1 ):
+                for c in self.stateindex.get( (cx, cy), [] ):
+                    if c[2].intersects(boxrect):
+                        found[c[0]] = c
+        candidates = sorted(found.values(), key=lambda c: -c[0])
+
+        for order, state, r in candidates:
             pixmap = qt4.QPixmap(origpix)
             painter = qt4.QPainter(pixmap)
             painter.setRenderHint(qt4.QPainter.Antialiasing, antialias)
@@ -230,18 +342,16 @@ class PaintHelper(object):
             # this makes the small image draw from x-box->x+box, y-box->y+box
             # translate would get overriden by coordinate system playback
             painter.setWindow(x-box,y-box,box*2+1,box*2+1)
-            state.record.play(painter)
+            if hasattr(state.record, 'playRegion'):
+                # only draw items overlapping the small image
+                state.record.playRegion(painter, boxrect)
+            else:
+                state.record.play(painter)
             painter.end()
-            newimg = pixmap.toImage()
-
-            if newimg != origimg:
-                lastwidget[0] = state.widget
-
-            for child in state.children:
-                rendernextstate(child)
 
-        rendernextstate(self.rootstate)
-        return lastwidget[0]
+            if pixmap.toImage() != origimg:
+                return state.widget
+        return None
 
     def pointInWidgetBounds(self, x, y, widgettype):
         """Which graph widget plots at point x,y?
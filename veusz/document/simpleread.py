@@ -279,10 +279,65 @@ class DescriptorPart(object):
                 # add data into dataset
                 dataset.append(dat)
 
+    def _datasetName(self, index, block):
+        """Name of dataset read for index and block."""
+        if self.single:
+            name = '%s' % (self.name,)
+        else:
+            name = '%s_%i' % (self.name, index)
+        if block is not None:
+            name += '_%i' % block
+        return name
+
+    def _allValues(self, thedatasets, trimmed, key):
+        """Return the values read for key, including any kept in
+        trimmed, and the index in the read values of the first."""
+        vals = thedatasets[key]
+        if trimmed is None or key not in trimmed:
+            return vals, 0
+        num, chunks = trimmed[key]
+        first = num - sum([len(c) for c in chunks])
+        vals = N.concatenate(chunks + [N.array(vals, dtype=N.float64)])
+        return vals, first
+
+    def _trimValues(self, thedatasets, trimmed, name, total, tail):
+        """Move the first total values read for name, which are in the
+        document, from the lists of read values to trimmed.
+
+        trimmed holds for each key the number of values trimmed and
+        a list of numpy arrays of them. Only the last tail values are
+        kept, if tail is set.
+        """
+
+        for key in (name+'\0D', name+'\0+', name+'\0-', name+'\0+-'):
+            if key not in thedatasets:
+                continue
+            vals = thedatasets[key]
+            entry = trimmed.setdefault(key, [0, []])
+            num = max(total - entry[0], 0)
+            entry[0] += num
+            entry[1].append( N.array(vals[:num], dtype=N.float64) )
+            del vals[:num]
+
+            if tail is not None:
+                # remove values which are never needed again
+                chunks = entry[1]
+                numkept = sum([len(c) for c in chunks])
+                while chunks and numkept - len(chunks[0]) >= tail:
+                    numkept -= len(chunks.pop(0))
+
     def setInDocument(self, thedatasets, document, block=None,
                       linkedfile=None,
-                      prefix="", suffix="", tail=None):
-        """Set the read-in data in the document."""
+                      prefix="", suffix="", tail=None, appendable=False,
+                      trimmed=None):
+        """Set the read-in data in the document.
+
+        If appendable is set, numeric data are stored in
+        DatasetAppendable datasets, to which appendInDocument can
+        later add new values. If trimmed is a dict, the values are
+        then moved from the lists of read values to trimmed, where
+        they are stored compactly.
+        """
 
         # we didn't read any data
         if self.datatype is None:
@@ -291,31 +346,51 @@ class DescriptorPart(object):
         names = []
         for index in crange(self.startindex, self.stopindex+1):
             # name for variable
-            if self.single:
-                name = '%s' % (self.name,)
-            else:
-                name = '%s_%i' % (self.name, index)
-            if block is not None:
-                name += '_%i' % block
+            name = self._datasetName(index, block)
 
             # does the dataset exist?
             if name+'\0D' in thedatasets:
-                vals = thedatasets[name+'\0D']
+                vals, first = self._allValues(
+                    thedatasets, trimmed, name+'\0D')
                 pos = neg = sym = None
 
                 # retrieve the data for this dataset
-                if name+'\0+' in thedatasets: pos = thedatasets[name+'\0+']
-                if name+'\0-' in thedatasets: neg = thedatasets[name+'\0-']
-                if name+'\0+-' in thedatasets: sym = thedatasets[name+'\0+-']
+                if name+'\0+' in thedatasets:
+                    pos = self._allValues(thedatasets, trimmed, name+'\0+')[0]
+                if name+'\0-' in thedatasets:
+                    neg = self._allValues(thedatasets, trimmed, name+'\0-')[0]
+                if name+'\0+-' in thedatasets:
+                    sym = self._allValues(
+                        thedatasets, trimmed, name+'\0+-')[0]
 
                 # make sure components are the same length
                 minlength = 99999999999999
                 for ds in vals, pos, neg, sym:
                     if ds is not None and len(ds) < minlength:
                         minlength = len(ds)
-                for ds in vals, pos, neg, sym:
-                    if ds is not None and len(ds) != minlength:
-                        del ds[minlength:]
+
+                if appendable and self.datatype == 'float':
+                    # ring buffer keeps the last tail values itself
+                    ds = datasets.DatasetAppendable(
+                        capacity=tail, serr=sym is not None,
+                        nerr=neg is not None, perr=pos is not None,
+                        linked=linkedfile)
+                    ds.append(vals[:minlength],
+                              serr=None if sym is None else sym[:minlength],
+                              nerr=None if neg is None else neg[:minlength],
+                              perr=None if pos is None else pos[:minlength])
+                    finalname = prefix + name + suffix
+                    document.setData( finalname, ds )
+                    names.append(finalname)
+                    if trimmed is not None:
+                        self._trimValues(thedatasets, trimmed, name,
+                                         first+minlength, tail)
+                    continue
+
+                vals = vals[:minlength]
+                if sym is not None: sym = sym[:minlength]
+                if pos is not None: pos = pos[:minlength]
+                if neg is not None: neg = neg[:minlength]
 
                 # only remember last N values
                 if tail is not None:
@@ -346,6 +421,62 @@ class DescriptorPart(object):
 
         return names
 
+    def appendInDocument(self, thedatasets, document, block=None,
+                         prefix="", suffix="", tail=None, trimmed=None):
+        """Append values read since the datasets were set in the
+        document by setInDocument with appendable set.
+
+        If trimmed is a dict, the appended values are moved from the
+        lists of read values to trimmed, as in setInDocument.
+
+        Returns list of dataset names, or None if the datasets cannot
+        be appended to, in which case they should be set again.
+        """
+
+        if self.datatype is None:
+            return []
+
+        names = []
+        for index in crange(self.startindex, self.stopindex+1):
+            name = self._datasetName(index, block)
+            if name+'\0D' not in thedatasets:
+                break
+
+            finalname = prefix + name + suffix
+            ds = document.data.get(finalname)
+            if not isinstance(ds, datasets.DatasetAppendable):
+                return None
+
+            # values for each column and the number trimmed from them
+            cols = {}
+            for col, key in (('data', '\0D'), ('perr', '\0+'),
+                             ('nerr', '\0-'), ('serr', '\0+-')):
+                if name+key in thedatasets:
+                    num = 0 if trimmed is None else trimmed.get(
+                        name+key, [0])[0]
+                    cols[col] = (thedatasets[name+key], num)
+            if set(cols) != set([c for c in ds.columns
+                                 if getattr(ds, c) is not None]):
+                # error columns have changed
+                return None
+
+            # only add values where all the columns have been read
+            # (the trimmed values are those already in the document)
+            if trimmed is None:
+                start = ds.numappended
+            else:
+                start = cols['data'][1]
+            end = min([len(v)+num for v, num in cols.values()])
+            if end > start:
+                ds.append(**dict([(col, v[start-num:end-num])
+                                  for col, (v, num) in citems(cols)]))
+                document.appendedData(ds)
+                if trimmed is not None:
+                    self._trimValues(thedatasets, trimmed, name, end, tail)
+            names.append(finalname)
+
+        return names
+
 class Stream(object):
     """This object reads through an input data source (override
     readLine) and interprets data from the source."""
@@ -454,6 +585,8 @@ class SimpleRead(object):
     def clearState(self):
         """Start reading from scratch."""
         self.datasets = {}
+        # values removed from datasets once appended to the document
+        self.trimmed = {}
         self.blocks = None
         self.tail = None
 
@@ -569,13 +702,16 @@ class SimpleRead(object):
         out = {}
         for name, data in citems(self.datasets):
             if name[-2:] == '\0D':
-                out[name[:-2]] = len(data)
+                out[name[:-2]] = len(data) + self.trimmed.get(name, [0])[0]
         return out
 
     def setInDocument(self, document, linkedfile=None,
-                      prefix='', suffix=''):
+                      prefix='', suffix='', appendable=False):
         """Set the data in the document.
 
+        If appendable is set, numeric datasets can have new values
+        added by appendInDocument.
+
         Returns list of variable names read.
         """
 
@@ -597,7 +733,37 @@ class SimpleRead(object):
                     block=block,
                     linkedfile=linkedfile,
                     prefix=prefix, suffix=suffix,
-                    tail=self.tail)
+                    tail=self.tail, appendable=appendable,
+                    trimmed=self.trimmed)
+
+        return names
+
+    def appendInDocument(self, document, prefix='', suffix=''):
+        """Append values read since setInDocument was called with
+        appendable set.
+
+        Returns list of variable names, or None if the datasets have
+        to be set again, as they cannot be appended to.
+        """
+
+        if self.blocks is None:
+            blocks = [None]
+        else:
+            blocks = self.blocks
+
+        if self.autodescr and prefix == '' and suffix == '':
+            prefix = 'col'
+
+        names = []
+        for block in blocks:
+            for part in self.parts:
+                partnames = part.appendInDocument(
+                    self.datasets, document, block=block,
+                    prefix=prefix, suffix=suffix,
+                    tail=self.tail, trimmed=self.trimmed)
+                if partnames is None:
+                    return None
+                names += partnames
 
         return names
 
@@ -1461,6 +1461,9 @@ build_cntr_list_v2(long *np, double *xp, double *yp, int nparts, long ntotal)
    is 2, the set of polygons bounded by the levels will be returned.
    If points is True, the lines will be returned as a list of list
    of points; otherwise, as a list of tuples of vectors.
+
+   The GIL is released while tracing, so other threads can trace
+   using other Cntr objects at the same time.
 */
 
 static PyObject *
@@ -1478,6 +1481,7 @@ cntr_trace(Csite *site, double levels[], int nlevels, int points, long nchunk)
     long ntotal = 0;
     long nparts2 = 0;
     long ntotal2 = 0;
+    const char *errmsg = NULL;
 
     site->zlevel[0] = levels[0];
     site->zlevel[1] = levels[0];
@@ -1486,6 +1490,8 @@ cntr_trace(Csite *site, double levels[], int nlevels, int points, long nchunk)
         site->zlevel[1] = levels[1];
     }
     site->n = site->count = 0;
+
+    Py_BEGIN_ALLOW_THREADS
     data_init (site, 0, nchunk);
 
     /* make first pass to compute required sizes for second pass */
@@ -1505,6 +1511,8 @@ cntr_trace(Csite *site, double levels[], int nlevels, int points, long nchunk)
             ntotal -= n;
         }
     }
+    Py_END_ALLOW_THREADS
+
     xp0 = (double *) PyMem_Malloc(ntotal * sizeof(double));
     yp0 = (double *) PyMem_Malloc(ntotal * sizeof(double));
     nseg0 = (long *) PyMem_Malloc(nparts * sizeof(long));
@@ -1518,14 +1526,14 @@ cntr_trace(Csite *site, double levels[], int nlevels, int points, long nchunk)
     site->xcp = xp0;
     site->ycp = yp0;
     iseg = 0;
+    Py_BEGIN_ALLOW_THREADS
     for (;;iseg++)
     {
         n = curve_tracer (site, 1);
         if (ntotal2 + n > ntotal)
         {
-            PyErr_SetString(PyExc_RuntimeError,
-                "curve_tracer: ntotal2, pass 2 exceeds ntotal, pass 1");
-            goto error;
+            errmsg = "curve_tracer: ntotal2, pass 2 exceeds ntotal, pass 1";
+            break;
         }
         if (n == 0)
             break;
@@ -1540,11 +1548,17 @@ cntr_trace(Csite *site, double levels[], int nlevels, int points, long nchunk)
         }
         else
         {
-            PyErr_SetString(PyExc_RuntimeError,
-                "Negative n from curve_tracer in pass 2");
-            goto error;
+            errmsg = "Negative n from curve_tracer in pass 2";
+            break;
         }
     }
+    Py_END_ALLOW_THREADS
+
+    if (errmsg != NULL)
+    {
+        PyErr_SetString(PyExc_RuntimeError, errmsg);
+        goto error;
+    }
 
 
     if (points)
@@ -1576,6 +1590,8 @@ typedef struct {
     PyObject_HEAD
     PyArrayObject *xpa, *ypa, *zpa, *mpa;
     Csite *site;
+    /* set while tracing, as the site cannot be shared between threads */
+    int busy;
 } Cntr;
 
 
@@ -1631,6 +1647,7 @@ Cntr_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
         self->ypa = NULL;
         self->zpa = NULL;
         self->mpa = NULL;
+        self->busy = 0;
     }
 
     return (PyObject *)self;
@@ -1723,6 +1740,7 @@ Cntr_trace(Cntr *self, PyObject *args, PyObject *kwds)
     int nlevels = 2;
     int points = 0;
     long nchunk = 0L;
+    PyObject *result;
     static char *kwlist[] = {"level0", "level1", "points", "nchunk", NULL};
 
     if (! PyArg_ParseTupleAndKeywords(args, kwds, "d|dil", kwlist,
@@ -1732,7 +1750,17 @@ Cntr_trace(Cntr *self, PyObject *args, PyObject *kwds)
     }
     if (levels[1] == -1e100 || levels[1] <= levels[0])
         nlevels = 1;
-    return cntr_trace(self->site, levels, nlevels, points, nchunk);
+    if (self->busy)
+    {
+        PyErr_SetString(PyExc_RuntimeError,
+            "Cntr object is already tracing in another thread");
+        return NULL;
+    }
+
+    self->busy = 1;
+    result = cntr_trace(self->site, levels, nlevels, points, nchunk);
+    self->busy = 0;
+    return result;
 }
 
 static PyMethodDef Cntr_methods[] = {
@@ -22,6 +22,7 @@
 #include "polygonclip.h"
 
 #include <math.h>
+#include <algorithm>
 
 #include <QPointF>
 #include <QVector>
@@ -29,6 +30,8 @@
 #include <QPen>
 #include <QTransform>
 #include <QColor>
+#include <QHash>
+#include <QPair>
 
 namespace
 {
@@ -158,6 +161,95 @@ namespace
       }
   }
 
+  // draw paths in batches by color, then empty the batches
+  void drawColorBatches(QPainter& painter,
+			QHash<QRgb, QPainterPath>& batches)
+  {
+    QHash<QRgb, QPainterPath>::const_iterator it;
+    for(it = batches.constBegin(); it != batches.constEnd(); ++it)
+      {
+	painter.setBrush( QBrush(QColor::fromRgba(it.key())) );
+	painter.drawPath(it.value());
+      }
+    batches.clear();
+  }
+
+  // Plot paths colored by colorimg, combining paths of the same
+  // color into a single path. Batches are drawn when a path would
+  // overlap one waiting to be drawn, so the output is the same as
+  // drawing each path separately.
+  void plotColorBatchesToPainter(QPainter& painter,
+				 const QPainterPath& path,
+				 const Numpy1DObj& x, const Numpy1DObj& y,
+				 const QRectF& cliprect,
+				 const QImage& colorimg, int size)
+  {
+    // region affected by drawing path, including line width and
+    // antialiasing
+    const QPen pen(painter.pen());
+    const qreal devscale =
+      sqrt(fabs(painter.worldTransform().determinant()));
+    qreal pad = devscale > 0 ? 2/devscale : 2;
+    if( pen.style() != Qt::NoPen )
+      {
+	const qreal lw = (pen.widthF() > 1 ? pen.widthF() : 1) *
+	  (pen.miterLimit() > 1 ? pen.miterLimit() : 1);
+	pad += (pen.isCosmetic() && devscale > 0) ? lw/devscale : lw;
+      }
+    const QRectF box = path.boundingRect().adjusted(-pad, -pad, pad, pad);
+    const qreal cw = box.width(), ch = box.height();
+
+    // paths waiting to be drawn, by color
+    QHash<QRgb, QPainterPath> batches;
+    // positions of waiting paths in grid of cells of path size
+    typedef QPair<int, int> Cell;
+    QHash< Cell, QVector<QPointF> > waiting;
+
+    QPointF lastpt(-1e6, -1e6);
+    for(int i = 0; i < size; ++i)
+      {
+	const QPointF pt(x(i), y(i));
+	if( ! cliprect.contains(pt) || smallDelta(lastpt, pt) )
+	  continue;
+
+	// any overlapping paths are in this or neighbouring cells
+	const int cx = int(floor(pt.x()/cw));
+	const int cy = int(floor(pt.y()/ch));
+	bool overlap = false;
+	for(int dy = -1; dy <= 1 && !overlap; ++dy)
+	  for(int dx = -1; dx <= 1 && !overlap; ++dx)
+	    {
+	      QHash< Cell, QVector<QPointF> >::const_iterator it =
+		waiting.constFind(Cell(cx+dx, cy+dy));
+	      if( it != waiting.constEnd() )
+		{
+		  foreach(const QPointF& wpt, it.value())
+		    if( fabs(wpt.x()-pt.x()) < cw &&
+			fabs(wpt.y()-pt.y()) < ch )
+		      {
+			overlap = true;
+			break;
+		      }
+		}
+	    }
+
+	if( overlap )
+	  {
+	    drawColorBatches(painter, batches);
+	    waiting.clear();
+	  }
+
+	QPainterPath& batch = batches[colorimg.pixel(i, 0)];
+	if( batch.isEmpty() )
+	  batch.setFillRule(path.fillRule());
+	batch.addPath(path.translated(pt));
+	waiting[Cell(cx, cy)].append(pt);
+	lastpt = pt;
+      }
+
+    drawColorBatches(painter, batches);
+  }
+
 } // namespace
 
 void plotPathsToPainter(QPainter& painter, QPainterPath& path,
@@ -193,6 +285,14 @@ void plotPathsToPainter(QPainter& painter, QPainterPath& path,
   if( scaling != 0 )
     size = min(size, scaling->dim);
 
+  // colored paths of the same size can be drawn in batches
+  if( colorimg != 0 && scaling == 0 )
+    {
+      plotColorBatchesToPainter(painter, path, x, y, cliprect, *colorimg,
+				size);
+      return;
+    }
+
   // draw each path
   for(int i = 0; i < size; ++i)
     {
@@ -235,6 +335,52 @@ void plotPathsToPainter(QPainter& painter, QPainterPath& path,
     }
 }
 
+void plotImagesToPainter(QPainter& painter,
+			 const Numpy1DObj& x, const Numpy1DObj& y,
+			 const Numpy1DObj& srcx, const QImage& img,
+			 int width, int height)
+{
+  const int size = min(min(x.dim, y.dim), srcx.dim);
+  for(int i = 0; i < size; ++i)
+    {
+      painter.drawImage( QPointF(x(i), y(i)), img,
+			 QRectF(srcx(i), 0, width, height) );
+    }
+}
+
+void addTransformedPathsToPath(QPainterPath& out, const QPainterPath& path,
+			       const Numpy1DObj& x, const Numpy1DObj& y,
+			       const Numpy1DObj& angles,
+			       const Numpy1DObj& scales,
+			       const QRectF* clip)
+{
+  // furthest extent of path from its origin
+  const QRectF pathbox = path.boundingRect();
+  const qreal extent = std::max( std::max(fabs(pathbox.left()),
+					  fabs(pathbox.right())),
+				 std::max(fabs(pathbox.top()),
+					  fabs(pathbox.bottom())) );
+
+  const int size = min(x.dim, y.dim, angles.dim, scales.dim);
+  for(int i = 0; i < size; ++i)
+    {
+      const qreal s = scales(i);
+      const QPointF pt(x(i), y(i));
+      if( clip != 0 )
+	{
+	  const qreal r = extent*fabs(s);
+	  if( ! clip->adjusted(-r, -r, r, r).contains(pt) )
+	    continue;
+	}
+
+      QTransform t;
+      t.translate(pt.x(), pt.y());
+      t.rotate(angles(i));
+      t.scale(s, s);
+      out.addPath(t.map(path));
+    }
+}
+
 void plotLinesToPainter(QPainter& painter,
 			const Numpy1DObj& x1, const Numpy1DObj& y1,
 			const Numpy1DObj& x2, const Numpy1DObj& y2,
@@ -402,6 +548,45 @@ QImage numpyToQImage(const Numpy2DObj& imgdata, const Numpy2DIntObj &colors,
   return img;
 }
 
+QImage numpyLUTToQImage(const Numpy2DIntObj& imgdata,
+			const Numpy2DIntObj& lut, bool forcetrans)
+{
+  const int numcolors = lut.dims[0];
+  if ( lut.dims[1] != 4 )
+    throw "4 columns required in lookup table";
+  if ( numcolors < 1 )
+    throw "at least 1 color required";
+  const int xw = imgdata.dims[1];
+  const int yw = imgdata.dims[0];
+
+  // convert table to Qt colors, checking for transparency
+  bool trans = forcetrans;
+  QVector<QRgb> table(numcolors);
+  for(int i = 0; i < numcolors; ++i)
+    {
+      table[i] = qRgba(lut(2, i), lut(1, i), lut(0, i), lut(3, i));
+      if( lut(3, i) != 255 )
+	trans = true;
+    }
+  const QRgb* tab = table.constData();
+
+  // make image
+  QImage img(xw, yw, trans ? QImage::Format_ARGB32 : QImage::Format_RGB32);
+
+  // iterate over input pixels, looking up colors
+  for(int y=0; y<yw; ++y)
+    {
+      // direction of images is different for qt and numpy image
+      QRgb* scanline = reinterpret_cast<QRgb*>(img.scanLine(yw-y-1));
+      for(int x=0; x<xw; ++x)
+	{
+	  const int idx = clipval(imgdata(x, y), 0, numcolors-1);
+	  *(scanline+x) = tab[idx];
+	}
+    }
+  return img;
+}
+
 void applyImageTransparancy(QImage& img, const Numpy2DObj& data)
 {
   const int xw = min(data.dims[1], img.width());
@@ -54,6 +54,23 @@ void plotPathsToPainter(QPainter& painter, QPainterPath& path,
 			const QImage* colorimg = 0,
 			bool scaleline = false);
 
+// add copies of path to out, at x and y, rotated by angles (degrees)
+// and scaled by scales
+// paths outside clip (if set) are not added
+void addTransformedPathsToPath(QPainterPath& out, const QPainterPath& path,
+			       const Numpy1DObj& x, const Numpy1DObj& y,
+			       const Numpy1DObj& angles,
+			       const Numpy1DObj& scales,
+			       const QRectF* clip = 0);
+
+// draw parts of an image to painter
+// the top left of the images are at x and y
+// the parts are width x height, starting at srcx in the image
+void plotImagesToPainter(QPainter& painter,
+			 const Numpy1DObj& x, const Numpy1DObj& y,
+			 const Numpy1DObj& srcx, const QImage& img,
+			 int width, int height);
+
 void plotLinesToPainter(QPainter& painter,
 			const Numpy1DObj& x1, const Numpy1DObj& y1,
 			const Numpy1DObj& x2, const Numpy1DObj& y2,
@@ -67,6 +84,9 @@ void plotBoxesToPainter(QPainter& painter,
 QImage numpyToQImage(const Numpy2DObj& data, const Numpy2DIntObj &colors,
 		     bool forcetrans = false);
 
+QImage numpyLUTToQImage(const Numpy2DIntObj& imgdata,
+			const Numpy2DIntObj& lut, bool forcetrans = false);
+
 void applyImageTransparancy(QImage& img, const Numpy2DObj& data);
 
 #endif
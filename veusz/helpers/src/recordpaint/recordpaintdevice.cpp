@@ -75,3 +75,15 @@ void RecordPaintDevice::play(QPainter& painter)
       el->paint(painter, origtransform);
     }
 }
+
+void RecordPaintDevice::playRegion(QPainter& painter, const QRectF& rect)
+{
+  QTransform origtransform(painter.worldTransform());
+  const int num = _elements.size();
+  for(int i = 0; i < num; ++i)
+    {
+      const QRectF& b = _bounds[i];
+      if( b.isNull() || b.intersects(rect) )
+	_elements[i]->paint(painter, origtransform);
+    }
+}
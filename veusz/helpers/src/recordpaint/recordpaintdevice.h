@@ -21,6 +21,7 @@
 
 #include <QPaintDevice>
 #include <QVector>
+#include <QRectF>
 #include "paintelement.h"
 #include "recordpaintengine.h"
 
@@ -34,6 +35,13 @@ public:
   // play back all 
   void play(QPainter& painter);
 
+  // play back state changes and only the drawing which may
+  // overlap rect (in device coordinates)
+  void playRegion(QPainter& painter, const QRectF& rect);
+
+  // bounding rectangle of all drawing (device coordinates)
+  QRectF boundingRect() const { return _boundingrect; }
+
   int metric(QPaintDevice::PaintDeviceMetric metric) const;
 
   int drawItemCount() const { return _engine->drawItemCount(); }
@@ -43,15 +51,22 @@ public:
 
 private:
   // add an element to the list of maintained elements
-  void addElement(PaintElement* el)
+  // state elements have a null bounds rectangle
+  void addElement(PaintElement* el, const QRectF& bounds = QRectF())
   {
     _elements.push_back(el);
+    _bounds.push_back(bounds);
+    if( ! bounds.isNull() )
+      _boundingrect |= bounds;
   }
 
 private:
   int _width, _height, _dpix, _dpiy;
   RecordPaintEngine* _engine;
   QVector<PaintElement*> _elements;
+  // bounds of each element (null if a state element)
+  QVector<QRectF> _bounds;
+  QRectF _boundingrect;
 };
 
 #endif
@@ -22,6 +22,8 @@
 #include <QLineF>
 #include <QVector>
 #include <QPaintEngine>
+#include <QPolygonF>
+#include <algorithm>
 
 #include "paintelement.h"
 #include "recordpaintengine.h"
@@ -442,6 +444,35 @@ namespace {
   };
 
 
+  // bounding rectangles of lists of points and lines
+
+  template <class T>
+  QRectF pointsBounds(const T* points, int pointcount)
+  {
+    QPolygonF poly;
+    for(int i=0; i<pointcount; ++i)
+      poly << points[i];
+    return poly.boundingRect();
+  }
+
+  template <class T>
+  QRectF linesBounds(const T* lines, int linecount)
+  {
+    QPolygonF poly;
+    for(int i=0; i<linecount; ++i)
+      poly << lines[i].p1() << lines[i].p2();
+    return poly.boundingRect();
+  }
+
+  template <class T>
+  QRectF rectsBounds(const T* rects, int rectcount)
+  {
+    QRectF r;
+    for(int i=0; i<rectcount; ++i)
+      r |= QRectF(rects[i]);
+    return r;
+  }
+
   // end anonymous block
 }
 
@@ -451,14 +482,37 @@ namespace {
 RecordPaintEngine::RecordPaintEngine()
   : QPaintEngine(QPaintEngine::AllFeatures),
     _drawitemcount(0),
-    _pdev(0)
+    _pdev(0),
+    _penwidth(0),
+    _pencosmetic(true)
+{
+}
+
+void RecordPaintEngine::addDrawElement(PaintElement* el, const QRectF& rect)
 {
+  // add on the pen width, then convert to device coordinates
+  QRectF r(rect.normalized());
+  if( ! _pencosmetic )
+    {
+      const qreal w = _penwidth*0.5;
+      r.adjust(-w, -w, w, w);
+    }
+  r = _transform.mapRect(r);
+
+  // allow for cosmetic pens and antialiasing
+  const qreal pad = (_pencosmetic ? std::max(_penwidth, qreal(1))*0.5 : 0) + 1;
+  r.adjust(-pad, -pad, pad, pad);
+
+  _pdev->addElement(el, r);
 }
 
 bool RecordPaintEngine::begin(QPaintDevice* pdev)
 {
   // old style C cast - probably should use dynamic_cast
   _pdev = (RecordPaintDevice*)(pdev);
+  _transform.reset();
+  _penwidth = 0;
+  _pencosmetic = true;
 
   // signal started ok
   return 1;
@@ -469,13 +523,13 @@ bool RecordPaintEngine::begin(QPaintDevice* pdev)
 
 void RecordPaintEngine::drawEllipse(const QRectF& rect)
 {
-  _pdev->addElement( new EllipseFElement(rect) );
+  addDrawElement( new EllipseFElement(rect), rect );
   _drawitemcount++;
 }
 
 void RecordPaintEngine::drawEllipse(const QRect& rect)
 {
-  _pdev->addElement( new EllipseElement(rect) );
+  addDrawElement( new EllipseElement(rect), QRectF(rect) );
   _drawitemcount++;
 }
 
@@ -484,77 +538,88 @@ void RecordPaintEngine::drawImage(const QRectF& rectangle,
 				  const QRectF& sr,
 				  Qt::ImageConversionFlags flags)
 {
-  _pdev->addElement( new ImageElement(rectangle, image, sr, flags) );
+  addDrawElement( new ImageElement(rectangle, image, sr, flags), rectangle );
   _drawitemcount++;
 }
 
 void RecordPaintEngine::drawLines(const QLineF* lines, int lineCount)
 {
-  _pdev->addElement( new LineFElement(lines, lineCount) );
+  addDrawElement( new LineFElement(lines, lineCount),
+		  linesBounds(lines, lineCount) );
   _drawitemcount += lineCount;
 }
 
 void RecordPaintEngine::drawLines(const QLine* lines, int lineCount)
 {
-  _pdev->addElement( new LineElement(lines, lineCount) );
+  addDrawElement( new LineElement(lines, lineCount),
+		  linesBounds(lines, lineCount) );
   _drawitemcount += lineCount;
 }
 
 void RecordPaintEngine::drawPath(const QPainterPath& path)
 {
-  _pdev->addElement( new PathElement(path) );
+  addDrawElement( new PathElement(path), path.controlPointRect() );
   _drawitemcount++;
 }
 
 void RecordPaintEngine::drawPixmap(const QRectF& r,
 				   const QPixmap& pm, const QRectF& sr)
 {
-  _pdev->addElement( new PixmapElement(r, pm, sr) );
+  addDrawElement( new PixmapElement(r, pm, sr), r );
   _drawitemcount++;
 }
 
 void RecordPaintEngine::drawPoints(const QPointF* points, int pointCount)
 {
-  _pdev->addElement( new PointFElement(points, pointCount) );
+  addDrawElement( new PointFElement(points, pointCount),
+		  pointsBounds(points, pointCount) );
   _drawitemcount += pointCount;
 }
 
 void RecordPaintEngine::drawPoints(const QPoint* points, int pointCount)
 {
-  _pdev->addElement( new PointElement(points, pointCount) );
+  addDrawElement( new PointElement(points, pointCount),
+		  pointsBounds(points, pointCount) );
   _drawitemcount += pointCount;
 }
 
 void RecordPaintEngine::drawPolygon(const QPointF* points, int pointCount,
 				    QPaintEngine::PolygonDrawMode mode)
 {
-  _pdev->addElement( new PolygonFElement(points, pointCount, mode) );
+  addDrawElement( new PolygonFElement(points, pointCount, mode),
+		  pointsBounds(points, pointCount) );
   _drawitemcount += pointCount;
 }
 
 void RecordPaintEngine::drawPolygon(const QPoint* points, int pointCount,
 				    QPaintEngine::PolygonDrawMode mode)
 {
-  _pdev->addElement( new PolygonElement(points, pointCount, mode) );
+  addDrawElement( new PolygonElement(points, pointCount, mode),
+		  pointsBounds(points, pointCount) );
   _drawitemcount += pointCount;
 }
 
 void RecordPaintEngine::drawRects(const QRectF* rects, int rectCount)
 {
-  _pdev->addElement( new RectFElement( rects, rectCount ) );
+  addDrawElement( new RectFElement( rects, rectCount ),
+		  rectsBounds(rects, rectCount) );
   _drawitemcount += rectCount;
 }
 
 void RecordPaintEngine::drawRects(const QRect* rects, int rectCount)
 {
-  _pdev->addElement( new RectElement( rects, rectCount ) );
+  addDrawElement( new RectElement( rects, rectCount ),
+		  rectsBounds(rects, rectCount) );
   _drawitemcount += rectCount;
 }
 
 void RecordPaintEngine::drawTextItem(const QPointF& p,
 				     const QTextItem& textItem)
 {
-  _pdev->addElement( new TextElement(p, textItem) );
+  // text extends from the baseline at p
+  const QRectF r(p.x(), p.y()-textItem.ascent(),
+		 textItem.width(), textItem.ascent()+textItem.descent());
+  addDrawElement( new TextElement(p, textItem), r );
   _drawitemcount += textItem.text().length();
 }
 
@@ -562,7 +627,7 @@ void RecordPaintEngine::drawTiledPixmap(const QRectF& rect,
 					      const QPixmap& pixmap,
 					      const QPointF& p)
 {
-  _pdev->addElement( new TiledPixmapElement(rect, pixmap, p) );
+  addDrawElement( new TiledPixmapElement(rect, pixmap, p), rect );
   _drawitemcount += 1;
 }
 
@@ -602,11 +667,18 @@ void RecordPaintEngine::updateState(const QPaintEngineState& state)
   if( flags & QPaintEngine::DirtyFont )
     _pdev->addElement( new FontElement( state.font(), _pdev->_dpiy ) );
   if( flags & QPaintEngine::DirtyTransform )
-    _pdev->addElement( new TransformElement( state.transform() ) );
+    {
+      _pdev->addElement( new TransformElement( state.transform() ) );
+      _transform = state.transform();
+    }
   if( flags & QPaintEngine::DirtyClipEnabled )
     _pdev->addElement( new ClipEnabledElement( state.isClipEnabled() ) );
   if( flags & QPaintEngine::DirtyPen )
-    _pdev->addElement( new PenElement( state.pen() ) );
+    {
+      _pdev->addElement( new PenElement( state.pen() ) );
+      _penwidth = state.pen().widthF();
+      _pencosmetic = state.pen().isCosmetic();
+    }
   if( flags & QPaintEngine::DirtyHints )
     _pdev->addElement( new HintsElement( state.renderHints() ) );
 }
@@ -29,6 +29,7 @@
 #include <QRectF>
 #include <QRect>
 #include <QPixmap>
+#include <QTransform>
 
 class RecordPaintDevice;
 
@@ -67,9 +68,18 @@ public:
   // return an estimate of number of items drawn
   int drawItemCount() const { return _drawitemcount; }
 
+private:
+  // add drawing element with bounds rect in painter coordinates
+  void addDrawElement(PaintElement* el, const QRectF& rect);
+
 private:
   int _drawitemcount;
   RecordPaintDevice* _pdev;
+
+  // current transform and pen width, for computing bounds
+  QTransform _transform;
+  qreal _penwidth;
+  bool _pencosmetic;
 };
 
 #endif
@@ -44,34 +44,47 @@ class DatasetPluginException(RuntimeError):
     """
     pass
 
-def numpyCopyOrNone(data):
+def numpyCopyOrNone(data, keepdtype=False):
     """If data is None return None
-    Otherwise return a numpy array corresponding to data."""
+    Otherwise return a numpy array corresponding to data.
+    If keepdtype is set, compact numpy types are not converted to double."""
     if data is None:
         return None
+    if isinstance(data, N.memmap):
+        # memory-mapped arrays are passed through without copying
+        return data
+    if keepdtype and isinstance(data, N.ndarray):
+        from .. import document
+        if data.dtype.newbyteorder('=') in document.compact_dtypes:
+            return N.array(data)
     return N.array(data, dtype=N.float64)
 
 # these classes are returned from dataset plugins
 class Dataset1D(object):
     """1D dataset for ImportPlugin or DatasetPlugin."""
-    def __init__(self, name, data=[], serr=None, perr=None, nerr=None):
+    def __init__(self, name, data=[], serr=None, perr=None, nerr=None,
+                 keepdtype=False):
         """1D dataset
         name: name of dataset
         data: data in dataset: list of floats or numpy 1D array
         serr: (optional) symmetric errors on data: list or numpy array
         perr: (optional) positive errors on data: list or numpy array
         nerr: (optional) negative errors on data: list or numpy array
+        keepdtype: (optional) keep data in float32 or smaller integer
+          types instead of converting to float64, to save memory
 
+        If data is a numpy.memmap, it is used without copying.
         If errors are returned for data give serr or nerr and perr.
         nerr should be negative values if used.
         perr should be positive values if used.
         """
         self.name = name
+        self.keepdtype = keepdtype
         self.update(data=data, serr=serr, perr=perr, nerr=nerr)
 
     def update(self, data=[], serr=None, perr=None, nerr=None):
         """Update values to those given."""
-        self.data = numpyCopyOrNone(data)
+        self.data = numpyCopyOrNone(data, keepdtype=self.keepdtype)
         self.serr = numpyCopyOrNone(serr)
         self.perr = numpyCopyOrNone(perr)
         self.nerr = numpyCopyOrNone(nerr)
@@ -89,18 +102,24 @@ class Dataset1D(object):
 
 class Dataset2D(object):
     """2D dataset for ImportPlugin or DatasetPlugin."""
-    def __init__(self, name, data=[[]], rangex=None, rangey=None):
+    def __init__(self, name, data=[[]], rangex=None, rangey=None,
+                 keepdtype=False):
         """2D dataset.
         name: name of dataset
         data: 2D numpy array of values or list of lists of floats
         rangex: optional tuple with X range of data (min, max)
         rangey: optional tuple with Y range of data (min, max)
+        keepdtype: (optional) keep data in float32 or smaller integer
+          types instead of converting to float64, to save memory
+
+        If data is a numpy.memmap, it is used without copying.
         """
         self.name = name
+        self.keepdtype = keepdtype
         self.update(data=data, rangex=rangex, rangey=rangey)
 
     def update(self, data=[[]], rangex=None, rangey=None):
-        self.data = N.array(data, dtype=N.float64)
+        self.data = numpyCopyOrNone(data, keepdtype=self.keepdtype)
         self.rangex = rangex
         self.rangey = rangey
 
@@ -20,6 +20,8 @@
 
 from __future__ import division
 import os.path
+import struct
+import zipfile
 import numpy as N
 
 from ..compat import crange, cstr, cstrerror
@@ -442,21 +444,31 @@ class ImportPluginQdp(ImportPlugin):
 
         return rqdp.retndata
 
-def cnvtImportNumpyArray(name, val, errorsin2d=True):
-    """Convert a numpy array to plugin returns."""
+def cnvtImportNumpyArray(name, val, errorsin2d=True, keepdtype=False):
+    """Convert a numpy array to plugin returns.
+
+    If keepdtype is set, compact numeric types are not converted to
+    double precision."""
 
     try:
         val.shape
     except AttributeError:
         raise ImportPluginException(_("Not the correct format file"))
-    try:
-        val + 0.
-        val = val.astype(N.float64)
-    except TypeError:
-        raise ImportPluginException(_("Unsupported array type"))
+
+    if isinstance(val, N.memmap):
+        # check type without reading the whole file
+        if val.dtype.kind not in 'biuf':
+            raise ImportPluginException(_("Unsupported array type"))
+    else:
+        try:
+            val + 0.
+            if not keepdtype:
+                val = val.astype(N.float64)
+        except TypeError:
+            raise ImportPluginException(_("Unsupported array type"))
 
     if val.ndim == 1:
-        return datasetplugin.Dataset1D(name, val)
+        return datasetplugin.Dataset1D(name, val, keepdtype=keepdtype)
     elif val.ndim == 2:
         if errorsin2d and val.shape[1] in (2, 3):
             # return 1d array
@@ -469,10 +481,55 @@ def cnvtImportNumpyArray(name, val, errorsin2d=True):
                 return datasetplugin.Dataset1D(name, val[:,0], perr=val[:,1],
                                                nerr=val[:,2])
         else:
-            return datasetplugin.Dataset2D(name, val)
+            return datasetplugin.Dataset2D(name, val, keepdtype=keepdtype)
     else:
         raise ImportPluginException(_("Unsupported dataset shape"))
 
+def loadNpzMemmap(filename):
+    """Return a dict of the arrays in a NPZ file, where arrays which
+    are stored uncompressed are memory mapped from the file.
+
+    Other arrays are read into memory.
+    """
+
+    npz = N.load(filename)
+    out = {}
+    zf = zipfile.ZipFile(filename)
+    f = open(filename, 'rb')
+    try:
+        for info in zf.infolist():
+            name = info.filename
+            key = name[:-4] if name.endswith('.npy') else name
+            if key not in npz.files:
+                continue
+
+            if info.compress_type == zipfile.ZIP_STORED:
+                # skip over local file header to get to npy data
+                f.seek(info.header_offset)
+                # (the last two values are the name and extra lengths)
+                header = struct.unpack('<4s5H3L2H', f.read(30))
+                f.seek(info.header_offset + 30 + header[9] + header[10])
+
+                version = N.lib.format.read_magic(f)
+                if version == (1, 0):
+                    hdr = N.lib.format.read_array_header_1_0(f)
+                else:
+                    hdr = N.lib.format.read_array_header_2_0(f)
+                shape, fortran, dtype = hdr
+
+                if not dtype.hasobject:
+                    out[key] = N.memmap(
+                        filename, dtype=dtype, mode='r', offset=f.tell(),
+                        shape=shape, order='F' if fortran else 'C')
+                    continue
+
+            out[key] = npz[key]
+    finally:
+        f.close()
+        zf.close()
+        npz.close()
+    return out
+
 class ImportPluginNpy(ImportPlugin):
     """For reading single datasets from NPY numpy saved files."""
 
@@ -489,6 +546,14 @@ class ImportPluginNpy(ImportPlugin):
                             descr=_("Treat 2 and 3 column 2D arrays as\n"
                                     "data with error bars"),
                             default=True),
+            field.FieldBool("keepdtype",
+                            descr=_("Keep data type of array\n"
+                                    "(saves memory)"),
+                            default=False),
+            field.FieldBool("mmap",
+                            descr=_("Memory map file instead of reading\n"
+                                    "(read only, keeps data type)"),
+                            default=False),
             ]
 
     def getPreview(self, params):
@@ -518,14 +583,16 @@ class ImportPluginNpy(ImportPlugin):
         if not name:
             raise ImportPluginException(_("Please provide a name for the dataset"))
 
+        mmap = params.field_results.get("mmap", False)
         try:
-            retn = N.load(params.filename)
+            retn = N.load(params.filename, mmap_mode='r' if mmap else None)
         except Exception as e:
             raise ImportPluginException(_("Error while reading file: %s") %
                                         cstr(e))
 
         return [ cnvtImportNumpyArray(
-                name, retn, errorsin2d=params.field_results["errorsin2d"]) ]
+                name, retn, errorsin2d=params.field_results["errorsin2d"],
+                keepdtype=params.field_results.get("keepdtype", False)) ]
 
 class ImportPluginNpz(ImportPlugin):
     """For reading single datasets from NPY numpy saved files."""
@@ -541,6 +608,14 @@ class ImportPluginNpz(ImportPlugin):
                             descr=_("Treat 2 and 3 column 2D arrays as\n"
                                     "data with error bars"),
                             default=True),
+            field.FieldBool("keepdtype",
+                            descr=_("Keep data type of array\n"
+                                    "(saves memory)"),
+                            default=False),
+            field.FieldBool("mmap",
+                            descr=_("Memory map file instead of reading\n"
+                                    "(read only, keeps data type)"),
+                            default=False),
             ]
 
     def getPreview(self, params):
@@ -560,12 +635,16 @@ class ImportPluginNpz(ImportPlugin):
             return _("Not an NPZ file"), False
 
         text = []
-        for f in sorted(retn.files):
-            a = retn[f]
-            text.append(_('Name: %s') % f)
-            text.append(_(' Shape: %s') % str(a.shape))
-            text.append(_(' Datatype: %s (%s)') % (a.dtype.str, str(a.dtype)))
-            text.append('')
+        try:
+            for f in sorted(retn.files):
+                a = retn[f]
+                text.append(_('Name: %s') % f)
+                text.append(_(' Shape: %s') % str(a.shape))
+                text.append(_(' Datatype: %s (%s)') % (a.dtype.str,
+                                                       str(a.dtype)))
+                text.append('')
+        finally:
+            retn.close()
         return '\n'.join(text), True
 
     def doImport(self, params):
@@ -579,15 +658,31 @@ class ImportPluginNpz(ImportPlugin):
                                         cstr(e))
 
         try:
-            retn.files
-        except AttributeError:
-            raise ImportPluginException(_("File is not in NPZ format"))
+            try:
+                retn.files
+            except AttributeError:
+                raise ImportPluginException(_("File is not in NPZ format"))
 
-        # convert each of the imported arrays
-        out = []
-        for f in sorted(retn.files):
-            out.append( cnvtImportNumpyArray(
-                    f, retn[f], errorsin2d=params.field_results["errorsin2d"]) )
+            if params.field_results.get("mmap", False):
+                try:
+                    arrays = loadNpzMemmap(params.filename)
+                except Exception as e:
+                    raise ImportPluginException(
+                        _("Error while mapping file: %s") % cstr(e))
+            else:
+                arrays = retn
+
+            # convert each of the imported arrays
+            out = []
+            for f in sorted(arrays.keys()):
+                out.append( cnvtImportNumpyArray(
+                        f, arrays[f],
+                        errorsin2d=params.field_results["errorsin2d"],
+                        keepdtype=params.field_results.get("keepdtype", False)) )
+        finally:
+            # the arrays have been read, so the file can be closed
+            if hasattr(retn, 'close'):
+                retn.close()
 
         return out
 
@@ -610,7 +705,14 @@ class ImportPluginBinary(ImportPlugin):
             field.FieldCombo("endian", descr=_("Endian (byte order)"),
                              items = ("little", "big"), editable=False),
             field.FieldInt("offset", descr=_("Offset (bytes)"), default=0, minval=0),
-            field.FieldInt("length", descr=_("Length (values)"), default=-1)
+            field.FieldInt("length", descr=_("Length (values)"), default=-1),
+            field.FieldBool("keepdtype",
+                            descr=_("Keep data type (saves memory)"),
+                            default=False),
+            field.FieldBool("mmap",
+                            descr=_("Memory map file instead of reading\n"
+                                    "(read only, keeps data type)"),
+                            default=False),
             ]
 
     def getNumpyDataType(self, params):
@@ -655,6 +757,9 @@ class ImportPluginBinary(ImportPlugin):
         if not name:
             raise ImportPluginException(_("Please provide a name for the dataset"))
 
+        if params.field_results.get("mmap", False):
+            return self.doImportMemmap(params, name)
+
         try:
             f = open(params.filename, "rb")
             f.seek( params.field_results["offset"] )
@@ -671,7 +776,29 @@ class ImportPluginBinary(ImportPlugin):
             raise ImportPluginException(_("Error converting data for file '%s'\n\n%s") %
                                         (params.filename, cstr(e)))
 
-        data = data.astype(N.float64)
+        keepdtype = params.field_results.get("keepdtype", False)
+        if not keepdtype:
+            data = data.astype(N.float64)
+        return [ datasetplugin.Dataset1D(name, data, keepdtype=keepdtype) ]
+
+    def doImportMemmap(self, params, name):
+        """Import the data by memory mapping the file."""
+
+        dtype = self.getNumpyDataType(params)
+        offset = params.field_results["offset"]
+        length = params.field_results["length"]
+        try:
+            if length < 0:
+                # use rest of file
+                size = os.path.getsize(params.filename) - offset
+                length = size // dtype.itemsize
+            data = N.memmap(params.filename, dtype=dtype, mode='r',
+                            offset=offset, shape=(length,))
+        except (EnvironmentError, ValueError) as e:
+            raise ImportPluginException(
+                _("Error mapping file '%s'\n\n%s") %
+                (params.filename, cstr(e)))
+
         return [ datasetplugin.Dataset1D(name, data) ]
 
 importpluginregistry += [
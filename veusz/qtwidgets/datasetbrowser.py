@@ -127,6 +127,9 @@ class DatasetNode(TMNode):
             if text is None:
                 text = ''
 
+            if ds.datatype == 'numeric':
+                text += '\n\n' + ds.userMemory()
+
             if ds.tags:
                 text += '\n\n' + _('Tags: %s') % (' '.join(sorted(ds.tags)))
 
@@ -95,6 +95,12 @@ class XYPlotLine(Line):
         self.add( setting.Bool('bezierJoin', False,
                                descr=_('Connect points with a cubic Bezier curve'),
                                usertext=_('Bezier join')), 1 )
+        self.add( setting.Bool('decimate', True,
+                               descr=_('Only plot the first, last, minimum and '
+                                       'maximum points of the line in each '
+                                       'pixel column (thin solid lines in '
+                                       'bitmap output)'),
+                               usertext=_('Decimate')), 2 )
 
 class MarkerLine(Line):
     '''A line for marker border.'''
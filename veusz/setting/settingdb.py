@@ -43,6 +43,17 @@ defaultValues = {
     'plot_updatepolicy': -1, # update on document changed
     'plot_antialias': True,
     'plot_numthreads': 2,
+    # pages larger than this (MB) are rendered in tiles
+    'plot_tiled_MB': 32,
+    # delay (ms) after the zoom last changed before rendering
+    'plot_zoomdelay': 250,
+
+    # memory for caching evaluated dataset expressions (MB)
+    'cache_expr_MB': 256,
+    # memory for recorded widget layers kept for redrawing plots (MB)
+    'cache_layers_MB': 64,
+    # memory for keeping rendered pages (MB)
+    'cache_pages_MB': 128,
 
     # recent files list
     'main_recentfiles': [],
@@ -31,6 +31,7 @@ from .dates import *
 from .formatting import *
 from .colormap import *
 from .extbrushfilling import *
+from .decimate import *
 
 try:
     from ..helpers.qtloops import addNumpyToPolygonF, plotPathsToPainter, \
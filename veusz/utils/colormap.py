@@ -19,13 +19,16 @@
 from __future__ import division
 import numpy as N
 
+from .utilfuncs import LRUCache
+
 # use fast or slow helpers
 slowfuncs = False
 try:
-    from ..helpers.qtloops import numpyToQImage, applyImageTransparancy
+    from ..helpers.qtloops import numpyToQImage, numpyLUTToQImage, \
+        applyImageTransparancy
 except ImportError:
     slowfuncs = True
-    from .slowfuncs import slowNumpyToQImage
+    from .slowfuncs import slowNumpyToQImage, slowNumpyLUTToQImage
 
 # Default colormaps used by widgets.
 # Each item in this dict is a colormap entry, with the key the name.
@@ -190,6 +193,9 @@ def applyScaling(data, mode, minval, maxval):
     returns transformed data, valid between 0 and 1
     """
 
+    # compact integer or single precision data are converted here
+    data = N.asarray(data, dtype=N.float64)
+
     # catch naughty people by hardcoding a range
     if minval == maxval:
         minval, maxval = 0., 1.
@@ -227,6 +233,52 @@ def applyScaling(data, mode, minval, maxval):
 
     return data
 
+def _colorsForFracs(fracs, cmap):
+    """Return the BGRA colours (as rows) for the values between 0 and
+    1 in fracs, interpolating in cmap in the same way as
+    numpyToQImage."""
+
+    fracs = N.asarray(fracs, dtype=N.float64)
+    out = N.zeros((len(fracs), 4), dtype=N.intc)
+    finite = N.isfinite(fracs)
+    vals = N.clip(fracs[finite], 0., 1.)
+    numcolors = cmap.shape[0]
+
+    if cmap[0,0] == -1:
+        # jumps between colours in discrete mode
+        # (ignores 1st color, which signals this mode)
+        band = N.clip( (vals*(numcolors-1)).astype(N.intc)+1,
+                       1, numcolors-1 )
+        out[finite] = cmap[band]
+    else:
+        # linear interpolation between bands
+        numbands = numcolors-1
+        band = N.clip( (vals*numbands).astype(N.intc), 0, numbands-1 )
+        delta = (vals*numbands - band).reshape(-1, 1)
+        band2 = N.minimum(band+1, numbands)
+        out[finite] = ( (1.-delta)*cmap[band] +
+                        delta*cmap[band2] ).astype(N.intc)
+    return out
+
+# integer types which are colour mapped using a lookup table
+_lutdtypes = (N.dtype(N.uint8), N.dtype(N.uint16))
+
+# lookup tables for integer types, keyed by colour map and scaling
+_lutcache = LRUCache(16*1024*1024)
+
+def _integerColorLUT(cmap, scaling, dtype, minval, maxval):
+    """Return table of colours (BGRA rows) for each value of the
+    unsigned integer dtype. Tables are cached."""
+
+    key = (tuple(cmap.ravel()), scaling, dtype.str, minval, maxval)
+    lut = _lutcache.get(key)
+    if lut is None:
+        vals = N.arange(N.iinfo(dtype).max+1)
+        lut = _colorsForFracs(
+            applyScaling(vals, scaling, minval, maxval), cmap)
+        _lutcache.set(key, lut, lut.nbytes)
+    return lut
+
 def applyColorMap(cmap, scaling, datain, minval, maxval,
                   trans, transimg=None):
     """Apply a colour map to the 2d data given.
@@ -259,6 +311,18 @@ def applyColorMap(cmap, scaling, datain, minval, maxval,
         cmap[:,3] = (cmap[:,3].astype(N.float32) * (100-trans) /
                      100.).astype(N.intc)
 
+    # integer images can look up the colour for each value
+    datain = N.asarray(datain)
+    if datain.dtype in _lutdtypes:
+        lut = _integerColorLUT(cmap, scaling, datain.dtype, minval, maxval)
+        if not slowfuncs:
+            img = numpyLUTToQImage(datain, lut, transimg is not None)
+            if transimg is not None:
+                applyImageTransparancy(img, transimg)
+        else:
+            img = slowNumpyLUTToQImage(datain, lut, transimg)
+        return img
+
     # apply scaling of data
     fracs = applyScaling(datain, scaling, minval, maxval)
 
@@ -0,0 +1,423 @@
+#    Copyright (C) 2014 Jeremy S. Sanders
+#    Email: Jeremy Sanders <jeremy@jeremysanders.net>
+#
+#    This program is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 2 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with this program; if not, write to the Free Software Foundation, Inc.,
+#    51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+###############################################################################
+
+"""Reduce the number of points in lines and images before plotting."""
+
+from __future__ import division
+import itertools
+import threading
+import numpy as N
+
+from ..compat import crange
+from .utilfuncs import LRUCache
+
+def decimateLineIndices(xvals, yvals, pixsize=1.):
+    """Return indices of points to keep when drawing a line through
+    the points at xvals, yvals (in plotter coordinates).
+
+    Consecutive points falling into the same pixel column are reduced
+    to the first, last, minimum and maximum points (M4 decimation).
+    For thin solid lines with monotonic x, rasterized at pixsize, this
+    covers the same range of pixels in each column as plotting all
+    the points, to within the rounding of the rasterizer.
+
+    Returns None if decimation would not reduce the number of points.
+    """
+
+    npts = min(len(xvals), len(yvals))
+    if npts < 8:
+        return None
+    xvals = N.asarray(xvals[:npts])
+    yvals = N.asarray(yvals[:npts])
+
+    # find runs of points in the same column
+    cols = N.floor(xvals * (1./pixsize))
+    breaks = N.nonzero(cols[1:] != cols[:-1])[0] + 1
+    if len(breaks)*4 + 4 >= npts:
+        return None
+    starts = N.concatenate(( [0], breaks ))
+    ends = N.concatenate(( breaks, [npts] )) - 1
+    runid = N.repeat(N.arange(len(starts)), ends-starts+1)
+
+    keep = N.zeros(npts, dtype=N.bool_)
+    keep[starts] = True
+    keep[ends] = True
+
+    # first point with minimum and maximum y in each run
+    for func in (N.fmin, N.fmax):
+        extreme = func.reduceat(yvals, starts)
+        idx = N.nonzero(yvals == extreme[runid])[0]
+        if len(idx) > 0:
+            ids = runid[idx]
+            first = N.concatenate(( [True], ids[1:] != ids[:-1] ))
+            keep[idx[first]] = True
+
+    return N.nonzero(keep)[0]
+
+def decimateLine(xvals, yvals, pixsize=1.):
+    """Decimate line given by xvals, yvals (in plotter coordinates)
+    so there are at most four points per pixel column.
+
+    Returns new (xvals, yvals).
+    """
+
+    idx = decimateLineIndices(xvals, yvals, pixsize=pixsize)
+    if idx is None:
+        return xvals, yvals
+    return xvals[idx], yvals[idx]
+
+def _blockExtremes(vals, blocksize, chunk=1048576):
+    """Return the indices of the minimum and maximum values in blocks
+    of blocksize values of vals. Non-finite values are ignored.
+    """
+
+    nblocks = (len(vals) + blocksize - 1) // blocksize
+    idxtype = N.int32 if len(vals) < 2**31 else N.int64
+    minidx = N.zeros(nblocks, dtype=idxtype)
+    maxidx = N.zeros(nblocks, dtype=idxtype)
+
+    # process in chunks to avoid copying all the data at once
+    step = max(chunk // blocksize, 1) * blocksize
+    for start in range(0, len(vals), step):
+        v = N.array(vals[start:start+step], dtype=N.float64)
+        nb = (len(v) + blocksize - 1) // blocksize
+        pad = nb*blocksize - len(v)
+        bad = N.logical_not(N.isfinite(v))
+        offsets = N.arange(nb) * blocksize + start
+        b0 = start // blocksize
+
+        for out, fill, argfn in ((minidx, N.inf, N.argmin),
+                                 (maxidx, -N.inf, N.argmax)):
+            c = N.where(bad, fill, v)
+            if pad:
+                c = N.concatenate(( c, N.repeat(fill, pad) ))
+            out[b0:b0+nb] = argfn(c.reshape(nb, blocksize), axis=1) + offsets
+
+    # indices from padding must not go beyond the end
+    N.clip(minidx, 0, len(vals)-1, out=minidx)
+    N.clip(maxidx, 0, len(vals)-1, out=maxidx)
+    return minidx, maxidx
+
+class LODPyramid(object):
+    """Multi-resolution summary of the minimum and maximum values of a
+    1D array, used to quickly select the points needed to plot a
+    line through a large number of values.
+
+    Each level stores the indices of the minimum and maximum values
+    in blocks of values. Block sizes increase by factor between
+    levels. The pyramid can be updated cheaply when values are
+    appended to the array or dropped from its start (see update).
+    """
+
+    def __init__(self, vals, blocksize=64, factor=8, minblocks=256):
+        self.blocksize = blocksize
+        self.factor = factor
+        self.minblocks = minblocks
+        self.length = 0
+        # index of the first value counting dropped values (blocks
+        # are aligned to these absolute indices)
+        self.offset = 0
+        # list of (blocksize, firstblock, minidx, maxidx), where the
+        # absolute indices are of blocks firstblock onwards
+        self.levels = []
+        self.update(vals)
+
+    def update(self, vals, dropped=0):
+        """Update the pyramid for the new values vals, which are the
+        old values with dropped values removed from the start and
+        any new values added to the end.
+
+        Only the blocks containing new values are recalculated.
+        """
+
+        oldend = self.offset + self.length
+        self.offset += dropped
+        self.length = len(vals)
+        end = self.offset + self.length
+        if self.length < self.blocksize*self.minblocks:
+            self.levels = []
+            return
+        if end < oldend:
+            # values were removed from the end, so the old blocks
+            # cannot be reused
+            self.levels = []
+
+        levels = []
+        blocksize = self.blocksize
+        # first block of level which needs recalculating
+        recalc = oldend // blocksize
+        while True:
+            # blocks which contain dropped values are removed
+            first = -(-self.offset // blocksize)
+            nblocks = -(-end // blocksize) - first
+            if len(levels) < len(self.levels):
+                oldlevel = self.levels[len(levels)]
+                recalc = max(recalc, first)
+            else:
+                # new level, so everything needs calculating
+                oldlevel = None
+                recalc = first
+
+            minidx, maxidx = self._calcLevel(
+                vals, levels, blocksize, first, recalc, oldlevel)
+            if len(minidx) != nblocks:
+                # old level did not cover the blocks expected, so
+                # calculate all of it again
+                recalc = first
+                minidx, maxidx = self._calcLevel(
+                    vals, levels, blocksize, first, recalc, None)
+            levels.append( (blocksize, first, minidx, maxidx) )
+
+            if nblocks <= self.minblocks:
+                break
+            blocksize *= self.factor
+            recalc //= self.factor
+
+        self.levels = levels
+
+    def _calcLevel(self, vals, levels, blocksize, first, recalc, oldlevel):
+        """Return (minidx, maxidx) for the level with blocksize and
+        first block given, where blocks before recalc are taken from
+        oldlevel and levels are the finer levels already calculated.
+        """
+
+        if not levels:
+            newmin, newmax = _blockExtremes(
+                vals[recalc*blocksize-self.offset:], blocksize)
+            base = recalc*blocksize
+            newmin = newmin + base
+            newmax = newmax + base
+        else:
+            # combine blocks of the finer level
+            ffirst, fmin, fmax = levels[-1][1:]
+            fmin = fmin[recalc*self.factor-ffirst:]
+            fmax = fmax[recalc*self.factor-ffirst:]
+            newmin = fmin[ _blockExtremes(
+                vals[fmin-self.offset], self.factor)[0] ]
+            newmax = fmax[ _blockExtremes(
+                vals[fmax-self.offset], self.factor)[1] ]
+
+        if oldlevel is None or recalc <= first:
+            return newmin.astype(N.int64), newmax.astype(N.int64)
+
+        oldfirst, oldmin, oldmax = oldlevel[1:]
+        minidx = N.concatenate((
+            oldmin[first-oldfirst:recalc-oldfirst], newmin)).astype(N.int64)
+        maxidx = N.concatenate((
+            oldmax[first-oldfirst:recalc-oldfirst], newmax)).astype(N.int64)
+        return minidx, maxidx
+
+    def nbytes(self):
+        """Return memory used by pyramid."""
+        return sum([l[2].nbytes + l[3].nbytes for l in self.levels])
+
+    def getIndices(self, start, end, maxblocks):
+        """Return sorted indices of values to plot for the range of
+        indices start to end (exclusive).
+
+        The finest level with at most maxblocks blocks in the range is
+        used. Ranges with few values return all the indices.
+        """
+
+        start = max(start, 0)
+        end = min(end, self.length)
+        if end <= start:
+            return N.array([], dtype=N.intp)
+
+        parts = self._rangeIndices(
+            start+self.offset, end+self.offset, maxblocks, self.levels)
+        parts.append( N.array([start+self.offset, end-1+self.offset],
+                              dtype=N.int64) )
+        return (N.unique(N.concatenate(parts)) - self.offset).astype(N.intp)
+
+    def getColumnIndices(self, bounds, maxblocks=4):
+        """Return sorted indices of values to plot a line through the
+        columns of values between the sorted index boundaries given.
+
+        The indices include the first, last, minimum and maximum
+        values of each column, and the values either side of each
+        boundary. Each column uses the coarsest blocks which fit
+        within it.
+        """
+
+        bounds = N.clip(N.asarray(bounds, dtype=N.int64), 0, self.length)
+        if len(bounds) < 2 or bounds[-1] <= bounds[0]:
+            return N.array([], dtype=N.intp)
+
+        off = self.offset
+        # absolute indices, including the values either side of bounds
+        parts = [N.clip(N.concatenate((bounds-1, bounds)),
+                        bounds[0], bounds[-1]-1) + off]
+        for start, end in zip(bounds[:-1]+off, bounds[1:]+off):
+            if end > start:
+                parts += self._rangeIndices(
+                    start, end, maxblocks, self.levels)
+                parts.append( N.array([start, end-1], dtype=N.int64) )
+        return (N.unique(N.concatenate(parts)) - off).astype(N.intp)
+
+    def _rangeIndices(self, start, end, maxblocks, levels):
+        """Return list of index arrays for absolute range start to
+        end, using the levels given."""
+
+        num = end - start
+        if num <= 0:
+            return []
+        if num <= maxblocks*4 or not levels:
+            return [N.arange(start, end, dtype=N.int64)]
+
+        # pick the finest level with at most maxblocks in the range
+        for level, (blocksize, first, minidx, maxidx) in enumerate(levels):
+            if num <= blocksize*maxblocks:
+                break
+
+        # complete blocks within the range
+        b0 = (start + blocksize - 1) // blocksize
+        b1 = end // blocksize
+        if b1 <= b0:
+            # no complete blocks, so must go finer
+            return self._rangeIndices(start, end, maxblocks, levels[:level])
+
+        out = [minidx[b0-first:b1-first], maxidx[b0-first:b1-first]]
+        # partial blocks at each end of the range
+        finer = levels[:level]
+        out += self._rangeIndices(start, b0*blocksize, maxblocks, finer)
+        out += self._rangeIndices(b1*blocksize, end, maxblocks, finer)
+        return out
+
+def _reduceImage(data, method, factor=2, chunk=512):
+    """Reduce the resolution of 2D data by factor, combining blocks
+    of factor x factor values by method ('mean' or 'max'). Non-finite
+    values are ignored. Partial blocks at the end of the rows or
+    columns are combined from the values they have.
+
+    Taking the maximum keeps the dtype of the data. The mean is
+    returned as float64.
+    """
+
+    ny, nx = data.shape
+    nyout, nxout = -(-ny // factor), -(-nx // factor)
+
+    if method == 'max':
+        dtype = data.dtype
+        if dtype.kind == 'b':
+            pad = False
+        elif dtype.kind in 'iu':
+            pad = N.iinfo(dtype).min
+        else:
+            dtype = N.result_type(dtype, N.float32)
+            pad = N.nan
+    else:
+        dtype = N.float64
+        pad = N.nan
+    out = N.empty((nyout, nxout), dtype=dtype)
+
+    # process in chunks of rows to avoid copying all the data at once
+    rowsout = max(chunk // factor, 1)
+    for y0 in range(0, nyout, rowsout):
+        y1 = min(y0+rowsout, nyout)
+        block = N.empty(((y1-y0)*factor, nxout*factor), dtype=dtype)
+        block.fill(pad)
+        rows = data[y0*factor:y1*factor]
+        block[:len(rows), :nx] = rows
+        block = block.reshape(y1-y0, factor, nxout, factor)
+
+        if method == 'max':
+            if dtype.kind == 'f':
+                # fmax ignores nans unless all values are nan
+                out[y0:y1] = N.fmax.reduce(
+                    N.fmax.reduce(block, axis=3), axis=1)
+            else:
+                out[y0:y1] = block.max(axis=3).max(axis=1)
+        else:
+            finite = N.isfinite(block)
+            total = N.where(finite, block, 0.).sum(axis=3).sum(axis=1)
+            count = finite.sum(axis=3).sum(axis=1)
+            with N.errstate(invalid='ignore', divide='ignore'):
+                out[y0:y1] = total / count
+
+    return out
+
+# reduced image levels, keyed by pyramid and level
+_levelcache = LRUCache(64*1024*1024)
+
+class ImagePyramid(object):
+    """Reduced resolution versions of 2D data, used to plot large
+    images at the resolution they are shown.
+
+    Level n has the resolution reduced by a factor of 2**n, combining
+    blocks of values by method ('mean' or 'max'). Level 0 is the
+    original data. Each level is calculated directly from the data
+    when requested and is kept in a cache of limited size shared by
+    all pyramids.
+    """
+
+    _counter = itertools.count()
+
+    def __init__(self, data, method='mean'):
+        self.data = data
+        self.method = method
+        self.lock = threading.Lock()
+        # unique key for the levels of this pyramid in the cache
+        self.key = next(ImagePyramid._counter)
+
+        # stop when the image would be a single pixel
+        self.maxlevel = 0
+        size = max(data.shape)
+        while size > 1:
+            size = (size+1) // 2
+            self.maxlevel += 1
+
+    def __del__(self):
+        for level in crange(1, self.maxlevel+1):
+            _levelcache.pop((self.key, level))
+
+    def nbytes(self):
+        """Return memory used by the reduced levels in the cache."""
+        total = 0
+        for level in crange(1, self.maxlevel+1):
+            vals = _levelcache.get((self.key, level))
+            if vals is not None:
+                total += vals.nbytes
+        return total
+
+    def levelForScale(self, scale):
+        """Return the coarsest level with at least one value per
+        output pixel, for scale values per output pixel."""
+        level = 0
+        while level < self.maxlevel and scale >= 2:
+            scale /= 2
+            level += 1
+        return level
+
+    def levelShape(self, level):
+        """Return the shape of the level given, without making it."""
+        level = max(min(level, self.maxlevel), 0)
+        factor = 2**level
+        return tuple( -(-n // factor) for n in self.data.shape )
+
+    def getLevel(self, level):
+        """Get the data for the level given."""
+        level = max(min(level, self.maxlevel), 0)
+        if level == 0:
+            return self.data
+        with self.lock:
+            vals = _levelcache.get((self.key, level))
+            if vals is None:
+                vals = _reduceImage(self.data, self.method, factor=2**level)
+                _levelcache.set((self.key, level), vals, vals.nbytes)
+            return vals
@@ -23,11 +23,14 @@ from .. import qtall as qt4
 import numpy as N
 
 try:
-    from ..helpers.qtloops import plotPathsToPainter
+    from ..helpers.qtloops import plotPathsToPainter, plotImagesToPainter, \
+        plotLinesToPainter, addTransformedPathsToPath
 except ImportError:
-    from .slowfuncs import plotPathsToPainter
+    from .slowfuncs import plotPathsToPainter, plotImagesToPainter, \
+        plotLinesToPainter, addTransformedPathsToPath
 
 from . import colormap
+from .utilfuncs import LRUCache
 
 """This is the symbol plotting part of Veusz
 
@@ -400,8 +403,211 @@ MarkerCodes = (
     'arrowlowerrightaway', 'arrowlowerleftaway',
     )
 
+def cullMarkerIndices(xpos, ypos, resolution=1.):
+    """Return indices of markers to plot, removing markers which are
+    drawn over by a later marker in the same cell of size resolution.
+    If resolution is None, only markers at exactly the same position
+    are removed.
+
+    The indices are returned in increasing order, or None if no
+    markers are removed.
+    """
+
+    xpos = N.asarray(xpos)
+    ypos = N.asarray(ypos)
+    if len(xpos) < 2:
+        return None
+
+    if resolution is None:
+        good = N.isfinite(xpos) & N.isfinite(ypos)
+        if not N.any(good):
+            return None
+        # complex numbers give a single key for each position
+        keys = N.where(good, xpos + 1j*ypos, N.nan)
+    else:
+        xi = N.floor(xpos * (1./resolution))
+        yi = N.floor(ypos * (1./resolution))
+        good = N.isfinite(xi) & N.isfinite(yi)
+        if not N.any(good):
+            return None
+        xi -= xi[good].min()
+        yi -= yi[good].min()
+        ny = yi[good].max() + 1
+        if xi[good].max()*ny > 2.**53:
+            # too large a range for integer keys
+            return None
+        keys = N.where(good, xi*ny + yi, -1).astype(N.int64)
+
+    # last marker in each cell is drawn on top, so keep that
+    first = N.unique(keys[::-1], return_index=True)[1]
+    idx = N.sort(len(keys) - 1 - first)
+    idx = idx[good[idx]]
+    if len(idx) == len(keys):
+        return None
+    return idx
+
+def _cullResolution(painter):
+    """Return the cell size in painter coordinates within which
+    markers count as coincident, or None if only markers at exactly
+    the same position should be culled.
+
+    Nearby markers are only culled for bitmap output (painter.raster
+    set by PaintHelper), if they are at the same subpixel position as
+    used for sprites, so the output is not changed."""
+
+    if not getattr(painter, 'raster', False):
+        return None
+    transform = painter.worldTransform()
+    if transform.type() > qt4.QTransform.TxScale:
+        return None
+    scale = abs(transform.m11())
+    if scale == 0 or scale != abs(transform.m22()):
+        return None
+    return 1. / (scale*_spritesubpix)
+
+def _isOpaque(painter):
+    """Are the pen and brush of the painter opaque?"""
+    pen = painter.pen()
+    brush = painter.brush()
+    return ( ( pen.style() == qt4.Qt.NoPen or
+               (pen.brush().isOpaque() and pen.color().alpha() == 255) ) and
+             ( brush.style() == qt4.Qt.NoBrush or brush.isOpaque() ) )
+
+# rasterized markers, keyed by marker, pen, brush, antialias and offset
+# (limited to this many bytes)
+_spritecache = LRUCache(32*1024*1024)
+# subpixel offsets of sprites in each direction
+_spritesubpix = 4
+# maximum number of colors to make sprites for
+_spritemaxcolors = 256
+# minimum number of markers to use sprites for
+_spriteminpoints = 32
+# maximum size in bytes and width of the image of the sprites used
+_spritemaxatlas = 16*1024*1024
+_spritemaxwidth = 32767
+
+def _canUseSprites(painter, npts):
+    """Can markers be drawn as sprites on this painter?
+
+    Sprites are only used for bitmap output (painter.raster set by
+    PaintHelper), if the painter is not rotated or scaled and the
+    pen and brush are simple."""
+
+    if npts < _spriteminpoints or not getattr(painter, 'raster', False):
+        return False
+    if painter.worldTransform().type() > qt4.QTransform.TxTranslate:
+        return False
+    pen, brush = painter.pen(), painter.brush()
+    return ( brush.style() in (qt4.Qt.NoBrush, qt4.Qt.SolidPattern) and
+             pen.brush().style() in (qt4.Qt.NoBrush, qt4.Qt.SolidPattern) )
+
+def _markerSprite(painter, path, pathkey, color, subx, suby, geom):
+    """Return image of marker path drawn with the painter's pen and
+    brush, with the brush color changed to color if not None, at the
+    subpixel offset given."""
+
+    pen, brush = painter.pen(), painter.brush()
+    if color is not None:
+        brush = qt4.QBrush(qt4.QColor.fromRgba(color))
+    antialias = bool(painter.renderHints() & qt4.QPainter.Antialiasing)
+    key = ( pathkey, pen.color().rgba(), pen.widthF(), pen.style(),
+            pen.capStyle(), pen.joinStyle(), pen.miterLimit(),
+            pen.isCosmetic(), brush.style(), brush.color().rgba(),
+            antialias, subx, suby )
+
+    img = _spritecache.get(key)
+    if img is None:
+        ox, oy, w, h = geom
+        img = qt4.QImage(w, h, qt4.QImage.Format_ARGB32_Premultiplied)
+        img.fill(0)
+        p = qt4.QPainter(img)
+        p.setRenderHint(qt4.QPainter.Antialiasing, antialias)
+        p.setPen(pen)
+        p.setBrush(brush)
+        p.translate(subx/_spritesubpix - ox, suby/_spritesubpix - oy)
+        p.drawPath(path)
+        p.end()
+        _spritecache.set(key, img, size=img.byteCount())
+    return img
+
+def _plotMarkerSprites(painter, path, pathkey, xpos, ypos, clip, colorimg):
+    """Plot markers by drawing images of the marker rasterized once
+    for each color and subpixel offset.
+
+    Returns False if there are too many colors or the sprites would
+    be too large to use."""
+
+    npts = min(len(xpos), len(ypos))
+    x = N.asarray(xpos[:npts], dtype=N.float64)
+    y = N.asarray(ypos[:npts], dtype=N.float64)
+
+    # colors of points, as indices into list of colors
+    colors = [None]
+    colidx = N.zeros(npts, dtype=N.intp)
+    if colorimg is not None:
+        npts = min(npts, colorimg.width())
+        x, y = x[:npts], y[:npts]
+        img = colorimg.convertToFormat(qt4.QImage.Format_ARGB32)
+        rgba = N.frombuffer(
+            img.constBits().asstring(img.byteCount()),
+            dtype=N.uint32)[:npts]
+        colors, colidx = N.unique(rgba, return_inverse=True)
+        if len(colors) > _spritemaxcolors:
+            return False
+        colors = [int(c) for c in colors]
+
+    # size of sprite, allowing for the line width and antialiasing
+    pen = painter.pen()
+    pad = 2.
+    if pen.style() != qt4.Qt.NoPen:
+        pad += max(pen.widthF(), 1.) * max(pen.miterLimit(), 1.)
+    box = path.controlPointRect()
+    ox, oy = int(N.floor(box.left()-pad)), int(N.floor(box.top()-pad))
+    w = int(N.ceil(box.right()+pad)) - ox + 1
+    h = int(N.ceil(box.bottom()+pad)) - oy + 1
+
+    ix, iy = N.floor(x), N.floor(y)
+    sub = _spritesubpix
+    subx = N.clip( ((x-ix)*sub).astype(N.intp), 0, sub-1 )
+    suby = N.clip( ((y-iy)*sub).astype(N.intp), 0, sub-1 )
+    px, py = ix+ox, iy+oy
+
+    # remove invalid points and those outside the clip region
+    good = N.isfinite(px) & N.isfinite(py)
+    if clip is not None:
+        good &= ( (px+w >= clip.left()) & (px <= clip.right()) &
+                  (py+h >= clip.top()) & (py <= clip.bottom()) )
+    if not N.all(good):
+        px, py = px[good], py[good]
+        subx, suby, colidx = subx[good], suby[good], colidx[good]
+    if len(px) == 0:
+        return True
+
+    # put the sprites needed side by side in one image
+    spriteid = (colidx*sub + suby)*sub + subx
+    used, slot = N.unique(spriteid, return_inverse=True)
+    if ( w*len(used) > _spritemaxwidth or
+         w*len(used)*h*4 > _spritemaxatlas ):
+        return False
+    atlas = qt4.QImage(w*len(used), h, qt4.QImage.Format_ARGB32_Premultiplied)
+    atlas.fill(0)
+    p = qt4.QPainter(atlas)
+    p.setCompositionMode(qt4.QPainter.CompositionMode_Source)
+    for i, sid in enumerate(used):
+        sid = int(sid)
+        sprite = _markerSprite(
+            painter, path, pathkey, colors[sid // (sub*sub)],
+            sid % sub, (sid // sub) % sub, (ox, oy, w, h))
+        p.drawImage(i*w, 0, sprite)
+    p.end()
+
+    plotImagesToPainter(painter, px, py, (slot*w).astype(N.float64),
+                        atlas, w, h)
+    return True
+
 def plotMarkers(painter, xpos, ypos, markername, markersize, scaling=None,
-                clip=None, cmap=None, colorvals=None, scaleline=False):
+                clip=None, cmap=None, colorvals=None, scaleline=False,
+                cull=False):
     """Funtion to plot an array of markers on a painter.
 
     painter: QPainter
@@ -413,6 +619,9 @@ def plotMarkers(painter, xpos, ypos, markername, markersize, scaling=None,
     cmap: colormap to use if colorvals is set
     colorvals: color values 0-1 of each point if used
     scaleline: if scaling, scale border line width with scaling
+    cull: do not draw markers covered by later ones at the same position
+          (or subpixel in bitmap output), if markers are opaque and not
+          scaled or colored
     """
 
     # minor optimization
@@ -441,9 +650,26 @@ def plotMarkers(painter, xpos, ypos, markername, markersize, scaling=None,
         colorimg = colormap.applyColorMap(
             cmap, 'linear', color2d, 0., 1., trans)
 
-    # this is the fast (C++) or slow (python) helper
-    plotPathsToPainter(painter, path, xpos, ypos, scaling, clip, colorimg,
-                       scaleline)
+    # remove overplotted markers
+    if cull and scaling is None and colorvals is None and _isOpaque(painter):
+        idx = cullMarkerIndices(
+            xpos, ypos, resolution=_cullResolution(painter))
+        if idx is not None:
+            xpos, ypos = N.asarray(xpos)[idx], N.asarray(ypos)[idx]
+
+    # draw images of the marker for bitmap output, if possible
+    drawn = False
+    if scaling is None and _canUseSprites(painter, min(len(xpos), len(ypos))):
+        box = path.controlPointRect()
+        pathkey = ( markername, markersize, box.left(), box.top(),
+                    box.right(), box.bottom(), path.elementCount() )
+        drawn = _plotMarkerSprites(
+            painter, path, pathkey, xpos, ypos, clip, colorimg)
+
+    if not drawn:
+        # this is the fast (C++) or slow (python) helper
+        plotPathsToPainter(painter, path, xpos, ypos, scaling, clip,
+                           colorimg, scaleline)
 
     painter.restore()
 
@@ -506,3 +732,57 @@ def plotLineArrow(painter, xpos, ypos, length, angle,
                arrow_translate[arrowleft], arrowsize)
 
     painter.restore()
+
+def plotLineArrows(painter, xpos, ypos, lengths, angles, arrowsizes,
+                   arrowleft='none', arrowright='none', clip=None):
+    """Plot many lines or arrows, as plotLineArrow.
+
+    xpos, ypos, lengths, angles (degrees) and arrowsizes are arrays.
+    The lines are drawn first, then the arrow heads of each type are
+    drawn as one path. Heads outside clip are not drawn.
+    """
+
+    xpos, ypos, lengths, angles, arrowsizes = [
+        N.asarray(v, dtype=N.float64) for v in
+        (xpos, ypos, lengths, angles, arrowsizes)]
+    num = min(len(xpos), len(ypos), len(lengths), len(angles),
+              len(arrowsizes))
+    xpos, ypos, lengths, angles, arrowsizes = [
+        v[:num] for v in (xpos, ypos, lengths, angles, arrowsizes)]
+
+    # zero length lines are not drawn
+    good = ( (lengths != 0) & N.isfinite(xpos) & N.isfinite(ypos) &
+             N.isfinite(lengths) & N.isfinite(angles) &
+             N.isfinite(arrowsizes) )
+    if not N.all(good):
+        xpos, ypos, lengths, angles, arrowsizes = [
+            v[good] for v in (xpos, ypos, lengths, angles, arrowsizes)]
+
+    rad = angles * (N.pi/180.)
+    xend = xpos + lengths*N.cos(rad)
+    yend = ypos + lengths*N.sin(rad)
+    plotLinesToPainter(painter, xpos, ypos, xend, yend, clip)
+
+    painter.save()
+    pen = painter.pen()
+    pen.setJoinStyle( qt4.Qt.MiterJoin )
+    painter.setPen(pen)
+    brush = painter.brush()
+
+    # the left arrow is mirrored, as painter.scale(-1, 1) in plotLineArrow
+    for code, x, y, mirror in ( (arrowright, xend, yend, 1),
+                                (arrowleft, xpos, ypos, -1) ):
+        name = arrow_translate[code]
+        if name == 'none':
+            continue
+        path, fill = getPainterPath(painter, name, 1.)
+        if mirror < 0:
+            path = qt4.QTransform.fromScale(-1, 1).map(path)
+        heads = qt4.QPainterPath()
+        heads.setFillRule(qt4.Qt.WindingFill)
+        addTransformedPathsToPath(heads, path, x, y, angles, arrowsizes,
+                                  clip)
+        painter.setBrush( brush if fill else qt4.QBrush() )
+        painter.drawPath(heads)
+
+    painter.restore()
@@ -95,6 +95,53 @@ def scalePath(path, scale, out):
             i += 2
         i += 1
 
+def _plotColorBatchesToPainter(painter, path, x, y, clip, colorimg, numpts):
+    """Plot paths colored by colorimg, combining paths of the same color
+    into one path. Batches are drawn when a path would overlap one
+    waiting to be drawn, so the output is unchanged."""
+
+    # region affected by path, including line width and antialiasing
+    pen = painter.pen()
+    devscale = abs(painter.worldTransform().determinant())**0.5
+    pad = 2/devscale if devscale > 0 else 2
+    if pen.style() != qt4.Qt.NoPen:
+        lw = max(pen.widthF(), 1) * max(pen.miterLimit(), 1)
+        pad += lw/devscale if pen.isCosmetic() and devscale > 0 else lw
+    box = path.boundingRect().adjusted(-pad, -pad, pad, pad)
+    cw, ch = box.width(), box.height()
+
+    batches = {}
+    waiting = {}
+    def drawbatches():
+        for rgb, bpath in batches.items():
+            painter.setBrush( qt4.QBrush(qt4.QColor.fromRgba(rgb)) )
+            painter.drawPath(bpath)
+        batches.clear()
+        waiting.clear()
+
+    for i in crange(numpts):
+        pt = qt4.QPointF(x[i], y[i])
+        if not clip.contains(pt):
+            continue
+
+        # any overlapping paths are in this or neighbouring cells
+        cx, cy = int(N.floor(x[i]/cw)), int(N.floor(y[i]/ch))
+        for dx, dy in ( (-1,-1), (0,-1), (1,-1), (-1,0), (0,0), (1,0),
+                        (-1,1), (0,1), (1,1) ):
+            if any( ( abs(wx-x[i]) < cw and abs(wy-y[i]) < ch
+                      for wx, wy in waiting.get((cx+dx, cy+dy), []) ) ):
+                drawbatches()
+                break
+
+        rgb = colorimg.pixel(i, 0)
+        if rgb not in batches:
+            batches[rgb] = qt4.QPainterPath()
+            batches[rgb].setFillRule(path.fillRule())
+        batches[rgb].addPath(path.translated(pt))
+        waiting.setdefault((cx, cy), []).append( (x[i], y[i]) )
+
+    drawbatches()
+
 def plotPathsToPainter(painter, path, x, y, scaling=None,
                        clip=None, colorimg=None, scaleline=False):
     """Plot array of x, y points."""
@@ -116,6 +163,12 @@ def plotPathsToPainter(painter, path, x, y, scaling=None,
     if colorimg is not None:
         numpts = min(numpts, colorimg.width())
 
+    # colored paths of the same size can be drawn in batches
+    if colorimg is not None and scaling is None:
+        _plotColorBatchesToPainter(painter, path, x, y, clip, colorimg,
+                                   numpts)
+        return
+
     origtrans = painter.worldTransform()
     for i in crange(numpts):
         pt = qt4.QPointF(x[i], y[i])
@@ -140,6 +193,32 @@ def plotPathsToPainter(painter, path, x, y, scaling=None,
 
             painter.setWorldTransform(origtrans)
 
+def addTransformedPathsToPath(out, path, x, y, angles, scales, clip=None):
+    """Add copies of path to out, at x and y, rotated by angles (degrees)
+    and scaled by scales. Paths outside clip are not added."""
+
+    box = path.boundingRect()
+    extent = max( abs(box.left()), abs(box.right()),
+                  abs(box.top()), abs(box.bottom()) )
+
+    for xv, yv, a, s in czip(x, y, angles, scales):
+        if clip is not None:
+            r = extent*abs(s)
+            if not clip.adjusted(-r, -r, r, r).contains(qt4.QPointF(xv, yv)):
+                continue
+        t = qt4.QTransform()
+        t.translate(xv, yv)
+        t.rotate(a)
+        t.scale(s, s)
+        out.addPath(t.map(path))
+
+def plotImagesToPainter(painter, x, y, srcx, img, width, height):
+    """Draw parts of img of size width x height, starting at srcx in
+    the image, with their top left corners at x, y."""
+    for xv, yv, sx in czip(x, y, srcx):
+        painter.drawImage(qt4.QPointF(xv, yv), img,
+                          qt4.QRectF(sx, 0, width, height))
+
 def plotLinesToPainter(painter, x1, y1, x2, y2, clip=None, autoexpand=True):
     """Plot lines given in numpy arrays to painter."""
     lines = []
@@ -238,8 +317,30 @@ def slowNumpyToQImage(img, cmap, transparencyimg):
     quads = (deltafracs*cmap[bands+1] +
              (1.-deltafracs)*cmap[bands]).astype(N.uint8)
 
+    return _quadsToQImage(quads, img.shape, cmap, transparencyimg)
+
+def slowNumpyLUTToQImage(img, lut, transparencyimg):
+    """Slow version of routine to convert integer numpy array to
+    QImage, looking up the colour of each value.
+
+    img: numpy integer array to convert to QImage
+    lut: 2D array of colors (BGRA rows) for each value
+    transparencyimg: optional array of transparency values."""
+
+    if struct.pack("h", 1) == "\000\001":
+        # have to swap colors for big endian architectures
+        lut = lut[:,::-1]
+
+    idx = N.clip(N.ravel(img), 0, lut.shape[0]-1)
+    quads = lut[idx].astype(N.uint8)
+
+    return _quadsToQImage(quads, img.shape, lut, transparencyimg)
+
+def _quadsToQImage(quads, shape, cmap, transparencyimg):
+    """Make QImage of shape from BGRA quads, applying transparency."""
+
     # apply transparency if a transparency image is set
-    if transparencyimg is not None and transparencyimg.shape == img.shape:
+    if transparencyimg is not None and transparencyimg.shape == shape:
         quads[:,3] = ( N.clip(N.ravel(transparencyimg), 0., 1.) *
                        quads[:,3] ).astype(N.uint8)
 
@@ -251,7 +352,7 @@ def slowNumpyToQImage(img, cmap, transparencyimg):
         # any transparency
         fmt = qt4.QImage.Format_ARGB32
 
-    img = qt4.QImage(s, img.shape[1], img.shape[0], fmt)
+    img = qt4.QImage(s, shape[1], shape[0], fmt)
     img = img.mirrored()
 
     # hack to ensure string isn't freed before QImage
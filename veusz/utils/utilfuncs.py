@@ -547,3 +547,113 @@ def round2delt(fin1, fin2):
     # convert back to float for output
     fout = float(out1)
     return fout if fin1 > 0 else -fout
+
+class LRUCache(object):
+    """A cache holding a limited total size of items.
+
+    Each item is stored with a size (e.g. in bytes). When the total
+    size exceeds maxsize, the least recently used items are removed.
+    Counts of hits and misses are kept to measure the cache
+    effectiveness. Access is thread safe.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Remove all items and reset the counters."""
+        # key -> link, where each link is [prev, next, key, value, size]
+        # links form a circular list in order of use (oldest first)
+        # from the root link
+        self.items = {}
+        self.root = root = []
+        root[:] = [root, root, None, None, 0]
+        self.totalsize = 0
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key, default=None):
+        """Get item with key, returning default if not present."""
+        with self.lock:
+            link = self.items.get(key)
+            if link is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            # move to end as most recently used
+            self._unlink(link)
+            self._append(link)
+            return link[3]
+
+    def set(self, key, value, size=1):
+        """Add item to cache with the size given.
+        Items larger than the cache size are not stored."""
+        with self.lock:
+            self._remove(key)
+            if size > self.maxsize:
+                return
+            link = [None, None, key, value, size]
+            self.items[key] = link
+            self._append(link)
+            self.totalsize += size
+            self._shrink()
+
+    def pop(self, key):
+        """Remove item from cache, if present."""
+        with self.lock:
+            self._remove(key)
+
+    def _append(self, link):
+        """Add link to end of list."""
+        root = self.root
+        last = root[0]
+        link[0] = last
+        link[1] = root
+        last[1] = root[0] = link
+
+    def _unlink(self, link):
+        """Take link out of list."""
+        prev, nxt = link[0], link[1]
+        prev[1] = nxt
+        nxt[0] = prev
+
+    def _remove(self, key):
+        link = self.items.pop(key, None)
+        if link is not None:
+            self._unlink(link)
+            self.totalsize -= link[4]
+
+    def _shrink(self):
+        """Remove least recently used items until within maxsize."""
+        root = self.root
+        while self.totalsize > self.maxsize:
+            self._remove(root[1][2])
+
+    def setMaxSize(self, maxsize):
+        """Change the maximum total size, removing items if necessary."""
+        with self.lock:
+            self.maxsize = maxsize
+            self._shrink()
+
+    def hitRate(self):
+        """Return fraction of lookups which were successful."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.
+
+    def statistics(self):
+        """Return dict of statistics of the cache."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitrate': self.hitRate(),
+            'items': len(self.items),
+            'size': self.totalsize,
+            'maxsize': self.maxsize,
+            }
@@ -567,6 +567,9 @@ class Axis(widget.Widget):
     def dataToPlotterCoords(self, posn, data):
         """Convert data values to plotter coordinates, scaling if necessary."""
         self.updateAxisLocation(posn)
+        if isinstance(data, N.ndarray) and data.dtype != N.float64:
+            # datasets with compact types are converted here
+            data = data.astype(N.float64)
         return self._graphToPlotter(data*self.settings.datascale)
 
     def plotterToGraphCoords(self, bounds, vals):
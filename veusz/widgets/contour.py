@@ -25,7 +25,7 @@ as a C routine (taken from matplotlib) is used to trace the contours.
 from __future__ import division, print_function
 import sys
 
-from ..compat import czip
+from ..compat import czip, crange
 from .. import qtall as qt4
 import numpy as N
 
@@ -48,6 +48,75 @@ def finitePoly(poly):
         out.append( line[validrows] )
     return out
 
+def traceContours(Cntr, xpts, ypts, data, mask, tasks):
+    """Trace contours for each item in tasks, a tuple of a level or a
+    pair of levels (for polygons between levels).
+
+    The tasks are traced in order with a single Cntr object. It keeps
+    the choices made where a contour crosses a saddle zone, so that
+    later levels and the polygons between them are joined up in the
+    same way. Returns list of finite polygons for each task.
+    """
+
+    c = Cntr(xpts, ypts, data, mask)
+    return [finitePoly(c.trace(*levels)) for levels in tasks]
+
+def placeContourLabels(geometry, sizes):
+    """Choose where to put labels on the contours.
+
+    geometry is a list for each level of curves (xplt, yplt, pts)
+    sizes is a list for each level of the label (width, height,
+    textheight), where width and height include padding
+
+    Candidate positions at the middle and quarter points of each
+    curve are tried in turn and rejected if the label would overlap
+    one already placed, using a grid of placed labels.
+
+    Returns a list of labels for each level, each (x, y, rect), where
+    rect is the area kept free of lines.
+    """
+
+    # grid cells are at least as large as any label, so only
+    # neighbouring cells need to be checked for overlaps
+    cellsize = max([max(w, h) for w, h, th in sizes] + [1.])
+    grid = {}
+
+    placed = []
+    for num, curves in enumerate(geometry):
+        w, h, textheight = sizes[num]
+        labels = []
+        for xplt, yplt, pts in curves:
+            # heuristics of when to plot label
+            # we try to only plot label if underlying line is long enough
+            if not ( textheight*1.5 < (yplt.max() - yplt.min()) or
+                     textheight*4 < (xplt.max() - xplt.min()) ):
+                continue
+
+            npts = len(xplt)
+            for frac in (0.5, 0.25, 0.75):
+                i = int(npts*frac)
+                hx, hy = xplt[i], yplt[i]
+                if not N.isfinite(hx) or not N.isfinite(hy):
+                    continue
+                rect = (hx-w*0.5, hy-h*0.5, hx+w*0.5, hy+h*0.5)
+                cx, cy = int(hx // cellsize), int(hy // cellsize)
+
+                overlap = False
+                for gx in crange(cx-1, cx+2):
+                    for gy in crange(cy-1, cy+2):
+                        for r in grid.get((gx, gy), ()):
+                            if ( rect[0] < r[2] and r[0] < rect[2] and
+                                 rect[1] < r[3] and r[1] < rect[3] ):
+                                overlap = True
+                                break
+                if not overlap:
+                    grid.setdefault((cx, cy), []).append(rect)
+                    labels.append( (hx, hy, rect) )
+                    break
+
+        placed.append(labels)
+    return placed
+
 class ContourFills(setting.Settings):
     """Settings for contour fills."""
     def __init__(self, name, **args):
@@ -144,6 +213,10 @@ class Contour(plotters.GenericPlotter):
         self._cachedpolygons = None
         self._cachedsubcontours = None
 
+        # cached contours in plotter coordinates, and key for cache
+        self._cachedgeometry = {}
+        self._cachedgeometrykey = None
+
         if type(self) == Contour:
             self.readDefaults()
 
@@ -242,10 +315,10 @@ class Contour(plotters.GenericPlotter):
         d = self.document
 
         minval, maxval = 0., 1.
-        if s.data in d.data:
-            # scan data
-            data = d.data[s.data].data
-            minval, maxval = N.nanmin(data), N.nanmax(data)
+        data = d.data.get(s.data, None)
+        if data is not None and data.dimensions == 2:
+            # scan data (range is cached by dataset)
+            minval, maxval = data.getValueRange()
             if not N.isfinite(minval):
                 minval = 0.
             if not N.isfinite(maxval):
@@ -453,128 +526,166 @@ class Contour(plotters.GenericPlotter):
         self._cachedcontours = None
         self._cachedpolygons = None
         self._cachedsubcontours = None
+        self._cachedgeometrykey = None
 
         if self.Cntr is not None:
-            c = self.Cntr(xpts, ypts, data.data, mask)
-
-            # trace the contour levels
+            # levels to trace for lines, polygons and sub-levels
+            linetasks, polytasks, subtasks = [], [], []
             if len(s.Lines.lines) != 0:
-                self._cachedcontours = []
-                for level in levels:
-                    linelist = c.trace(level)
-                    self._cachedcontours.append( finitePoly(linelist) )
-
-            # trace the polygons between the contours
+                linetasks = [(level,) for level in levels]
             if len(s.Fills.fills) != 0 and len(levels) > 1 and not s.Fills.hide:
-                self._cachedpolygons = []
-                for level1, level2 in czip(levels[:-1], levels[1:]):
-                    linelist = c.trace(level1, level2)
-                    self._cachedpolygons.append( finitePoly(linelist) )
-
-            # trace sub-levels
-            if len(sublevels) > 0:
-                self._cachedsubcontours = []
-                for level in sublevels:
-                    linelist = c.trace(level)
-                    self._cachedsubcontours.append( finitePoly(linelist) )
-
-    def plotContourLabel(self, painter, number, xplt, yplt, showline):
-        """Draw a label on a contour.
-        This clips when drawing the line, plotting the label on top.
+                polytasks = list(czip(levels[:-1], levels[1:]))
+            subtasks = [(level,) for level in sublevels]
+
+            results = traceContours(
+                self.Cntr, xpts, ypts, data.data, mask,
+                linetasks + polytasks + subtasks)
+
+            nline, npoly = len(linetasks), len(polytasks)
+            if linetasks:
+                self._cachedcontours = results[:nline]
+            if polytasks:
+                self._cachedpolygons = results[nline:nline+npoly]
+            if subtasks:
+                self._cachedsubcontours = results[nline+npoly:]
+
+    def _placeContourLabels(self, painter, geometry):
+        """Choose where to put labels on the contours (see
+        placeContourLabels)."""
+
+        s = self.settings
+        cl = s.get('ContourLabels')
+        font = cl.makeQFont(painter)
+        descent = utils.FontMetrics(font, painter.device()).descent()
+
+        # size of label for each level, including padding
+        sizes = []
+        for num in crange(len(geometry)):
+            text = utils.formatNumber(s.levelsOut[num] * cl.scale,
+                                      cl.format, locale=self.document.locale)
+            bounds = utils.Renderer(painter, font, 0, 0, text, alignhorz=0,
+                                    alignvert=0, angle=0).getBounds()
+            sizes.append( (bounds[2]-bounds[0]+descent*2,
+                           bounds[3]-bounds[1]+descent*2,
+                           bounds[3]-bounds[1]) )
+
+        return placeContourLabels(geometry, sizes)
+
+    def plotContourLabels(self, painter, placed):
+        """Draw the labels chosen by _placeContourLabels.
+
+        The text is laid out once per level and drawn at each
+        position.
         """
+
         s = self.settings
         cl = s.get('ContourLabels')
 
         painter.save()
-
-        # get text and font
-        text = utils.formatNumber(number * cl.scale, cl.format,
-                                  locale=self.document.locale)
+        painter.setPen( cl.makeQPen() )
         font = cl.makeQFont(painter)
-        descent = utils.FontMetrics(font, painter.device()).descent()
+        for num, labels in enumerate(placed):
+            if not labels:
+                continue
+            text = utils.formatNumber(s.levelsOut[num] * cl.scale,
+                                      cl.format, locale=self.document.locale)
+            r = utils.Renderer(painter, font, 0, 0, text, alignhorz=0,
+                               alignvert=0, angle=0)
+            for hx, hy, rect in labels:
+                painter.save()
+                painter.translate(hx, hy)
+                r.render()
+                painter.restore()
+        painter.restore()
 
-        # work out where text lies
-        half = len(xplt) // 2
-        hx, hy = xplt[half], yplt[half]
-        r = utils.Renderer(painter, font, hx, hy, text, alignhorz=0,
-                           alignvert=0, angle=0)
-        bounds = r.getBounds()
-
-        # heuristics of when to plot label
-        # we try to only plot label if underlying line is long enough
-        height = bounds[3]-bounds[1]
-        showtext = ( height*1.5 < (yplt.max() - yplt.min()) or
-                     (height*4 < (xplt.max() - xplt.min())) )
-
-        if showtext:
-            # clip region containing text
-            oldclip = painter.clipRegion()
-            cr = oldclip - qt4.QRegion( bounds[0]-descent, bounds[1]-descent,
-                                        bounds[2]-bounds[0]+descent*2,
-                                        bounds[3]-bounds[1]+descent*2 )
-            painter.setClipRegion(cr)
-
-        # draw lines
-        if showline:
-            pts = qt4.QPolygonF()
-            utils.addNumpyToPolygonF(pts, xplt, yplt)
-            painter.drawPolyline(pts)
-
-        # actually plot the label
-        if showtext:
-            painter.setClipRegion(oldclip)
-            painter.setPen( cl.makeQPen() )
-            r.render()
+    def _geometryCache(self, axes, posn, clip):
+        """Return dict for keeping contours in plotter coordinates.
 
-        painter.restore()
+        This is emptied if the contours, axes, bounds or clipping
+        rectangle change.
+        """
+
+        key = ( id(self.lastdataset), self.contsettings, tuple(posn),
+                (clip.left(), clip.top(), clip.width(), clip.height()) ) + \
+                tuple([ (a.settingsCacheKey(), tuple(a.plottedrange))
+                        for a in axes ])
+        if key != self._cachedgeometrykey:
+            self._cachedgeometry = {}
+            self._cachedgeometrykey = key
+        return self._cachedgeometry
 
     def _plotContours(self, painter, posn, axes, linestyles,
-                      contours, showlabels, hidelines, clip):
+                      contours, showlabels, hidelines, clip, cachename):
         """Plot a set of contours.
-        """
 
-        s = self.settings
+        The contours in plotter coordinates are kept in the geometry
+        cache under cachename.
+        """
 
         # no lines cached as no line styles
         if contours is None:
             return
 
-        # iterate over each level, and list of lines
-        for num, linelist in enumerate(contours):
-
-            # move to the next line style
-            painter.setPen(linestyles.makePen(painter, num))
-                
-            # iterate over each complete line of the contour
-            for curve in linelist:
-                # convert coordinates from graph to plotter
-                xplt = axes[0].dataToPlotterCoords(posn, curve[:,0])
-                yplt = axes[1].dataToPlotterCoords(posn, curve[:,1])
-                    
-                pts = qt4.QPolygonF()
-                utils.addNumpyToPolygonF(pts, xplt, yplt)
-
-                if showlabels:
-                    self.plotContourLabel(painter, s.levelsOut[num],
-                                          xplt, yplt, not hidelines)
-                else:
-                    # actually draw the curve to the plotter
-                    if not hidelines:
-                        utils.plotClippedPolyline(painter, clip, pts)
+        geometry = self._geometryCache(axes, posn, clip)
+        if cachename not in geometry:
+            # convert coordinates from graph to plotter for each curve
+            levels = []
+            for linelist in contours:
+                curves = []
+                for curve in linelist:
+                    xplt = axes[0].dataToPlotterCoords(posn, curve[:,0])
+                    yplt = axes[1].dataToPlotterCoords(posn, curve[:,1])
+                    pts = qt4.QPolygonF()
+                    utils.addNumpyToPolygonF(pts, xplt, yplt)
+                    curves.append( (xplt, yplt, pts) )
+                levels.append(curves)
+            geometry[cachename] = levels
+
+        placed = None
+        if showlabels:
+            placed = self._placeContourLabels(painter, geometry[cachename])
+
+        if not hidelines:
+            painter.save()
+            if placed:
+                # stop lines being drawn underneath labels
+                cutout = qt4.QPainterPath()
+                cutout.setFillRule(qt4.Qt.OddEvenFill)
+                cutout.addRect(qt4.QRectF(clip))
+                for labels in placed:
+                    for hx, hy, r in labels:
+                        cutout.addRect(qt4.QRectF(
+                            qt4.QPointF(r[0], r[1]), qt4.QPointF(r[2], r[3])))
+                painter.setClipPath(cutout, qt4.Qt.IntersectClip)
+
+            # iterate over each level, and list of lines
+            for num, curves in enumerate(geometry[cachename]):
+                # move to the next line style
+                painter.setPen(linestyles.makePen(painter, num))
+
+                # iterate over each complete line of the contour
+                for xplt, yplt, pts in curves:
+                    utils.plotClippedPolyline(painter, clip, pts)
+            painter.restore()
+
+        # draw labels on top
+        if placed:
+            self.plotContourLabels(painter, placed)
 
     def plotContours(self, painter, posn, axes, clip):
         """Plot the traced contours on the painter."""
         s = self.settings
         self._plotContours(painter, posn, axes, s.Lines.get('lines'),
                            self._cachedcontours,
-                           not s.ContourLabels.hide, s.Lines.hide, clip)
+                           not s.ContourLabels.hide, s.Lines.hide, clip,
+                           'contours')
 
     def plotSubContours(self, painter, posn, axes, clip):
         """Plot sub contours on painter."""
         s = self.settings
         self._plotContours(painter, posn, axes, s.SubLines.get('lines'),
                            self._cachedsubcontours,
-                           False, s.SubLines.hide, clip)
+                           False, s.SubLines.hide, clip, 'subcontours')
 
     def plotContourFills(self, painter, posn, axes, clip):
         """Plot the traced contours on the painter."""
@@ -585,23 +696,29 @@ class Contour(plotters.GenericPlotter):
         if self._cachedpolygons is None or s.Fills.hide:
             return
 
-        # iterate over each level, and list of lines
-        for num, polylist in enumerate(self._cachedpolygons):
-
-            # iterate over each complete line of the contour
-            path = qt4.QPainterPath()
-            for poly in polylist:
-                # convert coordinates from graph to plotter
-                xplt = axes[0].dataToPlotterCoords(posn, poly[:,0])
-                yplt = axes[1].dataToPlotterCoords(posn, poly[:,1])
-
-                pts = qt4.QPolygonF()
-                utils.addNumpyToPolygonF(pts, xplt, yplt)
-
-                clippedpoly = qt4.QPolygonF()
-                utils.polygonClip(pts, clip, clippedpoly)
-                path.addPolygon(clippedpoly)
-
+        # make clipped paths in plotter coordinates if not cached
+        geometry = self._geometryCache(axes, posn, clip)
+        if 'fills' not in geometry:
+            paths = []
+            for polylist in self._cachedpolygons:
+                # iterate over each complete line of the contour
+                path = qt4.QPainterPath()
+                for poly in polylist:
+                    # convert coordinates from graph to plotter
+                    xplt = axes[0].dataToPlotterCoords(posn, poly[:,0])
+                    yplt = axes[1].dataToPlotterCoords(posn, poly[:,1])
+
+                    pts = qt4.QPolygonF()
+                    utils.addNumpyToPolygonF(pts, xplt, yplt)
+
+                    clippedpoly = qt4.QPolygonF()
+                    utils.polygonClip(pts, clip, clippedpoly)
+                    path.addPolygon(clippedpoly)
+                paths.append(path)
+            geometry['fills'] = paths
+
+        # iterate over each level
+        for num, path in enumerate(geometry['fills']):
             # fill polygons
             brush = s.Fills.get('fills').returnBrushExtended(num)
             utils.brushExtFillPath(painter, brush, path)
@@ -255,7 +255,9 @@ class Fit(FunctionPlotter):
         else:
             xvals = s.get('yData').getData(d).data
             ydata = s.get('xData').getData(d)
-        yvals = ydata.data
+        # fit in double precision, even if data are stored compactly
+        xvals = N.asarray(xvals, dtype=N.float64)
+        yvals = N.asarray(ydata.data, dtype=N.float64)
         yserr = ydata.serr
 
         # if there are no errors on data
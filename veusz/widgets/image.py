@@ -50,6 +50,15 @@ class Image(plotters.GenericPlotter):
         self.lastdataset = None
         self.schangeset = -1
 
+        # colour-mapped part of image last drawn, with its key
+        self.cachedimage = None
+        self.cachedimagekey = None
+
+        # level of the image pyramid last drawn, as (pyramid, level,
+        # values), kept here in case it is too large for the cache
+        # (a new pyramid is made if the data change)
+        self.cachedlevel = None
+
         # this is the range of data plotted, computed when plot is changed
         # the ColorBar object needs this later
         self.cacheddatarange = (0, 1)
@@ -120,6 +129,14 @@ class Image(plotters.GenericPlotter):
                 descr = _('Smooth image to display resolution'),
                 usertext = _('Smooth'),
                 formatting = True ) )
+        s.add( setting.Choice(
+                'downsample',
+                ['mean', 'max'],
+                'mean',
+                descr = _('How to combine pixels when the image is shown '
+                          'at a lower resolution than the data'),
+                usertext = _('Downsample'),
+                formatting = True ) )
 
     @property
     def userdescription(self):
@@ -132,32 +149,91 @@ class Image(plotters.GenericPlotter):
         return ', '.join(out)
 
     def updateImage(self):
-        """Update the image with new contents."""
+        """Update the colour mapping of the image.
+
+        The image is only made for the part of the data shown, at the
+        resolution shown, when drawn (see makeImage).
+        """
 
         s = self.settings
         d = self.document
         data = s.get('data').getData(d)
 
-        transimg = s.get('transparencyData').getData(d)
-        if transimg is not None:
-            transimg = transimg.data
-
         minval = s.min
         if minval == 'Auto':
-            minval = N.nanmin(data.data)
+            minval = data.getValueRange()[0]
         maxval = s.max
         if maxval == 'Auto':
-            maxval = N.nanmax(data.data)
+            maxval = data.getValueRange()[1]
 
         # this is used currently by colorbar objects
         self.cacheddatarange = (minval, maxval)
 
         # get color map
-        cmap = self.document.getColormap(s.colorMap, s.colorInvert)
+        self.cachedcmap = self.document.getColormap(s.colorMap, s.colorInvert)
+
+        self.cachedimage = None
+        self.cachedimagekey = None
+
+    def chooseLevel(self, data, pltx, plty):
+        """Choose the level of the image pyramid of the data to plot,
+        for an image covering plotter coordinates pltx and plty."""
+
+        s = self.settings
+        transdata = s.get('transparencyData').getData(self.document)
+        if ( transdata is not None and
+             transdata.data.shape != data.data.shape ):
+            # transparency would not line up if resolution changed
+            return 0
+
+        # number of values per output pixel (in the direction with
+        # the fewest, so resolution is not lost)
+        ny, nx = data.data.shape
+        scale = min( nx / max(abs(pltx[1]-pltx[0]), 1.),
+                     ny / max(abs(plty[0]-plty[1]), 1.) )
+        return data.getImagePyramid(s.downsample).levelForScale(scale)
+
+    def makeImage(self, data, level, cutr):
+        """Colour-map the level of the data given, within the range of
+        pixels cutr (x1, y1, x2, y2), inclusive and counting down
+        from the top of the image.
+
+        The last image is cached, as it is likely to be plotted again.
+        """
+
+        s = self.settings
+        key = (level, tuple(cutr))
+        if key == self.cachedimagekey:
+            return self.cachedimage
+
+        pyramid = data.getImagePyramid(s.downsample)
+        if ( self.cachedlevel is not None and
+             self.cachedlevel[0] is pyramid and self.cachedlevel[1] == level ):
+            values = self.cachedlevel[2]
+        else:
+            self.cachedlevel = None
+            values = pyramid.getLevel(level)
+            self.cachedlevel = (pyramid, level, values)
 
-        self.image = utils.applyColorMap(
-            cmap, s.colorScaling, data.data, minval, maxval,
-            s.transparency, transimg=transimg)
+        # images count rows from the top, unlike the data
+        ny = values.shape[0]
+        rows = slice(ny-1-cutr[3], ny-cutr[1])
+        cols = slice(cutr[0], cutr[2]+1)
+
+        transimg = s.get('transparencyData').getData(self.document)
+        if transimg is not None:
+            if level != 0:
+                transimg = transimg.getImagePyramid('mean').getLevel(level)
+            else:
+                transimg = transimg.data
+            transimg = transimg[rows, cols]
+
+        minval, maxval = self.cacheddatarange
+        self.cachedimage = utils.applyColorMap(
+            self.cachedcmap, s.colorScaling, values[rows, cols],
+            minval, maxval, s.transparency, transimg=transimg)
+        self.cachedimagekey = key
+        return self.cachedimage
 
     def affectsAxisRange(self):
         """Range information provided by widget."""
@@ -185,15 +261,21 @@ class Image(plotters.GenericPlotter):
             axrange[0] = min( axrange[0], dyrange[0] )
             axrange[1] = max( axrange[1], dyrange[1] )
 
-    def cutImageToFit(self, pltx, plty, posn):
+    def cutImageToFit(self, pltx, plty, posn, shape):
+        """Work out the part of an image of shape (rows, columns),
+        covering plotter coordinates pltx and plty, inside posn.
+
+        Returns the new plotter coordinates and the range of image
+        pixels (x1, y1, x2, y2), inclusive and counting from the top.
+        """
+
         x1, y1, x2, y2 = posn
         pltx1, pltx2 = pltx
         pltw = pltx2-pltx1
         plty2, plty1 = plty
         plth = plty2-plty1
 
-        imw = self.image.width()
-        imh = self.image.height()
+        imh, imw = shape
         pixw = pltw / imw
         pixh = plth / imh
         cutr = [0, 0, imw-1, imh-1]
@@ -225,12 +307,7 @@ class Image(plotters.GenericPlotter):
             cutr[3] -= d
             plty[0] -= d*pixh
 
-        # create chopped-down image
-        newimage = self.image.copy(cutr[0], cutr[1],
-                                   cutr[2]-cutr[0]+1, cutr[3]-cutr[1]+1)
-
-        # return new image coordinates and image
-        return pltx, plty, newimage
+        return pltx, plty, cutr
 
     def getColorbarParameters(self):
         """Return parameters for colorbar."""
@@ -279,16 +356,26 @@ class Image(plotters.GenericPlotter):
         coordsx = axes[0].dataToPlotterCoords(posn, N.array(rangex))
         coordsy = axes[1].dataToPlotterCoords(posn, N.array(rangey))
 
+        # use reduced resolution data if shown smaller than its size
+        level = self.chooseLevel(data, coordsx, coordsy)
+        shape = data.getImagePyramid(s.downsample).levelShape(level)
+
         # truncate image down if necessary
         # This assumes linear pixels!
         x1, y1, x2, y2 = posn
         if ( coordsx[0] < x1 or coordsx[1] > x2 or
              coordsy[0] < y1 or coordsy[1] > y2 ):
 
-            coordsx, coordsy, image = self.cutImageToFit(coordsx, coordsy,
-                                                         posn)
+            coordsx, coordsy, cutr = self.cutImageToFit(coordsx, coordsy,
+                                                        posn, shape)
         else:
-            image = self.image
+            cutr = [0, 0, shape[1]-1, shape[0]-1]
+
+        # nothing to show
+        if cutr[2] < cutr[0] or cutr[3] < cutr[1]:
+            return
+
+        image = self.makeImage(data, level, cutr)
 
         # optionally smooth images before displaying
         if s.smooth:
@@ -130,15 +130,17 @@ class NonOrthPoint(Widget):
             inrange[2] = min( N.nanmin(d2.data), inrange[2] )
             inrange[3] = max( N.nanmax(d2.data), inrange[3] )
 
+    def _pickable(self, bounds):
+        return pickable.cachedPickable(
+            self, bounds, lambda: pickable.DiscretePickable(
+                self, 'data1', 'data2',
+                lambda v1, v2: self.parent.graphToPlotCoords(v1, v2)))
+
     def pickPoint(self, x0, y0, bounds, distance = 'radial'):
-        p = pickable.DiscretePickable(self, 'data1', 'data2',
-                lambda v1, v2: self.parent.graphToPlotCoords(v1, v2))
-        return p.pickPoint(x0, y0, bounds, distance)
+        return self._pickable(bounds).pickPoint(x0, y0, bounds, distance)
 
     def pickIndex(self, oldindex, direction, bounds):
-        p = pickable.DiscretePickable(self, 'data1', 'data2',
-                lambda v1, v2: self.parent.graphToPlotCoords(v1, v2))
-        return p.pickIndex(oldindex, direction, bounds)
+        return self._pickable(bounds).pickIndex(oldindex, direction, bounds)
 
     def drawLabels(self, painter, xplotter, yplotter,
                    textvals, markersize):
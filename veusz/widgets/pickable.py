@@ -87,6 +87,158 @@ def _chooseOrderingSign(m, c, p):
     else:
         assert m is not None or p is not None
 
+class ScreenIndex:
+    """Index of the screen positions of points within bounds, for
+       finding the nearest point quickly.
+
+       Sorted coordinates are used for horizontal and vertical
+       distances and a grid of cells for radial distances."""
+
+    # target mean number of points in each grid cell
+    pointspercell = 8
+
+    def __init__(self, xscreen, yscreen, bounds):
+        self.xscreen, self.yscreen = xscreen, yscreen
+        self.bounds = bounds
+
+        inbounds = ( (xscreen >= bounds[0]) & (xscreen <= bounds[2]) &
+                     (yscreen >= bounds[1]) & (yscreen <= bounds[3]) )
+        # indices of points which are within the bounds (and finite)
+        self.inidx = N.nonzero(inbounds)[0]
+        self.sorted = {}
+        self.grid = None
+
+    def _sortedCoord(self, axis):
+        """Return sorted coordinates and indices for axis 0 (x) or 1 (y)."""
+        if axis not in self.sorted:
+            vals = (self.xscreen, self.yscreen)[axis][self.inidx]
+            order = N.argsort(vals, kind='mergesort')
+            self.sorted[axis] = (vals[order], self.inidx[order])
+        return self.sorted[axis]
+
+    def _nearestLinear(self, axis, v0):
+        """Return (index, distance) of nearest point along axis."""
+        vals, idxs = self._sortedCoord(axis)
+        pos = N.searchsorted(vals, v0)
+
+        best = None
+        for p in (pos-1, pos):
+            if p < 0 or p >= len(vals):
+                continue
+            # the lowest index with this value comes first
+            first = N.searchsorted(vals, vals[p], side='left')
+            cand = (abs(vals[p]-v0), idxs[first])
+            if best is None or cand < best:
+                best = cand
+        return best[1], best[0]
+
+    def _makeGrid(self):
+        """Put points into a grid of cells covering the bounds."""
+        b = self.bounds
+        width, height = max(b[2]-b[0], 1), max(b[3]-b[1], 1)
+        npts = max(len(self.inidx), 1)
+        cellsize = max( N.sqrt(width*height*self.pointspercell/npts), 1. )
+        ncx = min( int(width/cellsize)+1, 1024 )
+        ncy = min( int(height/cellsize)+1, 1024 )
+        cellsize = max( width/ncx, height/ncy ) * 1.0001
+
+        cx = ((self.xscreen[self.inidx]-b[0]) / cellsize).astype(N.intp)
+        cy = ((self.yscreen[self.inidx]-b[1]) / cellsize).astype(N.intp)
+        cellid = cy*ncx + cx
+        order = N.argsort(cellid, kind='mergesort')
+        starts = N.searchsorted(cellid[order], N.arange(ncx*ncy+1))
+        self.grid = (cellsize, ncx, ncy, self.inidx[order], starts)
+
+    def _nearestRadial(self, x0, y0):
+        """Return (index, distance) of nearest point by radial distance.
+
+        Rings of cells are searched outwards from the cell nearest the
+        point, until no closer point can be found further out."""
+
+        if self.grid is None:
+            self._makeGrid()
+        cellsize, ncx, ncy, idxs, starts = self.grid
+        b = self.bounds
+
+        qx, qy = (x0-b[0]) / cellsize, (y0-b[1]) / cellsize
+        cx = min( max(int(N.floor(qx)), 0), ncx-1 )
+        cy = min( max(int(N.floor(qy)), 0), ncy-1 )
+
+        best = None
+        r = 0
+        while True:
+            # cells in ring r around cx, cy, clipped to the grid
+            x1, x2 = max(cx-r, 0), min(cx+r, ncx-1)
+            y1, y2 = max(cy-r, 0), min(cy+r, ncy-1)
+            cells = []
+            for yc in (cy-r, cy+r):
+                if 0 <= yc < ncy:
+                    cells.append( yc*ncx + N.arange(x1, x2+1) )
+            for xc in (cx-r, cx+r):
+                if r > 0 and 0 <= xc < ncx:
+                    ys = N.arange( max(cy-r+1, 0), min(cy+r-1, ncy-1)+1 )
+                    cells.append( ys*ncx + xc )
+
+            if cells:
+                cells = N.unique(N.concatenate(cells))
+                s, e = starts[cells], starts[cells+1]
+                nums = e - s
+                if nums.sum() > 0:
+                    # indices of points in the cells
+                    pos = ( N.repeat(s - N.cumsum(nums) + nums, nums) +
+                            N.arange(nums.sum()) )
+                    pts = idxs[pos]
+                    dist = N.sqrt( (self.xscreen[pts]-x0)**2 +
+                                   (self.yscreen[pts]-y0)**2 )
+                    i = N.lexsort((pts, dist))[0]
+                    if best is None or (dist[i], pts[i]) < best:
+                        best = (dist[i], pts[i])
+
+            if x1 == 0 and y1 == 0 and x2 == ncx-1 and y2 == ncy-1:
+                # searched the whole grid
+                break
+            if best is not None:
+                # closest a point outside the cells searched can be,
+                # ignoring edges of the grid
+                inf = float('inf')
+                bound = min( qx-x1 if x1 > 0 else inf,
+                             x2+1-qx if x2 < ncx-1 else inf,
+                             qy-y1 if y1 > 0 else inf,
+                             y2+1-qy if y2 < ncy-1 else inf )
+                if best[0] <= bound*cellsize:
+                    break
+            r += 1
+
+        return best[1], best[0]
+
+    def nearest(self, x0, y0, distance_direction):
+        """Return (index, distance) of the nearest point, or None if
+           no points are within the bounds."""
+        if len(self.inidx) == 0:
+            return None
+        if distance_direction == 'vertical':
+            return self._nearestLinear(1, y0)
+        elif distance_direction == 'horizontal':
+            return self._nearestLinear(0, x0)
+        elif distance_direction == 'radial':
+            return self._nearestRadial(x0, y0)
+        else:
+            # programming error
+            assert (distance_direction == 'radial' or
+                    distance_direction == 'vertical' or
+                    distance_direction == 'horizontal')
+
+    def step(self, i, incr):
+        """Return next index from i in the direction incr (+1 or -1)
+           which is within the bounds, or None."""
+        if incr > 0:
+            p = N.searchsorted(self.inidx, i, side='right')
+        else:
+            p = N.searchsorted(self.inidx, i, side='left') - 1
+        if p < 0 or p >= len(self.inidx):
+            return None
+        return self.inidx[p]
+
 class GenericPickable:
     """Utility class which abstracts the math of picking the closest point out
        of a list of points"""
@@ -96,6 +248,18 @@ class GenericPickable:
         self.labels = labels
         self.xvals, self.yvals = vals
         self.xscreen, self.yscreen = screenvals
+        # indices of screen positions, by bounds
+        self.indices = {}
+
+    def _screenIndex(self, bounds):
+        """Get index of screen positions for bounds, reusing it for
+           further picks."""
+        key = tuple(bounds)
+        if key not in self.indices:
+            self.indices[key] = ScreenIndex(
+                N.asarray(self.xscreen, dtype=N.float64),
+                N.asarray(self.yscreen, dtype=N.float64), key)
+        return self.indices[key]
 
     def _pickSign(self, i):
         if len(self.xscreen) <= 1:
@@ -127,31 +291,14 @@ class GenericPickable:
         if len(self.xscreen) == 0 or len(self.yscreen) == 0:
             return info
 
-        # calculate distances
-        if distance_direction == 'vertical':
-            # measure distance along y
-            dist = N.abs(self.yscreen - y0)
-        elif distance_direction == 'horizontal':
-            # measure distance along x
-            dist = N.abs(self.xscreen - x0)
-        elif distance_direction == 'radial':
-            # measure radial distance
-            dist = N.sqrt((self.xscreen - x0)**2 + (self.yscreen - y0)**2)
+        # find the nearest point within the bounds
+        # if there are multiple equidistant points, take the first one
+        nearest = self._screenIndex(bounds).nearest(x0, y0, distance_direction)
+        if nearest is None:
+            # no points onscreen
+            i, m = 0, float('inf')
         else:
-            # programming error
-            assert (distance_direction == 'radial' or
-                    distance_direction == 'vertical' or
-                    distance_direction == 'horizontal')
-
-        # ignore points which are offscreen
-        outofbounds = ( (self.xscreen < bounds[0]) | (self.xscreen > bounds[2]) |
-                        (self.yscreen < bounds[1]) | (self.yscreen > bounds[3]) )
-        dist[outofbounds] = float('inf')
-
-        m = N.min(dist)
-        # if there are multiple equidistant points, arbitrarily take
-        # the first one
-        i = N.nonzero(dist == m)[0][0]
+            i, m = nearest
 
         info.screenpos = self.xscreen[i], self.yscreen[i]
         info.coords = self.xvals[i], self.yvals[i]
@@ -190,15 +337,9 @@ class GenericPickable:
         else:
             assert direction == 'right' or direction == 'left'
 
-        i += incr
-
         # skip points that are outside of the bounds
-        while ( i >= 0 and i < len(self.xscreen) and
-            (self.xscreen[i] < bounds[0] or self.xscreen[i] > bounds[2] or
-             self.yscreen[i] < bounds[1] or self.yscreen[i] > bounds[3]) ):
-            i += incr
-
-        if i < 0 or i >= len(self.xscreen):
+        i = self._screenIndex(bounds).step(i, incr)
+        if i is None:
             return info
 
         info.screenpos = self.xscreen[i], self.yscreen[i]
@@ -207,6 +348,18 @@ class GenericPickable:
 
         return info
 
+def cachedPickable(widget, bounds, makefn):
+    """Return the pickable made by makefn() for widget, reusing the one
+       made before if the document and bounds have not changed since.
+
+       The screen position index of the pickable is therefore kept until
+       the plot changes."""
+    key = (widget.document.changeset, tuple(bounds))
+    cache = getattr(widget, '_pickablecache', None)
+    if cache is None or cache[0] != key:
+        cache = widget._pickablecache = (key, makefn())
+    return cache[1]
+
 class DiscretePickable(GenericPickable):
     """A specialization of GenericPickable that knows how to deal with widgets
        with axes and data sets"""
@@ -167,11 +167,29 @@ class GenericPlotter(widget.Widget):
 
         # clip data within bounds of plotter
         cliprect = self.clipAxesBounds(axes, posn)
+
+        # reuse previous drawing if nothing has changed
+        key = None
+        if painthelper.layercache is not None:
+            key = self.drawCacheKey(axes)
+            if painthelper.useCachedLayer(self, posn, cliprect, key):
+                return posn
+
         painter = painthelper.painter(self, posn, clip=cliprect)
         with painter:
             self.dataDraw(painter, axes, posn, cliprect)
+
+        if key is not None:
+            painthelper.cacheLayer(self, posn, cliprect, key)
         return posn
 
+    def drawCacheKey(self, axes):
+        """Return a key which changes if the output of dataDraw would
+        change, given the axes used."""
+        return ( (id(self), self.settingsCacheKey()) +
+                 tuple([ (a.settingsCacheKey(), tuple(a.plottedrange))
+                         for a in axes ]) )
+
     def dataDraw(self, painter, axes, posn, cliprect):
         """Actually plot the data."""
         pass
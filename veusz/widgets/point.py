@@ -251,6 +251,9 @@ class PointPlotter(GenericPlotter):
     allowusercreation=True
     description=_('Plot points with lines and errorbars')
 
+    # minimum dataset size to plot lines using a summary of the data
+    lodminpoints = 1000000
+
     def __init__(self, parent, name=None):
         """Initialise XY plotter plotting (xdata, ydata).
 
@@ -302,6 +305,24 @@ class PointPlotter(GenericPlotter):
                                   'bar',
                                   descr=_('Style of error bars to plot'),
                                   usertext=_('Error style'), formatting=True) )
+        s.add( setting.Choice('densityMode',
+                              ['off', 'on', 'auto'],
+                              'off',
+                              descr=_('Plot the density of points as an image '
+                                      'instead of markers. Auto plots an image '
+                                      'if there are more points than the '
+                                      'density threshold'),
+                              usertext=_('Density mode'), formatting=True) )
+        s.add( setting.Int('densityThreshold', 1000000,
+                           minval=1,
+                           descr=_('Number of points above which the density '
+                                   'is plotted in auto density mode'),
+                           usertext=_('Density threshold'), formatting=True) )
+        s.add( setting.Choice('densityScaling',
+                              ['linear', 'sqrt', 'log', 'squared'],
+                              'log',
+                              descr=_('Scaling to transform density to color'),
+                              usertext=_('Density scaling'), formatting=True) )
 
         s.add( setting.XYPlotLine('PlotLine',
                                   descr = _('Plot line settings'),
@@ -409,8 +430,35 @@ class PointPlotter(GenericPlotter):
                 axrange[0] = min(axrange[0], 1)
                 axrange[1] = max(axrange[1], length)
 
-    def _getLinePoints( self, xvals, yvals, posn, xdata, ydata ):
-        """Get the points corresponding to the line connecting the points."""
+    def _decimatePixelSize(self, painter):
+        """Return the size of a device pixel in plotter coordinates if
+        the plot line can be decimated, or None if not.
+
+        Only thin solid lines without fills drawn to bitmaps give the
+        same output when decimated.
+        """
+
+        s = self.settings
+        if ( not s.PlotLine.decimate or s.PlotLine.bezierJoin or
+             s.PlotLine.steps != 'off' or
+             not s.FillAbove.hide or not s.FillBelow.hide or
+             not getattr(painter, 'raster', False) ):
+            return None
+
+        pen = s.PlotLine.makeQPen(painter)
+        scale = abs(painter.worldTransform().m11())
+        if ( pen.style() != qt4.Qt.SolidLine or scale == 0 or
+             pen.widthF()*scale > 1 ):
+            return None
+        return 1./scale
+
+    def _getLinePoints( self, xvals, yvals, posn, xdata, ydata,
+                        pixsize=None ):
+        """Get the points corresponding to the line connecting the points.
+
+        If pixsize is given, points which do not change the line drawn
+        with pixels of that size are removed.
+        """
 
         pts = qt4.QPolygonF()
 
@@ -419,6 +467,10 @@ class PointPlotter(GenericPlotter):
 
         # simple continuous line
         if steps == 'off':
+            if pixsize is not None:
+                # remove points which do not change the plotted line
+                xvals, yvals = utils.decimateLine(
+                    xvals, yvals, pixsize=pixsize)
             utils.addNumpyToPolygonF(pts, xvals, yvals)
 
         # stepped line, with points on left
@@ -543,7 +595,8 @@ class PointPlotter(GenericPlotter):
                        cliprect ):
         """Draw the line connecting the points."""
 
-        pts = self._getLinePoints(xvals, yvals, posn, xdata, ydata)
+        pts = self._getLinePoints(xvals, yvals, posn, xdata, ydata,
+                                  pixsize=self._decimatePixelSize(painter))
         if len(pts) < 2:
             return
         s = self.settings
@@ -568,6 +621,138 @@ class PointPlotter(GenericPlotter):
             painter.setPen( s.PlotLine.makeQPen(painter) )
             utils.plotClippedPolyline(painter, cliprect, pts)
 
+    def _canDrawLOD(self, painter, xv, yv, text, scalepoints, colorpoints):
+        """Can a line through a large dataset be drawn using its
+        multi-resolution summary (only a decimated line with sorted x)?"""
+
+        s = self.settings
+        if self._decimatePixelSize(painter) is None:
+            # summary only gives the same output as a decimated line
+            return False
+        if text or scalepoints or colorpoints:
+            return False
+        if s.marker != 'none' and not (s.MarkerLine.hide and s.MarkerFill.hide):
+            return False
+        if s.errorStyle != 'none' and (xv.hasErrors() or yv.hasErrors()):
+            return False
+        if ( not isinstance(xv, document.Dataset) or
+             not isinstance(yv, document.Dataset) ):
+            return False
+
+        length = len(yv.data)
+        return ( length >= self.lodminpoints and len(xv.data) == length and
+                 xv.validCount() == length and yv.validCount() == length and
+                 xv.isSorted() )
+
+    def _drawLODLine(self, painter, axes, posn, xv, yv, cliprect):
+        """Draw line for dataset using only the points needed in the
+        visible range of the x axis."""
+
+        xdata = xv.data
+        try:
+            xr = N.sort( N.array(axes[0].plottedrange) /
+                         axes[0].settings.datascale )
+        except ZeroDivisionError:
+            return
+
+        # find visible range with a binary search, including the
+        # points just outside so the line leaves the graph
+        start = max(N.searchsorted(xdata, xr[0], side='left') - 1, 0)
+        end = min(N.searchsorted(xdata, xr[1], side='right') + 1,
+                  len(xdata))
+
+        # split the range into the pixel columns of the output
+        pixsize = self._decimatePixelSize(painter)
+        pr = N.sort(axes[0].dataToPlotterCoords(posn, xr))
+        cols = N.arange(N.floor(pr[0]/pixsize),
+                        N.floor(pr[1]/pixsize)+2) * pixsize
+        xb = N.sort(axes[0].plotterToDataCoords(posn, cols))
+        bounds = N.concatenate((
+            [start], N.searchsorted(xdata, xb), [end] ))
+        bounds = N.clip(bounds, start, end)
+
+        idx = yv.getLODPyramid().getColumnIndices(bounds)
+        if len(idx) < 2:
+            return
+
+        xplotter = axes[0].dataToPlotterCoords(posn, N.array(xdata[idx]))
+        yplotter = axes[1].dataToPlotterCoords(posn, N.array(yv.data[idx]))
+        self._drawPlotLine(painter, xplotter, yplotter, posn, xv, yv,
+                           cliprect)
+
+    def _useDensity(self, xv, yv, scalepoints, colorpoints):
+        """Should the markers be plotted as a density image?"""
+
+        s = self.settings
+        if s.marker == 'none' or (s.MarkerLine.hide and s.MarkerFill.hide):
+            return False
+        if s.densityMode == 'on':
+            return True
+        # the density image cannot show scaled or colored markers
+        return ( s.densityMode == 'auto' and not scalepoints and
+                 not (colorpoints and not s.MarkerFill.hide) and
+                 min(len(xv.data), len(yv.data)) > s.densityThreshold )
+
+    def _densityRect(self, painter, cliprect):
+        """Return (left, top, width, height) of the device pixels
+        covering cliprect, for the density histogram."""
+
+        devrect = painter.worldTransform().mapRect(cliprect)
+        left = int(N.floor(devrect.left()))
+        top = int(N.floor(devrect.top()))
+        width = max(int(N.ceil(devrect.right())) - left, 1)
+        height = max(int(N.ceil(devrect.bottom())) - top, 1)
+        return left, top, width, height
+
+    def _addDensity(self, painter, density, xplt, yplt, cliprect):
+        """Add points to a 2D histogram of the number of points in each
+        device pixel of cliprect. density is None or the previous
+        histogram.
+        """
+
+        left, top, width, height = self._densityRect(painter, cliprect)
+        if density is None:
+            density = N.zeros(width*height, dtype=N.int64)
+
+        # convert plotter to device coordinates
+        t = painter.worldTransform()
+        xdev = t.m11()*xplt + t.m21()*yplt + t.dx()
+        ydev = t.m12()*xplt + t.m22()*yplt + t.dy()
+
+        xi = N.floor(xdev - left)
+        yi = N.floor(ydev - top)
+        inside = (xi >= 0) & (xi < width) & (yi >= 0) & (yi < height)
+
+        # rows of output image are bottom to top
+        bins = ( (height-1-yi[inside]).astype(N.intp)*width +
+                 xi[inside].astype(N.intp) )
+        density += N.bincount(bins, minlength=width*height)
+        return density
+
+    def _drawDensity(self, painter, density, cliprect):
+        """Draw density histogram as an image covering cliprect."""
+
+        s = self.settings
+        left, top, width, height = self._densityRect(painter, cliprect)
+        density = density.reshape(height, width)
+
+        maxval = density.max()
+        if maxval == 0:
+            return
+
+        cmap = self.document.getColormap(
+            s.MarkerFill.colorMap, s.MarkerFill.colorMapInvert)
+        # empty pixels are transparent
+        image = utils.applyColorMap(
+            cmap, s.densityScaling, density, 1, maxval,
+            s.MarkerFill.transparency,
+            transimg=(density > 0).astype(N.float64))
+
+        # image pixels are device pixels
+        inverse = painter.worldTransform().inverted()[0]
+        painter.drawImage(
+            inverse.mapRect(qt4.QRectF(left, top, width, height)), image)
+
     def drawKeySymbol(self, number, painter, x, y, width, height):
         """Draw the plot symbol and/or line."""
         painter.save()
@@ -684,7 +869,9 @@ class PointPlotter(GenericPlotter):
             map_fn = lambda x, y: ( axes[0].dataToPlotterCoords(bounds, x),
                                     axes[1].dataToPlotterCoords(bounds, y) )
 
-        return pickable.DiscretePickable(self, 'xData', 'yData', map_fn)
+        return pickable.cachedPickable(
+            self, bounds, lambda: pickable.DiscretePickable(
+                self, 'xData', 'yData', map_fn))
 
     def pickPoint(self, x0, y0, bounds, distance = 'radial'):
         return self._pickable(bounds).pickPoint(x0, y0, bounds, distance)
@@ -731,6 +918,16 @@ class PointPlotter(GenericPlotter):
             length = min( len(xv.data), len(yv.data) )
             text = text*(length // len(text)) + text[:length % len(text)]
 
+        # plot very large datasets using summary of data
+        if self._canDrawLOD(painter, xv, yv, text, scalepoints,
+                            colorpoints):
+            self._drawLODLine(painter, axes, posn, xv, yv, cliprect)
+            return
+
+        # plot markers as a density image for large datasets
+        usedensity = self._useDensity(xv, yv, scalepoints, colorpoints)
+        density = None
+
         # loop over chopped up values
         for xvals, yvals, tvals, ptvals, cvals in (
             document.generateValidDatasetParts(
@@ -808,16 +1005,26 @@ class PointPlotter(GenericPlotter):
                     cmap = self.document.getColormap(
                         s.MarkerFill.colorMap, s.MarkerFill.colorMapInvert)
 
-                # actually plot datapoints
-                utils.plotMarkers(painter, xplt, yplt, s.marker, markersize,
-                                  scaling=scaling, clip=cliprect,
-                                  cmap=cmap, colorvals=colorvals,
-                                  scaleline=s.MarkerLine.scaleLine)
+                if usedensity:
+                    # add points to density histogram
+                    density = self._addDensity(
+                        painter, density, xplt, yplt, cliprect)
+                else:
+                    # actually plot datapoints
+                    utils.plotMarkers(painter, xplt, yplt, s.marker,
+                                      markersize,
+                                      scaling=scaling, clip=cliprect,
+                                      cmap=cmap, colorvals=colorvals,
+                                      scaleline=s.MarkerLine.scaleLine,
+                                      cull=True)
 
             # finally plot any labels
             if tvals and not s.Label.hide:
                 self.drawLabels(painter, xplotter, yplotter,
                                 tvals, markersize)
 
+        if density is not None:
+            self._drawDensity(painter, density, cliprect)
+
 # allow the factory to instantiate an x,y plotter
 document.thefactory.register( PointPlotter )
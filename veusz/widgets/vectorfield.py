@@ -21,7 +21,6 @@
 from __future__ import division
 import numpy as N
 
-from ..compat import czip
 from .. import setting
 from .. import document
 from .. import utils
@@ -89,14 +88,21 @@ class VectorField(plotters.GenericPlotter):
                             usertext = _('Scale arrow'),
                             formatting=True),
                2 )
+        s.add( setting.DistancePt('minspacing', '0pt',
+                                  descr = _('Minimum spacing between '
+                                            'vectors, skipping vectors to '
+                                            'keep them this far apart'),
+                                  usertext = _('Min spacing'),
+                                  formatting=True),
+               3 )
         s.add( setting.Arrow('arrowfront', 'none',
                              descr = _('Arrow in front direction'),
                              usertext=_('Arrow front'), formatting=True),
-               3)
+               4)
         s.add( setting.Arrow('arrowback', 'none',
                              descr = _('Arrow in back direction'),
                              usertext=_('Arrow back'), formatting=True),
-               4)
+               5)
 
         s.add( setting.Line('Line',
                             descr = _('Line style'),
@@ -168,8 +174,12 @@ class VectorField(plotters.GenericPlotter):
         xw = min(data1st.shape[1], data2nd.shape[1])
         yw = min(data1st.shape[0], data2nd.shape[0])
 
+        # skip vectors closer than minimum spacing
+        xstep, ystep = self._thinSteps(
+            painter, axes, posn, data1, xw, yw)
+
         # construct indices into datasets
-        yvals, xvals = N.mgrid[0:yw, 0:xw]
+        yvals, xvals = N.mgrid[0:yw:ystep, 0:xw:xstep]
         # convert using 1st dataset to axes values
         xdsvals, ydsvals = data1.indexToPoint(xvals.ravel(), yvals.ravel())
 
@@ -181,12 +191,12 @@ class VectorField(plotters.GenericPlotter):
         painter.setPen(pen)
 
         if s.mode == 'cartesian':
-            dx = (data1st[:yw, :xw] * baselength).ravel()
-            dy = (data2nd[:yw, :xw] * baselength).ravel()
+            dx = (data1st[:yw:ystep, :xw:xstep] * baselength).ravel()
+            dy = (data2nd[:yw:ystep, :xw:xstep] * baselength).ravel()
 
         elif s.mode == 'polar':
-            r = data1st[:yw, :xw].ravel() * baselength
-            theta = data2nd[:yw, :xw].ravel()
+            r = data1st[:yw:ystep, :xw:xstep].ravel() * baselength
+            theta = data2nd[:yw:ystep, :xw:xstep].ravel()
             dx = r * N.cos(theta)
             dy = r * N.sin(theta)
 
@@ -210,11 +220,33 @@ class VectorField(plotters.GenericPlotter):
             else:
                 arrowsizes = N.zeros(lengths.shape) + arrowsize
 
-            for x, y, l, a, asize in czip(x2, y2, lengths, angles, arrowsizes):
-                if l != 0.:
-                    utils.plotLineArrow(painter, x, y, l, a, asize,
-                                        arrowleft=s.arrowfront,
-                                        arrowright=s.arrowback)
+            utils.plotLineArrows(painter, x2, y2, lengths, angles,
+                                 arrowsizes, arrowleft=s.arrowfront,
+                                 arrowright=s.arrowback, clip=cliprect)
+
+    def _thinSteps(self, painter, axes, posn, data, xw, yw):
+        """Return steps in x and y indices between vectors plotted, so
+        that the vectors are at least minspacing apart."""
+
+        minspacing = self.settings.get('minspacing').convert(painter)
+        if minspacing <= 0:
+            return 1, 1
+
+        steps = []
+        for axis, idx, num in ( (axes[0], 0, xw), (axes[1], 1, yw) ):
+            if num < 2:
+                steps.append(1)
+                continue
+            # typical spacing between vectors on screen
+            i = N.arange(num)
+            pts = data.indexToPoint(i, i)[idx]
+            plt = axis.dataToPlotterCoords(posn, pts)
+            spacing = N.median(N.abs(N.diff(plt)))
+            if not N.isfinite(spacing) or spacing <= 0:
+                steps.append(1)
+            else:
+                steps.append( max(int(N.ceil(minspacing/spacing)), 1) )
+        return tuple(steps)
                 
 # allow the factory to instantiate a vector field
 document.thefactory.register( VectorField )
@@ -22,7 +22,7 @@
 from __future__ import division
 import itertools
 
-from ..compat import czip, crepr
+from ..compat import czip, crepr, cbasestr
 from .. import document
 from .. import setting
 from .. import qtall as qt4
@@ -311,6 +311,42 @@ class Widget(object):
         # return our final bounds
         return bounds
 
+    def settingsCacheKey(self):
+        """Return a value which changes if the values of the settings
+        of the widget change, or if any datasets or custom definitions
+        which they could refer to change.
+
+        This is used as a key for caching the drawn widget.
+        """
+
+        doc = self.document
+        out = [tuple([tuple(c) for c in doc.customs])]
+        stack = [self.settings]
+        while stack:
+            settings = stack.pop()
+            stack += settings.getSettingsList()
+            for s in settings.getSettingList():
+                val = s.val
+                out.append(crepr(val))
+
+                # only settings which refer to datasets depend on them
+                if isinstance(s, setting.Dataset):
+                    if not isinstance(val, cbasestr):
+                        continue
+                    vals = (val,)
+                elif isinstance(s, setting.Datasets):
+                    vals = val
+                else:
+                    continue
+                for v in vals:
+                    out.append(document.expressionDependencyState(doc, v))
+                    ds = doc.data.get(v)
+                    if ds is not None:
+                        out.append( (doc.datachangesets.get(v),
+                                     ds.dependencyState()) )
+
+        return tuple(out)
+
     def getSaveText(self, saveall = False):
         """Return text to restore object
 
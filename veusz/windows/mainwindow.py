@@ -905,6 +905,10 @@ class MainWindow(qt4.QMainWindow):
         self.plotqueuecount += incr
         text = u'•' * self.plotqueuecount
         self.plotqueuelabel.setText(text)
+        self.plotqueuelabel.setToolTip(
+            _("Number of rendering jobs remaining\n"
+              "Layer cache hit rate: %.0f%%") %
+            (self.plot.layercache.hitRate()*100))
 
     def _fileSaveDialog(self, filetype, filedescr, dialogtitle):
         """A generic file save dialog for exporting / saving."""
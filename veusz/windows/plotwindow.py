@@ -23,7 +23,7 @@ from __future__ import division
 import sys
 import traceback
 
-from ..compat import crange, ckeys
+from ..compat import crange, ckeys, cvalues
 from .. import qtall as qt4
 import numpy as N
 
@@ -69,7 +69,8 @@ class RenderControl(qt4.QObject):
     """Object for rendering plots in a separate thread."""
 
     signalRenderFinished = qt4.pyqtSignal(
-        int, qt4.QImage, document.PaintHelper)
+        int, qt4.QImage, document.PaintHelper, object)
+    signalTileFinished = qt4.pyqtSignal(int, int, int, qt4.QImage)
 
     def __init__(self, plotwindow):
         """Start up numthreads rendering threads."""
@@ -79,6 +80,9 @@ class RenderControl(qt4.QObject):
         self.threads = []
         self.exit = False
         self.latestjobs = []
+        # jobs to render tiles of the latest painted page
+        self.tilejobs = []
+        self.tilegeneration = None
         self.latestaddedjob = -1
         self.latestdrawnjob = -1
         self.plotwindow = plotwindow
@@ -117,41 +121,80 @@ class RenderControl(qt4.QObject):
     def processNextJob(self):
         """Take a job from the queue and process it.
 
-        emits renderfinished(jobid, img, painthelper)
+        emits renderfinished(jobid, img, painthelper, cachekey)
         when done, if job has not been superseded
         """
 
         self.mutex.lock()
-        jobid, helper = self.latestjobs[-1]
+        if not self.latestjobs:
+            # no normal jobs, so render a tile if any are left
+            tile = None
+            if self.tilejobs:
+                tile = self.tilejobs.pop(0)
+            self.mutex.unlock()
+            if tile is not None:
+                self.processTileJob(*tile)
+            return
+
+        jobid, helper, cachekey = self.latestjobs[-1]
         del self.latestjobs[-1]
         lastadded = self.latestaddedjob
         self.mutex.unlock()
 
         # don't process jobs which have been superseded
         if lastadded == jobid:
-            img = qt4.QImage(helper.pagesize[0], helper.pagesize[1],
-                             qt4.QImage.Format_ARGB32_Premultiplied)
-            img.fill( setting.settingdb.color('page').rgb() )
-
-            painter = qt4.QPainter(img)
-            aa = self.plotwindow.antialias
-            painter.setRenderHint(qt4.QPainter.Antialiasing, aa)
-            painter.setRenderHint(qt4.QPainter.TextAntialiasing, aa)
-            helper.renderToPainter(painter)
-            painter.end()
+            img = self.renderImage(helper)
 
             self.mutex.lock()
             # just throw away result if it older than the latest one
             if jobid > self.latestdrawnjob:
-                self.signalRenderFinished.emit(jobid, img, helper)
+                self.signalRenderFinished.emit(jobid, img, helper, cachekey)
                 self.latestdrawnjob = jobid
             self.mutex.unlock()
 
         # tell any listeners that a job has been processed
         self.plotwindow.emit( qt4.SIGNAL("queuechange"), -1 )
 
-    def addJob(self, helper):
-        """Process drawing job in PaintHelper given."""
+    def processTileJob(self, generation, helper, tx, ty, tilesize):
+        """Render a tile of a painted page, if it is still wanted."""
+        if generation != self.tilegeneration:
+            return
+        img = self.renderImage(
+            helper, qt4.QRect(tx*tilesize, ty*tilesize, tilesize, tilesize))
+        self.signalTileFinished.emit(generation, tx, ty, img)
+
+    def renderImage(self, helper, rect=None):
+        """Render the painted helper to a new image.
+
+        If rect is set, only render this part of the page."""
+
+        if rect is None:
+            rect = qt4.QRect(0, 0, helper.pagesize[0], helper.pagesize[1])
+        else:
+            rect = rect.intersected(
+                qt4.QRect(0, 0, helper.pagesize[0], helper.pagesize[1]))
+
+        img = qt4.QImage(rect.width(), rect.height(),
+                         qt4.QImage.Format_ARGB32_Premultiplied)
+        img.fill( setting.settingdb.color('page').rgb() )
+
+        painter = qt4.QPainter(img)
+        aa = self.plotwindow.antialias
+        painter.setRenderHint(qt4.QPainter.Antialiasing, aa)
+        painter.setRenderHint(qt4.QPainter.TextAntialiasing, aa)
+        # select region of page (overrides the transformation
+        # set up when the recording is replayed)
+        painter.setWindow(rect)
+        helper.renderToPainter(painter)
+        painter.end()
+        return img
+
+    def addJob(self, helper, cachekey=None):
+        """Process drawing job in PaintHelper given.
+
+        If cachekey is set, the result is kept in the page cache with
+        this key.
+        """
 
         # indicate that there is a new item to be processed to listeners
         self.plotwindow.emit( qt4.SIGNAL("queuechange"), 1 )
@@ -159,7 +202,7 @@ class RenderControl(qt4.QObject):
         # add the job to the queue
         self.mutex.lock()
         self.latestaddedjob += 1
-        self.latestjobs.append( (self.latestaddedjob, helper) )
+        self.latestjobs.append( (self.latestaddedjob, helper, cachekey) )
         self.mutex.unlock()
 
         if self.threads:
@@ -169,6 +212,33 @@ class RenderControl(qt4.QObject):
             # process job in current thread if multithreading disabled
             self.processNextJob()
 
+    def supersedeJobs(self):
+        """Make sure results of jobs in progress are not shown, returning
+        a job id to use for a result obtained elsewhere."""
+        self.mutex.lock()
+        self.latestaddedjob += 1
+        self.latestdrawnjob = jobid = self.latestaddedjob
+        self.mutex.unlock()
+        return jobid
+
+    def setTileJobs(self, generation, jobs):
+        """Replace the queue of tiles to render.
+
+        generation identifies the painted page the tiles are from
+        jobs is a list of (helper, tx, ty, tilesize), in the order
+        they should be rendered.
+        """
+        self.mutex.lock()
+        self.tilegeneration = generation
+        self.tilejobs = [(generation,) + tuple(j) for j in jobs]
+        self.mutex.unlock()
+
+        if self.threads:
+            self.sem.release(len(jobs))
+        else:
+            while self.tilejobs:
+                self.processTileJob(*self.tilejobs.pop(0))
+
 class RenderThread( qt4.QThread ):
     """A thread for processing rendering jobs.
     This is controlled by a RenderControl object
@@ -210,6 +280,9 @@ class PlotWindow( qt4.QGraphicsView ):
         (10000, _('Every 10s')),
         )
 
+    # size of tiles used for rendering large pages
+    tilesize = 512
+
     def __init__(self, document, parent, menu=None):
         """Initialise the window.
 
@@ -264,6 +337,13 @@ class PlotWindow( qt4.QGraphicsView ):
         # state of last plot from painthelper
         self.painthelper = None
 
+        # recorded widget drawings, reused if widgets are unchanged
+        self.layercache = utils.LRUCache(
+            setting.settingdb['cache_layers_MB']*1024*1024)
+        # rendered page images and their helpers
+        self.pagecache = utils.LRUCache(
+            setting.settingdb['cache_pages_MB']*1024*1024)
+
         self.lastwidgetsselected = []
         self.oldzoom = -1.
         self.zoomfactor = 1.
@@ -274,6 +354,16 @@ class PlotWindow( qt4.QGraphicsView ):
         self.rendercontrol = RenderControl(self)
         self.rendercontrol.signalRenderFinished.connect(
             self.slotRenderFinished)
+        self.rendercontrol.signalTileFinished.connect(
+            self.slotTileFinished)
+
+        # tiles shown for large pages, keyed by tile (tx, ty)
+        self.tileitems = {}
+        self.tilegeneration = self.tilehelper = self.tilekey = None
+        self.connect( self.horizontalScrollBar(),
+                      qt4.SIGNAL('valueChanged(int)'), self.slotUpdateTiles )
+        self.connect( self.verticalScrollBar(),
+                      qt4.SIGNAL('valueChanged(int)'), self.slotUpdateTiles )
 
         # mode for clicking
         self.clickmode = 'select'
@@ -282,6 +372,14 @@ class PlotWindow( qt4.QGraphicsView ):
         # wheel zooming/scrolling accumulator
         self.sumwheeldelta = 0
 
+        # zooming shows a scaled preview of the current image, which
+        # is rendered again when the zoom stops changing
+        self.zoomtimer = qt4.QTimer(self)
+        self.zoomtimer.setSingleShot(True)
+        self.zoomtimer.timeout.connect(self.checkPlotUpdate)
+        # preview of region being zoomed into by zoom rectangle
+        self.zoompreviewitem = None
+
         # set up redrawing timer
         self.timer = qt4.QTimer(self)
         self.timer.timeout.connect(self.checkPlotUpdate)
@@ -316,6 +414,11 @@ class PlotWindow( qt4.QGraphicsView ):
         # create toolbar in main window (urgh)
         self.createToolbar(parent, menu)
 
+    def resizeEvent(self, event):
+        """Window resized, so more tiles may be visible."""
+        qt4.QGraphicsView.resizeEvent(self, event)
+        self.slotUpdateTiles()
+
     def hideEvent(self, event):
         """Window closing, so exit rendering threads."""
         self.rendercontrol.exitThreads()
@@ -527,6 +630,9 @@ class PlotWindow( qt4.QGraphicsView ):
                 if a:
                     axes[a] = True
 
+        # plotted extent of the first axis in each direction
+        spans = {}
+
         # iterate over each axis, and update the ranges
         for axis in ckeys(axes):
             s = axis.settings
@@ -542,6 +648,7 @@ class PlotWindow( qt4.QGraphicsView ):
                     self.painthelper.widgetBounds(axis), p)
             except KeyError:
                 continue
+            spans.setdefault(s.direction, (axis.coordParr1, axis.coordParr2))
 
             # invert if min and max are inverted
             if r[1] < r[0]:
@@ -559,6 +666,23 @@ class PlotWindow( qt4.QGraphicsView ):
                         s.get('max'),
                         utils.round2delt(r[1], r[3])) )
 
+        # show the zoomed region until the plot is updated, scaled
+        # to fill the plotted extent of the axes
+        if operations:
+            rect = qt4.QRectF(pt1, pt2).normalized()
+            bounds = list(self.painthelper.widgetBounds(widget))
+            if 'horizontal' in spans:
+                bounds[0], bounds[2] = sorted(spans['horizontal'])
+            else:
+                rect.setLeft(bounds[0])
+                rect.setRight(bounds[2])
+            if 'vertical' in spans:
+                bounds[1], bounds[3] = sorted(spans['vertical'])
+            else:
+                rect.setTop(bounds[1])
+                rect.setBottom(bounds[3])
+            self.showZoomPreview(rect, bounds)
+
         # finally change the axes
         self.document.applyOperation(
             document.OperationMultiple(operations,descr=_('zoom axes')) )
@@ -644,7 +768,9 @@ class PlotWindow( qt4.QGraphicsView ):
         items = self.items(event.pos())
         if len(items) > 0 and isinstance(items[0], qt4.QGraphicsItemGroup):
             del items[0]
-        self.ignoreclick = len(items)==0 or items[0] is not self.pixmapitem
+        self.ignoreclick = len(items)==0 or (
+            items[0] is not self.pixmapitem and
+            items[0].parentItem() is not self.pixmapitem )
 
         if event.button() == qt4.Qt.LeftButton and not self.ignoreclick:
 
@@ -878,6 +1004,10 @@ class PlotWindow( qt4.QGraphicsView ):
     def checkPlotUpdate(self):
         """Check whether plot needs updating."""
 
+        if self.zoomtimer.isActive():
+            # wait for zooming to finish
+            return
+
         # print >>sys.stderr, "checking update"
         # no threads, so can't get interrupted here
         # draw data into background pixmap if modified
@@ -896,24 +1026,49 @@ class PlotWindow( qt4.QGraphicsView ):
                 size = self.document.pageSize(
                     self.pagenumber, scaling=self.zoomfactor)
 
-                # draw the data into the buffer
-                # errors cause an exception window to pop up
-                try:
+                key = self.pageCacheKey(self.pagenumber)
+                cached = self.pagecache.get(key)
+                if cached is not None:
+                    # page was rendered previously
+                    img, phelper = cached
+                    jobid = self.rendercontrol.supersedeJobs()
+                    if img is None:
+                        self.slotPaintFinished(jobid, phelper, key)
+                    else:
+                        self.slotRenderFinished(jobid, img, phelper, None)
+                else:
+                    # draw the data into the buffer
+                    # errors cause an exception window to pop up
+                    # (painting reads the live document, so is done in
+                    # this thread; only the recorded page is rendered
+                    # to an image in the rendering threads)
                     phelper = document.PaintHelper(
-                        size, scaling=self.zoomfactor, dpi=self.dpi)
-                    self.document.paintTo(phelper, self.pagenumber)
-
-                except Exception:
-                    # stop updates this time round and show exception dialog
-                    d = exceptiondialog.ExceptionDialog(sys.exc_info(), self)
-                    self.oldzoom = self.zoomfactor
-                    self.docchangeset = self.document.changeset
-                    d.exec_()
-
-                self.painthelper = phelper
-                self.rendercontrol.addJob(phelper)
+                        size, scaling=self.zoomfactor, dpi=self.dpi,
+                        layercache=self.layercache)
+                    try:
+                        self.document.paintTo(phelper, self.pagenumber)
+                    except Exception:
+                        # stop updates this time round and show
+                        # exception dialog
+                        d = exceptiondialog.ExceptionDialog(
+                            sys.exc_info(), self)
+                        self.oldzoom = self.zoomfactor
+                        self.docchangeset = self.document.changeset
+                        d.exec_()
+                        key = None
+
+                    if self.isTiled(size):
+                        # tiles are rendered for the visible areas
+                        jobid = self.rendercontrol.supersedeJobs()
+                        self.slotPaintFinished(jobid, phelper, key)
+                    else:
+                        # the image is rendered in the rendering threads
+                        self.rendercontrol.addJob(phelper, cachekey=key)
             else:
                 self.painthelper = None
+                self.clearTiles()
+                self.removeZoomPreview()
+                self.resetTransform()
                 self.pagenumber = 0
                 size = self.document.docSize()
                 pixmap = qt4.QPixmap(*size)
@@ -928,13 +1083,126 @@ class PlotWindow( qt4.QGraphicsView ):
             self.oldzoom = self.zoomfactor
             self.docchangeset = self.document.changeset
 
-    def slotRenderFinished(self, jobid, img, helper):
+    def pageCacheKey(self, pagenumber):
+        """Key for page in page cache, at the current zoom and
+        document state."""
+        return ( pagenumber, self.zoomfactor, self.dpi, self.antialias,
+                 self.document.changeset )
+
+    def isTiled(self, size):
+        """Should a page of the size given be rendered in tiles?"""
+        return ( size[0]*size[1]*4 >
+                 setting.settingdb['plot_tiled_MB']*1024*1024 )
+
+    def cachePage(self, key, img, helper):
+        """Keep a rendered page in the page cache, if it is for the
+        current document state and zoom."""
+        if key == self.pageCacheKey(key[0]):
+            self.pagecache.set(key, (img, helper), size=img.byteCount())
+
+    def slotRenderFinished(self, jobid, img, helper, key):
         """Update image on display if rendering (usually in other
-        thread) finished."""
+        thread) finished. If key is set, the page is kept in the page
+        cache with this key."""
+
+        if key is not None:
+            self.cachePage(key, img, helper)
+        centre = self.viewPageCentre()
+        self.clearTiles()
         bufferpixmap = qt4.QPixmap.fromImage(img)
         self.setSceneRect(0, 0, bufferpixmap.width(), bufferpixmap.height())
         self.pixmapitem.setPixmap(bufferpixmap)
 
+        # widget positions and control graphs come from the new helper
+        self.setPaintHelper(helper, centre)
+        self.updateControlGraphs(self.lastwidgetsselected)
+
+    def slotPaintFinished(self, jobid, helper, key):
+        """A page to be shown in tiles has been painted."""
+
+        centre = self.viewPageCentre()
+        self.clearTiles()
+        self.pixmapitem.setPixmap(qt4.QPixmap())
+        self.setSceneRect(0, 0, helper.pagesize[0], helper.pagesize[1])
+
+        self.setPaintHelper(helper, centre)
+        self.updateControlGraphs(self.lastwidgetsselected)
+
+        self.tilegeneration = jobid
+        self.tilehelper = helper
+        self.tilekey = key
+        # keep the painted page, so the tiles can be reused
+        if key is not None:
+            self.pagecache.set(key, (None, helper), size=0)
+        self.slotUpdateTiles()
+
+    def slotUpdateTiles(self, *args):
+        """Render any tiles which have become visible, nearest the
+        centre of the view first, and remove tiles no longer near
+        the view."""
+
+        helper = self.tilehelper
+        if helper is None:
+            return
+
+        ts = self.tilesize
+        ntx = (helper.pagesize[0] + ts - 1) // ts
+        nty = (helper.pagesize[1] + ts - 1) // ts
+        view = self.mapToScene(self.viewport().rect()).boundingRect()
+        tx1 = max(int(view.left()) // ts, 0)
+        tx2 = min(int(view.right()) // ts, ntx-1)
+        ty1 = max(int(view.top()) // ts, 0)
+        ty2 = min(int(view.bottom()) // ts, nty-1)
+
+        # keep tiles just outside the view, for small scrolls
+        for t in list(self.tileitems):
+            if ( t[0] < tx1-1 or t[0] > tx2+1 or
+                 t[1] < ty1-1 or t[1] > ty2+1 ):
+                self.scene.removeItem(self.tileitems.pop(t))
+
+        cx, cy = view.center().x() / ts - 0.5, view.center().y() / ts - 0.5
+        visible = sorted(
+            [ (tx, ty) for tx in crange(tx1, tx2+1)
+              for ty in crange(ty1, ty2+1) ],
+            key=lambda t: (t[0]-cx)**2 + (t[1]-cy)**2 )
+
+        jobs = []
+        for tx, ty in visible:
+            if (tx, ty) in self.tileitems:
+                continue
+            img = self.pagecache.get( (self.tilekey, tx, ty) )
+            if img is not None:
+                self.addTile(tx, ty, img)
+            else:
+                jobs.append( (helper, tx, ty, ts) )
+        self.rendercontrol.setTileJobs(self.tilegeneration, jobs)
+
+    def slotTileFinished(self, generation, tx, ty, img):
+        """Show tile rendered by rendering thread."""
+        if generation != self.tilegeneration:
+            return
+        self.pagecache.set( (self.tilekey, tx, ty), img,
+                            size=img.byteCount() )
+        if (tx, ty) not in self.tileitems:
+            self.addTile(tx, ty, img)
+
+    def addTile(self, tx, ty, img):
+        """Add tile image to the page."""
+        item = qt4.QGraphicsPixmapItem(
+            qt4.QPixmap.fromImage(img), self.pixmapitem)
+        item.setPos(tx*self.tilesize, ty*self.tilesize)
+        if self.pixmapitem.hasCursor():
+            item.setCursor(self.pixmapitem.cursor())
+        self.tileitems[(tx, ty)] = item
+
+    def clearTiles(self):
+        """Remove any tiles shown."""
+        for item in cvalues(self.tileitems):
+            self.scene.removeItem(item)
+        self.tileitems.clear()
+        self.tilegeneration = self.tilehelper = self.tilekey = None
+        self.rendercontrol.setTileJobs(None, [])
+
     def updatePlotSettings(self):
         """Update plot window settings from settings."""
         self.setTimeout(setting.settingdb['plot_updatepolicy'])
@@ -987,6 +1255,8 @@ class PlotWindow( qt4.QGraphicsView ):
     def actionForceUpdate(self):
         """Force an update for the graph."""
         self.docchangeset = -100
+        self.pagecache.clear()
+        self.layercache.clear()
         self.checkPlotUpdate()
 
     def slotFullScreen(self):
@@ -1029,10 +1299,80 @@ class PlotWindow( qt4.QGraphicsView ):
         setting.settingdb['plot_antialias'] = self.antialias
         self.actionForceUpdate()
 
+    def viewPageCentre(self):
+        """Return the point at the centre of the view, in page
+        coordinates at a zoom factor of 1 (or None if no page)."""
+        if self.painthelper is None:
+            return None
+        centre = self.mapToScene(self.viewport().rect().center())
+        scaling = self.painthelper.scaling
+        return qt4.QPointF(centre.x()/scaling, centre.y()/scaling)
+
+    def setPaintHelper(self, helper, centre=None):
+        """Use the helper for the page shown, scaling the view if the
+        page was rendered at a different zoom factor, and centring the
+        view on centre (from viewPageCentre)."""
+
+        self.painthelper = helper
+        self.removeZoomPreview()
+        scale = self.zoomfactor / helper.scaling
+        self.setTransform(qt4.QTransform.fromScale(scale, scale))
+        if centre is not None:
+            self.centerOn(centre.x()*helper.scaling,
+                          centre.y()*helper.scaling)
+
+    def zoomedPageRect(self):
+        """Return the page rectangle at the current zoom factor.
+
+        This differs from the scene rectangle while the page shown
+        is a scaled preview at the zoom factor it was painted at."""
+        r = self.sceneRect()
+        if self.painthelper is not None:
+            scale = self.zoomfactor / self.painthelper.scaling
+            r = qt4.QRectF(r.left()*scale, r.top()*scale,
+                           r.width()*scale, r.height()*scale)
+        return r
+
     def setZoomFactor(self, zoomfactor):
-        """Set the zoom factor of the window."""
+        """Set the zoom factor of the window.
+
+        The page currently shown is scaled immediately as a preview,
+        and rendered again when the zoom factor stops changing.
+        """
         self.zoomfactor = float(zoomfactor)
-        self.checkPlotUpdate()
+        if self.painthelper is None:
+            self.checkPlotUpdate()
+            return
+
+        scale = self.zoomfactor / self.painthelper.scaling
+        self.setTransform(qt4.QTransform.fromScale(scale, scale))
+        self.zoomtimer.start(setting.settingdb['plot_zoomdelay'])
+
+    def showZoomPreview(self, rect, bounds):
+        """Show the part of the current page image in rect scaled to
+        fill bounds (the plotted extent of the zoomed axes), while the
+        zoomed plot is rendered."""
+
+        self.removeZoomPreview()
+        pixmap = self.pixmapitem.pixmap()
+        if pixmap.isNull() or rect.width() < 1 or rect.height() < 1:
+            # no image to preview (e.g. page shown in tiles)
+            return
+        w = int(bounds[2]-bounds[0])
+        h = int(bounds[3]-bounds[1])
+        if w < 1 or h < 1:
+            return
+        preview = pixmap.copy(rect.toRect()).scaled(
+            w, h, qt4.Qt.IgnoreAspectRatio, qt4.Qt.FastTransformation)
+        self.zoompreviewitem = qt4.QGraphicsPixmapItem(
+            preview, self.pixmapitem)
+        self.zoompreviewitem.setPos(bounds[0], bounds[1])
+
+    def removeZoomPreview(self):
+        """Remove any zoom rectangle preview."""
+        if self.zoompreviewitem is not None:
+            self.scene.removeItem(self.zoompreviewitem)
+            self.zoompreviewitem = None
 
     def slotViewZoomIn(self):
         """Zoom into the plot."""
@@ -1048,7 +1388,7 @@ class PlotWindow( qt4.QGraphicsView ):
         # need to take account of scroll bars when deciding size
         viewportsize = self.maximumViewportSize()
         aspectwin = viewportsize.width() / viewportsize.height()
-        r = self.pixmapitem.boundingRect()
+        r = self.zoomedPageRect()
         aspectplot = r.width() / r.height()
 
         width = viewportsize.width()
@@ -1065,7 +1405,7 @@ class PlotWindow( qt4.QGraphicsView ):
         # need to take account of scroll bars when deciding size
         viewportsize = self.maximumViewportSize()
         aspectwin = viewportsize.width() / viewportsize.height()
-        r = self.pixmapitem.boundingRect()
+        r = self.zoomedPageRect()
         aspectplot = r.width() / r.height()
 
         height = viewportsize.height()
@@ -1080,7 +1420,7 @@ class PlotWindow( qt4.QGraphicsView ):
         """Make the zoom factor correct to show the whole page."""
 
         viewportsize = self.maximumViewportSize()
-        r = self.pixmapitem.boundingRect()
+        r = self.zoomedPageRect()
         if r.width() != 0 and r.height() != 0:
             multw = viewportsize.width() / r.width()
             multh = viewportsize.height() / r.height()
@@ -1130,6 +1470,13 @@ class PlotWindow( qt4.QGraphicsView ):
         elif self.clickmode == 'pick':
             self.pixmapitem.setCursor(qt4.Qt.CrossCursor)
             self.emit(qt4.SIGNAL('sigPickerEnabled'), True)
+
+        # tiles of large pages use the same cursor
+        for item in cvalues(self.tileitems):
+            if self.pixmapitem.hasCursor():
+                item.setCursor(self.pixmapitem.cursor())
+            else:
+                item.unsetCursor()
         
     def getClick(self):
         """Return a click point from the graph."""